@@ -0,0 +1,138 @@
+"""
+Потоковый импорт и экспорт заявок (NDJSON и CSV).
+
+Импорт читает тело запроса по кускам и отдает записи пачками, не собирая файл
+целиком в памяти. Экспорт читает таблицу через server-side cursor
+(stream_results) и отдает строки частями по EXPORT_CHUNK_SIZE, поэтому память
+не зависит от размера таблицы ни в одну, ни в другую сторону.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+# Одна запись (строка NDJSON или запись CSV) не может быть длиннее
+IMPORT_MAX_RECORD_BYTES = int(os.getenv("IMPORT_MAX_RECORD_BYTES", "1000000"))
+
+
+class ImportFormatError(ValueError):
+    """Поток нельзя разобрать дальше (слишком длинная запись, нет заголовка CSV)"""
+
+
+async def _lines(chunks):
+    """Байтовые куски -> (номер строки, текст строки с переводом строки)"""
+    pending = b""
+    line_no = 0
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        if len(pending) > IMPORT_MAX_RECORD_BYTES:
+            raise ImportFormatError(f"Line {line_no + len(complete) + 1} is longer than {IMPORT_MAX_RECORD_BYTES} bytes")
+        for raw in complete:
+            line_no += 1
+            yield line_no, raw.decode("utf-8-sig" if line_no == 1 else "utf-8", errors="replace") + "\n"
+    if pending:
+        yield line_no + 1, pending.decode("utf-8-sig" if line_no == 0 else "utf-8", errors="replace")
+
+
+async def iter_ndjson_records(chunks):
+    """
+    NDJSON -> (номер строки, dict или None, ошибка или None).
+    Пустые строки пропускаются.
+    """
+    async for line_no, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_no, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+async def iter_csv_records(chunks):
+    """
+    CSV с заголовком -> (номер строки, dict или None, ошибка или None).
+    Пустые ячейки становятся None. Поля в кавычках могут содержать переводы
+    строк: запись закончена, когда число кавычек в ней четное (RFC 4180).
+    """
+    header = None
+    record_lines = []
+    record_size = 0
+    record_start = 0
+    quotes = 0
+    async for line_no, line in _lines(chunks):
+        if not record_lines:
+            record_start = line_no
+        record_lines.append(line)
+        record_size += len(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            if record_size > IMPORT_MAX_RECORD_BYTES:
+                raise ImportFormatError(f"Record at line {record_start} is longer than {IMPORT_MAX_RECORD_BYTES} bytes")
+            continue
+        text = "".join(record_lines)
+        record_lines, record_size, quotes = [], 0, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_start, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield record_start, {name: (value if value != "" else None) for name, value in zip(header, values)}, None
+    if record_lines:
+        yield record_start, None, "Unterminated quoted field"
+    if header is None:
+        raise ImportFormatError("CSV header is missing")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported type {type(value).__name__}")
+
+
+def format_ndjson(columns: list[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + "\n"
+        for row in rows
+    )
+
+
+def format_csv(columns: list[str], rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+def stream_export(engine, stmt, columns: list[str], fmt: str):
+    """
+    Генератор частей ответа экспорта. Собственное соединение с
+    stream_results=True: psycopg2 читает строки через именованный
+    (server-side) cursor порциями по EXPORT_CHUNK_SIZE.
+    """
+    if fmt == "csv":
+        yield format_csv(columns, [], header=True)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_CHUNK_SIZE).execute(stmt)
+        for rows in result.partitions(EXPORT_CHUNK_SIZE):
+            if fmt == "csv":
+                yield format_csv(columns, rows)
+            else:
+                yield format_ndjson(columns, rows)
@@ -0,0 +1,122 @@
+"""
+Кэш проверенных администраторов для get_current_admin.
+
+Админ-панель опрашивает API каждые несколько секунд, и без кэша каждый запрос
+делал SELECT по email из токена. Проверенный администратор запоминается по
+subject токена на AUTH_CACHE_TTL секунд (LRU на AUTH_CACHE_SIZE записей).
+Записи сбрасываются при изменении или удалении администратора через ORM
+(см. models/admins.py). Кэш живет в памяти процесса, поэтому при нескольких
+воркерах изменения в другом процессе видны не позже чем через TTL.
+
+AUTH_TRUST_CLAIMS_SECONDS > 0 включает режим доверия claims: токен, выданный
+не раньше этого числа секунд назад, принимается без обращения к БД, данные
+администратора берутся из самого токена.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_TRUST_CLAIMS_SECONDS = float(os.getenv("AUTH_TRUST_CLAIMS_SECONDS", "0"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Снимок администратора, не привязанный к сессии БД"""
+    id: int
+    email: str
+    created_at: datetime
+
+
+class PrincipalCache:
+    """LRU-кэш с TTL: subject токена -> Principal"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.trusted = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Principal | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, subject: str, principal: Principal):
+        if self._maxsize <= 0 or self._ttl <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self._ttl, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def record_trusted(self):
+        with self._lock:
+            self.trusted += 1
+
+    def invalidate(self, admin_id: int):
+        """Удаляет все записи администратора (в том числе по старому email)"""
+        with self._lock:
+            stale = [key for key, (_, principal) in self._entries.items() if principal.id == admin_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self._maxsize,
+                "ttl_seconds": self._ttl,
+                "trust_claims_seconds": AUTH_TRUST_CLAIMS_SECONDS,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "trusted": self.trusted,
+                "invalidations": self.invalidations,
+            }
+
+
+def principal_from_claims(payload: dict) -> Principal | None:
+    """
+    Principal из claims свежего токена (режим AUTH_TRUST_CLAIMS_SECONDS).
+    None, если режим выключен, токен старше окна или в нем нет нужных claims.
+    """
+    if AUTH_TRUST_CLAIMS_SECONDS <= 0:
+        return None
+    issued_at = payload.get("iat")
+    admin_id = payload.get("uid")
+    created_at = payload.get("created_at")
+    if not isinstance(issued_at, (int, float)) or not isinstance(admin_id, int) or not created_at:
+        return None
+    if time.time() - issued_at > AUTH_TRUST_CLAIMS_SECONDS:
+        return None
+    try:
+        return Principal(id=admin_id, email=payload["sub"], created_at=datetime.fromisoformat(created_at))
+    except (TypeError, ValueError):
+        return None
+
+
+principal_cache = PrincipalCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
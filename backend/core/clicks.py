@@ -0,0 +1,158 @@
+"""
+Самые кликаемые элементы страницы: почасовые скетчи Space-Saving.
+
+Число разных элементов не ограничено (id, className или tagName из браузера),
+поэтому точные счетчики по каждому элементу не хранятся. Скетч Space-Saving
+держит не больше CLICK_SKETCH_CAPACITY счетчиков: новый элемент вытесняет
+элемент с наименьшим счетом и наследует его как погрешность. Гарантии:
+- элемент с долей кликов больше 1 / CLICK_SKETCH_CAPACITY всегда в скетче;
+- count - верхняя граница числа кликов, count - error - нижняя.
+
+Скетчи объединяются без потери этих гарантий, поэтому каждый воркер копит
+свой скетч в памяти и раз в CLICK_SKETCH_FLUSH_INTERVAL секунд сливает его
+в строку часа (таблица click_sketches), а чтение окна сливает часовые скетчи:
+стоимость запроса - часы окна x CLICK_SKETCH_CAPACITY, независимо от числа кликов.
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+CLICK_SKETCH_CAPACITY = int(os.getenv("CLICK_SKETCH_CAPACITY", "200"))
+CLICK_SKETCH_FLUSH_INTERVAL = float(os.getenv("CLICK_SKETCH_FLUSH_INTERVAL", "10"))
+# Длинные className обрезаются: ключ скетча, а не полное описание элемента
+MAX_ELEMENT_LENGTH = 100
+
+
+class SpaceSaving:
+    """Скетч Space-Saving: {элемент: [count, error]} и общее число кликов"""
+
+    def __init__(self, capacity: int = CLICK_SKETCH_CAPACITY, counters: dict | None = None, total: int = 0):
+        self.capacity = capacity
+        self.counters = {element: list(value) for element, value in (counters or {}).items()}
+        self.total = total
+
+    def _minimum(self) -> int:
+        """Счет, который могли набрать элементы, вытесненные из заполненного скетча"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def add(self, element: str, count: int = 1):
+        element = element[:MAX_ELEMENT_LENGTH]
+        self.total += count
+        counter = self.counters.get(element)
+        if counter is not None:
+            counter[0] += count
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[element] = [count, 0]
+            return
+        evicted = min(self.counters, key=lambda key: self.counters[key][0])
+        floor = self.counters.pop(evicted)[0]
+        self.counters[element] = [floor + count, floor]
+
+    def merge(self, other: "SpaceSaving"):
+        """
+        Объединение по Agarwal et al. (Mergeable Summaries): элемент, которого нет
+        в одном из скетчей, мог набрать в нем до минимума этого скетча - он
+        прибавляется и к счету, и к погрешности. Остаются capacity наибольших.
+        """
+        own_floor, other_floor = self._minimum(), other._minimum()
+        merged = {}
+        for element in self.counters.keys() | other.counters.keys():
+            count, error = self.counters.get(element, (own_floor, own_floor))
+            other_count, other_error = other.counters.get(element, (other_floor, other_floor))
+            merged[element] = [count + other_count, error + other_error]
+        largest = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:self.capacity]
+        self.counters = dict(largest)
+        self.total += other.total
+
+    @classmethod
+    def combine(cls, sketches: list["SpaceSaving"], capacity: int = CLICK_SKETCH_CAPACITY) -> "SpaceSaving":
+        """
+        То же, что merge по очереди, но за один проход по всем скетчам (окно из
+        сотен часов) и без промежуточного отсечения до capacity
+        """
+        floors = [sketch._minimum() for sketch in sketches]
+        floor_total = sum(floors)
+        combined = {}
+        for sketch, floor in zip(sketches, floors):
+            for element, (count, error) in sketch.counters.items():
+                current = combined.setdefault(element, [floor_total, floor_total])
+                current[0] += count - floor
+                current[1] += error - floor
+        largest = sorted(combined.items(), key=lambda item: item[1][0], reverse=True)[:capacity]
+        return cls(capacity, dict(largest), sum(sketch.total for sketch in sketches))
+
+    def top(self, limit: int) -> list[dict]:
+        ranked = sorted(self.counters.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+        return [{"element": element, "count": count, "error": error} for element, (count, error) in ranked]
+
+
+class ClickSketchBuffer:
+    """Почасовые скетчи кликов этого процесса; фоновый поток сливает их в БД"""
+
+    def __init__(self, flush_interval: float = CLICK_SKETCH_FLUSH_INTERVAL):
+        self._flush_interval = flush_interval
+        self._sketches: dict[datetime, SpaceSaving] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def record(self, bucket: datetime, clicks: dict[str, int]):
+        """Прибавляет новые клики {элемент: количество} к скетчу часа bucket"""
+        if not clicks:
+            return
+        with self._lock:
+            sketch = self._sketches.get(bucket)
+            if sketch is None:
+                sketch = self._sketches[bucket] = SpaceSaving()
+            for element, count in clicks.items():
+                sketch.add(element, count)
+
+    def flush(self):
+        """Сливает накопленные скетчи в click_sketches; при ошибке они возвращаются в буфер"""
+        from core.database import SessionLocal
+        from models.click_sketches import ClickSketchCRUD
+
+        with self._lock:
+            sketches, self._sketches = self._sketches, {}
+        if not sketches:
+            return
+        db = SessionLocal()
+        try:
+            ClickSketchCRUD.merge(db, sketches)
+        except Exception:
+            logger.exception("Failed to persist click sketches for %s hours", len(sketches))
+            db.rollback()
+            with self._lock:
+                for bucket, sketch in sketches.items():
+                    current = self._sketches.setdefault(bucket, SpaceSaving())
+                    current.merge(sketch)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.wait(self._flush_interval):
+            self.flush()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="click-sketches", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Останавливает поток и сохраняет то, что накоплено с последнего слияния"""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+
+click_sketches = ClickSketchBuffer()
@@ -0,0 +1,89 @@
+"""
+Компактный формат координат курсора.
+
+Точки хранятся как пары int16 (little-endian): первая пара - абсолютные
+координаты, каждая следующая - разница с предыдущей точкой. Координаты
+ограничиваются диапазоном 0..32767, поэтому разница всегда помещается в int16.
+В beacon и в API эти байты передаются в base64.
+
+Прием метрик публичный, поэтому число точек в одном событии ограничено
+MAX_POINTS (beacon собирает заметно меньше) при приеме: длина строк в API
+проверяется до разбора, decode_base64 проверяет число точек. Уже сохраненные
+строки decode_points читает без ограничения.
+"""
+import base64
+import binascii
+import json
+import sys
+from array import array
+
+MAX_COORDINATE = 32767
+MAX_POINTS = 1000
+# Длина base64 для MAX_POINTS пар int16
+MAX_BASE64_LENGTH = (MAX_POINTS * 4 + 2) // 3 * 4
+# Старый формат: {"x":32767,"y":32767}, - до 22 символов на точку, с запасом на пробелы
+MAX_JSON_LENGTH = MAX_POINTS * 32
+
+
+def _clamp(value) -> int:
+    return min(max(int(value), 0), MAX_COORDINATE)
+
+
+def encode_points(points) -> bytes:
+    """[(x, y), ...] -> дельта-кодированные пары int16"""
+    packed = array("h")
+    prev_x = prev_y = 0
+    for x, y in points:
+        x, y = _clamp(x), _clamp(y)
+        packed.append(x - prev_x)
+        packed.append(y - prev_y)
+        prev_x, prev_y = x, y
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode_points(data: bytes) -> list[tuple[int, int]]:
+    """Обратное к encode_points. Бросает ValueError на поврежденных данных"""
+    if len(data) % 4:
+        raise ValueError("Cursor data length must be a multiple of 4 bytes")
+    packed = array("h")
+    packed.frombytes(data)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    points = []
+    x = y = 0
+    for i in range(0, len(packed), 2):
+        x += packed[i]
+        y += packed[i + 1]
+        points.append((x, y))
+    return points
+
+
+def decode_base64(value: str) -> bytes:
+    """base64 из beacon -> байты пар int16. Бросает ValueError на мусоре"""
+    try:
+        data = base64.b64decode(value, validate=True)
+    except binascii.Error as exc:
+        raise ValueError("Invalid base64 cursor data") from exc
+    if len(data) % 4:
+        raise ValueError("Cursor data length must be a multiple of 4 bytes")
+    if len(data) > MAX_POINTS * 4:
+        raise ValueError(f"Cursor data exceeds {MAX_POINTS} points")
+    return data
+
+
+def points_from_json(value: str | None) -> bytes | None:
+    """
+    Старый формат beacon (JSON-строка [{x, y}, ...]) -> компактные байты.
+    Нераспознанные данные отбрасываются (None), точки сверх MAX_POINTS - тоже.
+    """
+    if not value:
+        return None
+    try:
+        positions = json.loads(value)
+        if not isinstance(positions, list):
+            return None
+        return encode_points((p["x"], p["y"]) for p in positions[:MAX_POINTS]) or None
+    except (ValueError, TypeError, KeyError, OverflowError):
+        return None
@@ -1,7 +1,27 @@
+import asyncio
+import logging
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import ExitStack
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import MutableHeaders
+
+from core.instrumentation import (
+    DB_READ_SESSIONS,
+    DB_REPLICA_LAG,
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    instrument_engine,
+    instrument_pool,
+)
+
+logger = logging.getLogger(__name__)
 
 POSTGRES_USER = os.getenv("POSTGRES_USER", "app_user")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
@@ -10,14 +30,331 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "app_db")
 
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+# Реплика для чтения (потоковая репликация, те же пользователь и БД); пусто - все на primary
+POSTGRES_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST", "")
+POSTGRES_REPLICA_PORT = os.getenv("POSTGRES_REPLICA_PORT", POSTGRES_PORT)
+# Чтение уходит на primary, если реплика отстала больше чем на столько секунд
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1"))
+# Недоступная реплика не должна задерживать запрос: дальше - чтение с primary
+REPLICA_CONNECT_TIMEOUT = 2
+# Сколько секунд после записи клиент читает с primary (read-your-writes).
+# Не меньше DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL: к концу окна реплика
+# гарантированно содержит запись
+DB_READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+
+# Настройки пула соединений (одинаковые для sync и async engine, на каждый процесс)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Ограничение времени выполнения запроса в мс (0 - без ограничения)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Сколько соединений каждого engine открыть при старте воркера (0 - не прогревать)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
 
-engine = create_engine(DATABASE_URL)
+_pool_settings = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+_connect_args = {}
+_async_connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    _connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    _async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+engine = create_engine(
+    DATABASE_URL, connect_args=_connect_args,
+    poolclass=TimedQueuePool, pool_logging_name="sync", **_pool_settings,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async-вариант (asyncpg) для async-маршрутов: запрос не занимает поток из
+# threadpool, пока ждет ответа PostgreSQL
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=_async_connect_args,
+    poolclass=TimedAsyncQueuePool, pool_logging_name="async", **_pool_settings,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Пулы реплики - такого же размера, что и у primary, на каждый процесс
+replica_engine = async_replica_engine = None
+ReadSessionLocal, AsyncReadSessionLocal = SessionLocal, AsyncSessionLocal
+if POSTGRES_REPLICA_HOST:
+    _replica_address = f"{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_REPLICA_HOST}:{POSTGRES_REPLICA_PORT}/{POSTGRES_DB}"
+    replica_engine = create_engine(
+        f"postgresql://{_replica_address}", connect_args={**_connect_args, "connect_timeout": REPLICA_CONNECT_TIMEOUT},
+        poolclass=TimedQueuePool, pool_logging_name="replica", **_pool_settings,
+    )
+    async_replica_engine = create_async_engine(
+        f"postgresql+asyncpg://{_replica_address}", connect_args={**_async_connect_args, "timeout": REPLICA_CONNECT_TIMEOUT},
+        poolclass=TimedAsyncQueuePool, pool_logging_name="async_replica", **_pool_settings,
+    )
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+
+# Число и время SQL-запросов, ожидание и занятость пулов - для GET /metrics
+_instrumented = [("sync", engine), ("async", async_engine.sync_engine)]
+if replica_engine is not None:
+    _instrumented += [("replica", replica_engine), ("async_replica", async_replica_engine.sync_engine)]
+for _name, _sync_engine in _instrumented:
+    instrument_engine(_sync_engine, _name)
+    instrument_pool(_sync_engine, _name)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Отставание реплики. Пока все полученные WAL применены, отставания нет, даже
+# если primary давно ничего не писал; иначе - возраст последней примененной
+# транзакции. Без потоковой репликации (приемник WAL не подключен) реплика не
+# знает, насколько отстала, и считается недоступной.
+_REPLICA_LAG_SQL = text("""
+    SELECT pg_is_in_recovery() AS in_recovery,
+           EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') AS streaming,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END AS lag
+""")
+
+
+class ReplicaMonitor:
+    """
+    Фоновый поток раз в DB_REPLICA_CHECK_INTERVAL секунд измеряет отставание
+    реплики. Реплика используется, пока последняя проверка свежая (не старше
+    трех интервалов) и отставание не больше DB_REPLICA_MAX_LAG.
+    """
+
+    def __init__(self, engine, interval: float = DB_REPLICA_CHECK_INTERVAL, max_lag: float = DB_REPLICA_MAX_LAG):
+        self._engine = engine
+        self._interval = interval
+        self._max_lag = max_lag
+        self._lag: float | None = None  # None - реплика недоступна
+        self._checked_at = 0.0
+        self._state = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def lag(self) -> float | None:
+        return self._lag
+
+    def available(self) -> bool:
+        lag = self._lag
+        return lag is not None and lag <= self._max_lag and time.monotonic() - self._checked_at <= 3 * self._interval
+
+    def check(self):
+        problem = None
+        try:
+            with self._engine.connect() as conn:
+                row = conn.execute(_REPLICA_LAG_SQL).one()
+            if row.in_recovery and row.streaming:
+                lag = float(row.lag)
+                DB_REPLICA_LAG.set(lag)
+            else:
+                lag, problem = None, f"not streaming from the primary (in recovery: {row.in_recovery})"
+        except Exception as exc:
+            lag, problem = None, f"unreachable: {exc}"
+        self._lag = lag
+        self._checked_at = time.monotonic()
+
+        # В лог - только смена состояния, а не каждая проверка
+        state = "enabled" if self.available() else "disabled"
+        if state == self._state:
+            return
+        self._state = state
+        if problem:
+            logger.warning("Read replica disabled, reads go to the primary: %s", problem)
+        elif state == "disabled":
+            logger.warning("Read replica disabled: lag %.1f s exceeds DB_REPLICA_MAX_LAG", lag)
+        else:
+            logger.info("Read replica enabled (lag %.1f s)", lag)
+
+    def mark_unavailable(self):
+        """Ошибка соединения с репликой в запросе: не ждем следующей проверки"""
+        self._lag = None
+
+    def _run(self):
+        while True:
+            self.check()
+            if self._stopping.wait(self._interval):
+                return
+
+    def start(self):
+        if self._engine is None or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+
+replica_monitor = ReplicaMonitor(replica_engine)
+
+# Cookie read-your-writes: до этого момента (unix time) клиент читает с primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+_UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def _read_reason(request: Request) -> str | None:
+    """Куда направить чтение: replica, pinned, lagging, unavailable; None - реплики нет"""
+    if replica_engine is None:
+        return None
+    try:
+        if float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time():
+            return "pinned"
+    except ValueError:
+        pass
+    if replica_monitor.available():
+        return "replica"
+    return "unavailable" if replica_monitor.lag is None else "lagging"
+
+
+def _count_read(reason: str | None):
+    if reason is not None:
+        DB_READ_SESSIONS.labels("replica" if reason == "replica" else "primary", reason).inc()
+
+
+def get_read_engine(request: Request):
+    """Engine для чтения вне сессии (потоковый экспорт): реплика или primary"""
+    reason = _read_reason(request)
+    _count_read(reason)
+    return replica_engine if reason == "replica" else engine
+
+
+# Ошибки недоступной реплики: psycopg отдает OperationalError, а asyncpg при
+# отказе в соединении, обрыве или неразрешимом имени - OSError (ConnectionRefusedError,
+# socket.gaierror, ...) и asyncio.TimeoutError без обертки SQLAlchemy
+_REPLICA_ERRORS = (OperationalError, OSError, asyncio.TimeoutError)
+
+
+def get_read_db(request: Request):
+    """
+    Сессия только для чтения: реплика, если она настроена, не отстала и клиент
+    недавно ничего не записывал (READ_PRIMARY_COOKIE), иначе primary.
+    Данные могут отставать от primary на DB_REPLICA_MAX_LAG секунд.
+    """
+    reason = _read_reason(request)
+    db = None
+    if reason == "replica":
+        db = ReadSessionLocal()
+        try:
+            # Соединение берется сразу: если реплика упала после последней
+            # проверки, запрос читает с primary, а не завершается ошибкой
+            db.connection()
+        except _REPLICA_ERRORS:
+            db.close()
+            db, reason = None, "unavailable"
+            replica_monitor.mark_unavailable()
+    _count_read(reason)
+    db = db or SessionLocal()
+    try:
+        yield db
+    except _REPLICA_ERRORS:
+        if reason == "replica":
+            replica_monitor.mark_unavailable()
+        raise
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    """То же, что get_read_db, для async-маршрутов"""
+    reason = _read_reason(request)
+    db = None
+    if reason == "replica":
+        db = AsyncReadSessionLocal()
+        try:
+            await db.connection()
+        except _REPLICA_ERRORS:
+            await db.close()
+            db, reason = None, "unavailable"
+            replica_monitor.mark_unavailable()
+    _count_read(reason)
+    db = db or AsyncSessionLocal()
+    try:
+        yield db
+    except _REPLICA_ERRORS:
+        if reason == "replica":
+            replica_monitor.mark_unavailable()
+        raise
+    finally:
+        await db.close()
+
+
+class ReadYourWritesMiddleware:
+    """
+    Успешный изменяющий запрос админ-панели (с Authorization) ставит cookie
+    READ_PRIMARY_COOKIE на DB_READ_YOUR_WRITES_SECONDS: следующие чтения этого
+    клиента идут на primary и видят его запись в любом воркере. Анонимные
+    записи (beacon, форма заявки) cookie не получают - их авторы не читают
+    админские списки. Без реплики ничего не делает.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            replica_engine is None
+            or scope["type"] != "http"
+            or scope["method"] not in _UNSAFE_METHODS
+            or not any(name == b"authorization" for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + DB_READ_YOUR_WRITES_SECONDS
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}={until}; Max-Age={DB_READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _warm_sync_pool(connections: int):
+    # Соединения держатся одновременно, иначе пул отдаст одно и то же
+    with ExitStack() as stack:
+        for _ in range(connections):
+            stack.enter_context(engine.connect()).execute(text("SELECT 1"))
+
+async def _warm_async_connection():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def warm_up_pools(connections: int = DB_POOL_WARMUP):
+    """
+    Открывает connections соединений в sync и async пулах до приема запросов:
+    первые запросы после старта не ждут установки соединения с PostgreSQL.
+    """
+    connections = min(connections, DB_POOL_SIZE)
+    if connections <= 0:
+        return
+    await asyncio.gather(
+        asyncio.to_thread(_warm_sync_pool, connections),
+        *(_warm_async_connection() for _ in range(connections)),
+    )
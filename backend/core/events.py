@@ -0,0 +1,246 @@
+"""
+Push новых заявок в админ-панель (GET /api/applications/stream, Server-Sent Events).
+
+ApplicationEventHub - pub/sub в памяти процесса: у каждого подключенного
+администратора своя ограниченная очередь, publish раскладывает событие во все
+очереди. Подписчик, не успевающий читать (очередь переполнена), отключается:
+клиент переподключается и перечитывает список, вместо того чтобы копить
+события в памяти сервера.
+
+При нескольких воркерах заявку создает один процесс, а админ может быть
+подключен к другому. APPLICATION_EVENTS_BRIDGE=postgres пускает события через
+PostgreSQL LISTEN/NOTIFY: publish делает NOTIFY, а каждый воркер слушает канал
+отдельным соединением asyncpg и раздает полученное своим подписчикам.
+Payload NOTIFY ограничен 8000 байт: событие, которое не удалось отправить
+(слишком большое или ошибка БД), заменяется событием resync.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+
+import asyncpg
+from sqlalchemy import text
+
+from core.database import POSTGRES_DB, POSTGRES_HOST, POSTGRES_PASSWORD, POSTGRES_PORT, POSTGRES_USER, engine
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_EVENTS_BRIDGE = os.getenv("APPLICATION_EVENTS_BRIDGE", "memory")  # memory | postgres
+APPLICATION_EVENTS_QUEUE_SIZE = int(os.getenv("APPLICATION_EVENTS_QUEUE_SIZE", "100"))
+# Комментарий-heartbeat держит соединение открытым через nginx (proxy_read_timeout)
+APPLICATION_EVENTS_HEARTBEAT = float(os.getenv("APPLICATION_EVENTS_HEARTBEAT", "15"))
+
+APPLICATION_EVENTS_CHANNEL = "application_events"
+# Событие resync: часть событий могла потеряться (переподключение к PostgreSQL),
+# клиенту нужно перечитать список
+RESYNC_EVENT = {"type": "resync"}
+# PostgreSQL отклоняет payload NOTIFY от 8000 байт
+NOTIFY_MAX_PAYLOAD = 7999
+
+_NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+
+class _Subscriber:
+    def __init__(self, maxsize: int, min_score: int | None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.min_score = min_score
+
+    def accepts(self, event: dict) -> bool:
+        if self.min_score is None or event.get("type") != "application_created":
+            return True
+        return event["application"]["priority_score"] >= self.min_score
+
+
+class ApplicationEventHub:
+    """Раздача событий подписчикам одного процесса (очередь на подписчика)"""
+
+    def __init__(self, bridge: str, queue_size: int):
+        self.bridge = bridge
+        self._queue_size = queue_size
+        self._subscribers: set[_Subscriber] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._listener: asyncio.Task | None = None
+        self._counters_lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.disconnected_slow = 0
+        self.resyncs_published = 0
+
+    async def start(self):
+        """Вызывается в lifespan: запоминает event loop и запускает LISTEN при bridge=postgres"""
+        self._loop = asyncio.get_running_loop()
+        if self.bridge == "postgres" and self._listener is None:
+            self._listener = asyncio.create_task(self._listen(), name="application-events-listener")
+
+    async def stop(self):
+        """Закрывает все потоки подписчиков, чтобы остановка процесса их не ждала"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for subscriber in list(self._subscribers):
+            self._close(subscriber)
+        self._loop = None
+
+    def subscribe(self, min_score: int | None = None) -> _Subscriber:
+        subscriber = _Subscriber(self._queue_size, min_score)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event: dict):
+        """
+        Публикует событие из любого потока (sync-маршруты выполняются в threadpool).
+        При bridge=postgres - NOTIFY, событие вернется всем воркерам через LISTEN.
+        Если событие отправить не удалось, подписчики получают resync и
+        перечитывают список, а не пропускают заявку молча.
+        """
+        with self._counters_lock:
+            self.published += 1
+        if self.bridge != "postgres":
+            self._dispatch_threadsafe(event)
+            return
+        try:
+            self._notify(event)
+            return
+        except Exception:
+            # Заявка уже сохранена; потерянное уведомление не должно ронять запрос
+            logger.exception("Failed to publish application event, sending resync")
+        with self._counters_lock:
+            self.resyncs_published += 1
+        try:
+            self._notify(RESYNC_EVENT)
+        except Exception:
+            # БД недоступна: хотя бы подписчики этого воркера перечитают список
+            self._dispatch_threadsafe(RESYNC_EVENT)
+
+    def _notify(self, event: dict):
+        payload = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        if len(payload.encode()) > NOTIFY_MAX_PAYLOAD:
+            raise ValueError(f"Event payload of {len(payload.encode())} bytes exceeds the NOTIFY limit")
+        with engine.begin() as conn:
+            conn.execute(_NOTIFY_SQL, {"channel": APPLICATION_EVENTS_CHANNEL, "payload": payload})
+
+    def _dispatch_threadsafe(self, event: dict):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: dict):
+        """Раскладывает событие по очередям; выполняется в event loop"""
+        delivered = 0
+        for subscriber in list(self._subscribers):
+            if not subscriber.accepts(event):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                with self._counters_lock:
+                    self.disconnected_slow += 1
+                self._close(subscriber)
+        with self._counters_lock:
+            self.delivered += delivered
+
+    def _close(self, subscriber: _Subscriber):
+        """Отключает подписчика: очередь очищается, None завершает его поток"""
+        self._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed application event: %r", payload[:200])
+            return
+        self._dispatch(event)
+
+    async def _listen(self):
+        """LISTEN на канале событий с переподключением; после разрыва подписчики получают resync"""
+        delay = 1.0
+        reconnected = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    user=POSTGRES_USER, password=POSTGRES_PASSWORD,
+                    host=POSTGRES_HOST, port=int(POSTGRES_PORT), database=POSTGRES_DB,
+                )
+                await connection.add_listener(APPLICATION_EVENTS_CHANNEL, self._on_notification)
+                if reconnected:
+                    self._dispatch(RESYNC_EVENT)
+                delay = 1.0
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await closed.wait()
+                logger.warning("Application events listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Application events listener failed, retrying in %.0fs", delay)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            reconnected = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            return {
+                "bridge": self.bridge,
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "delivered": self.delivered,
+                "disconnected_slow": self.disconnected_slow,
+                "resyncs_published": self.resyncs_published,
+                "listening": self._listener is not None and not self._listener.done(),
+            }
+
+
+def format_sse(event: dict) -> str:
+    """Событие в формате text/event-stream (id - id заявки, если есть)"""
+    lines = [f"event: {event['type']}"]
+    application = event.get("application")
+    if application is not None:
+        lines.append(f"id: {application['id']}")
+    lines.append(f"data: {json.dumps(event, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_events(hub: ApplicationEventHub, subscriber: _Subscriber, heartbeat: float = APPLICATION_EVENTS_HEARTBEAT):
+    """Генератор тела ответа SSE: события подписчика и heartbeat; отписывается при выходе"""
+    try:
+        # Сразу отдаем первые байты: клиент видит, что подписка установлена
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event is None:
+                return
+            yield format_sse(event)
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+application_events = ApplicationEventHub(APPLICATION_EVENTS_BRIDGE, APPLICATION_EVENTS_QUEUE_SIZE)
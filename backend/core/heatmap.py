@@ -0,0 +1,36 @@
+"""
+Heatmap курсора в виде сетки фиксированного размера.
+
+Точки раскладываются по ячейкам сетки HEATMAP_GRID_WIDTH x HEATMAP_GRID_HEIGHT
+в момент приема метрик; сетки хранятся по часам (таблица heatmap_cells) и
+складываются при чтении, поэтому стоимость запроса не зависит от числа событий.
+Координаты за пределами HEATMAP_MAX_X x HEATMAP_MAX_Y попадают в крайние ячейки.
+"""
+import os
+from collections import Counter
+
+HEATMAP_GRID_WIDTH = int(os.getenv("HEATMAP_GRID_WIDTH", "64"))
+HEATMAP_GRID_HEIGHT = int(os.getenv("HEATMAP_GRID_HEIGHT", "64"))
+HEATMAP_MAX_X = int(os.getenv("HEATMAP_MAX_X", "1920"))
+HEATMAP_MAX_Y = int(os.getenv("HEATMAP_MAX_Y", "1080"))
+
+
+def cell_of(x: int, y: int) -> tuple[int, int]:
+    """Ячейка сетки для точки (x, y) в пикселях окна"""
+    cell_x = min(max(x, 0) * HEATMAP_GRID_WIDTH // HEATMAP_MAX_X, HEATMAP_GRID_WIDTH - 1)
+    cell_y = min(max(y, 0) * HEATMAP_GRID_HEIGHT // HEATMAP_MAX_Y, HEATMAP_GRID_HEIGHT - 1)
+    return cell_x, cell_y
+
+
+def bin_points(points) -> Counter:
+    """Counter {(cell_x, cell_y): количество точек}"""
+    return Counter(cell_of(x, y) for x, y in points)
+
+
+def dense_grid(cells) -> list[list[int]]:
+    """[(cell_x, cell_y, hits), ...] -> матрица counts[y][x]"""
+    grid = [[0] * HEATMAP_GRID_WIDTH for _ in range(HEATMAP_GRID_HEIGHT)]
+    for cell_x, cell_y, hits in cells:
+        if 0 <= cell_x < HEATMAP_GRID_WIDTH and 0 <= cell_y < HEATMAP_GRID_HEIGHT:
+            grid[cell_y][cell_x] += int(hits)
+    return grid
@@ -0,0 +1,99 @@
+"""
+Кэш готовых JSON-ответов публичных эндпоинтов с валидаторами HTTP.
+
+Список услуг читает каждая загрузка лендинга, а меняется он только из
+админ-панели. Сериализованный ответ хранится в памяти процесса вместе с ETag
+и Last-Modified и сбрасывается обработчиками create/update/delete. Запросы с
+совпадающим If-None-Match / If-Modified-Since получают 304 без тела.
+
+Сброс действует только в том процессе, который обработал изменение, поэтому
+запись живет не дольше ttl секунд: остальные воркеры увидят изменение не
+позже чем через ttl.
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+PUBLIC_CACHE_TTL = float(os.getenv("PUBLIC_CACHE_TTL", "60"))
+# Сколько секунд nginx может отдавать ответ из своего кэша (X-Accel-Expires)
+PUBLIC_PROXY_CACHE_SECONDS = int(os.getenv("PUBLIC_PROXY_CACHE_SECONDS", "5"))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: datetime
+    expires_at: float
+
+
+class ResponseCache:
+    """Ключ -> сериализованный ответ; invalidate() сбрасывает все ключи"""
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._entries: dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+        self._changed_at = datetime.now(timezone.utc)
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            return entry
+
+    def put(self, key: str, body: bytes, last_modified: datetime | None) -> CachedResponse:
+        with self._lock:
+            # После удаления максимум updated_at может уменьшиться, поэтому
+            # Last-Modified не бывает раньше последнего сброса
+            candidates = [self._changed_at] + ([last_modified] if last_modified else [])
+            entry = CachedResponse(
+                body=body,
+                etag='"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest(),
+                last_modified=max(candidates).replace(microsecond=0),
+                expires_at=time.monotonic() + self._ttl,
+            )
+            if self._ttl > 0:
+                self._entries[key] = entry
+            return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._changed_at = datetime.now(timezone.utc)
+
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or entry.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    """200 с телом из кэша или 304, если у клиента актуальная копия"""
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        # Браузер всегда перепроверяет (дешевый 304), nginx держит копию
+        # PUBLIC_PROXY_CACHE_SECONDS секунд (X-Accel-Expires главнее Cache-Control)
+        "Cache-Control": "public, no-cache",
+        "X-Accel-Expires": str(PUBLIC_PROXY_CACHE_SECONDS),
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,185 @@
+"""
+Буферизованная запись поведенческих метрик.
+
+Beacon шлет события каждую секунду с каждой открытой вкладки, поэтому в режиме
+buffered события складываются в ограниченную очередь в памяти и пишутся в БД
+пачками: когда набралось METRICS_BATCH_SIZE событий или прошло
+METRICS_FLUSH_INTERVAL секунд. Переполненная очередь отклоняет события
+(счетчик rejected), при остановке процесса очередь дописывается в БД.
+
+Пачка, которую не удалось записать (перезапуск БД, таймаут пула), повторяется
+до METRICS_FLUSH_RETRIES раз с растущей паузой; пока поток ждет, очередь
+продолжает принимать события в пределах METRICS_QUEUE_SIZE. Пачка, не
+записанная и после повторов, учитывается в dropped.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from core.instrumentation import INGEST_EVENTS, INGEST_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+METRICS_INGEST_MODE = os.getenv("METRICS_INGEST_MODE", "sync")  # sync | buffered
+METRICS_QUEUE_SIZE = int(os.getenv("METRICS_QUEUE_SIZE", "20000"))
+METRICS_BATCH_SIZE = int(os.getenv("METRICS_BATCH_SIZE", "500"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))
+METRICS_FLUSH_RETRIES = int(os.getenv("METRICS_FLUSH_RETRIES", "5"))
+# Пауза перед первым повтором, секунд; удваивается до FLUSH_RETRY_MAX_DELAY
+METRICS_FLUSH_RETRY_DELAY = float(os.getenv("METRICS_FLUSH_RETRY_DELAY", "0.5"))
+FLUSH_RETRY_MAX_DELAY = 8.0
+
+
+class MetricsBuffer:
+    """Ограниченная очередь событий с фоновым потоком, пишущим их пачками"""
+
+    def __init__(
+        self, writer, maxsize: int, batch_size: int, flush_interval: float,
+        retries: int = METRICS_FLUSH_RETRIES, retry_delay: float = METRICS_FLUSH_RETRY_DELAY,
+    ):
+        self._writer = writer
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._stopping = threading.Event()
+        self._thread = None
+        self._counters_lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.retried = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_flush_at = None
+
+    def submit(self, rows: list[dict]) -> bool:
+        """
+        Ставит события в очередь. Возвращает False, если места не хватило:
+        события, не попавшие в очередь, учитываются в rejected.
+        """
+        for index, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                with self._counters_lock:
+                    self.accepted += index
+                    self.rejected += len(rows) - index
+                INGEST_EVENTS.labels("accepted").inc(index)
+                INGEST_EVENTS.labels("rejected").inc(len(rows) - index)
+                INGEST_QUEUE_DEPTH.set(self._queue.qsize())
+                return False
+        with self._counters_lock:
+            self.accepted += len(rows)
+        INGEST_EVENTS.labels("accepted").inc(len(rows))
+        INGEST_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Останавливает поток и дописывает в БД все, что осталось в очереди"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            return {
+                "mode": METRICS_INGEST_MODE,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "written": self.written,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "last_flush_at": self.last_flush_at,
+            }
+
+    def _take_batch(self) -> list[dict]:
+        """Ждет первое событие, затем добирает пачку до размера или до конца интервала"""
+        batch = []
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stopping.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        INGEST_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: list[dict]):
+        # Писатель атомарен (одна транзакция), поэтому пачку можно повторить целиком
+        delay = self._retry_delay
+        for attempt in range(self._retries + 1):
+            try:
+                self._writer(batch)
+                break
+            except Exception:
+                if attempt == self._retries:
+                    logger.exception(
+                        "Dropped %s behavior metrics events after %s attempts", len(batch), attempt + 1,
+                    )
+                    with self._counters_lock:
+                        self.dropped += len(batch)
+                    INGEST_EVENTS.labels("dropped").inc(len(batch))
+                    return
+                logger.warning(
+                    "Failed to write %s behavior metrics events, retrying in %.1fs",
+                    len(batch), delay, exc_info=True,
+                )
+                with self._counters_lock:
+                    self.retried += len(batch)
+                INGEST_EVENTS.labels("retried").inc(len(batch))
+                time.sleep(delay)
+                delay = min(delay * 2, FLUSH_RETRY_MAX_DELAY)
+        INGEST_EVENTS.labels("written").inc(len(batch))
+        with self._counters_lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.last_flush_at = datetime.now(timezone.utc)
+
+
+def _write_metrics(rows: list[dict]):
+    from core.database import SessionLocal
+    from models.behavior_sessions import BehaviorSessionCRUD
+
+    # Отправки с session_id сливаются в строки визитов, остальные пишутся как есть -
+    # одной транзакцией, чтобы повтор пачки не слил визиты дважды
+    beacons = [row for row in rows if "session_id" in row]
+    events = [row for row in rows if "session_id" not in row]
+    db = SessionLocal()
+    try:
+        BehaviorSessionCRUD.upsert_many(db, beacons, events)
+    finally:
+        db.close()
+
+
+metrics_buffer = MetricsBuffer(
+    writer=_write_metrics,
+    maxsize=METRICS_QUEUE_SIZE,
+    batch_size=METRICS_BATCH_SIZE,
+    flush_interval=METRICS_FLUSH_INTERVAL,
+)
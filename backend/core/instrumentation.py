@@ -0,0 +1,247 @@
+"""
+Метрики производительности запросов в формате Prometheus (GET /metrics).
+
+RequestMetricsMiddleware считает для каждого маршрута (шаблон пути, а не URL)
+число запросов, гистограмму длительности и запросы в обработке. Во время
+запроса события SQLAlchemy (instrument_engine) копят в contextvar число SQL
+запросов и время в БД - они попадают в гистограммы на маршрут и в лог
+медленных запросов (дольше SLOW_REQUEST_THRESHOLD_MS) с разбивкой по
+тексту SQL: N+1 и commit на каждую строку видны как один запрос x N.
+
+Пулы соединений (TimedQueuePool) измеряют ожидание свободного соединения.
+
+При нескольких воркерах (serve.py) каждый процесс пишет метрики в файлы
+PROMETHEUS_MULTIPROC_DIR, а /metrics любого воркера отдает сумму по всем.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+# Сколько самых дорогих SQL выводить в лог медленного запроса
+SLOW_REQUEST_TOP_QUERIES = int(os.getenv("SLOW_REQUEST_TOP_QUERIES", "5"))
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Запросы вне HTTP-запроса (фоновый пересчет, запись буфера метрик)
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency (streaming responses: until the stream ends)",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed", ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500, float("inf")),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request", ["method", "route"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total", "SQL statements executed", ["engine", "route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement latency", ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float("inf")),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a connection from the pool", ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, float("inf")),
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections checked out of the pool", ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replication lag of the read replica as last measured by the worker",
+    multiprocess_mode="livemax",
+)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions_total", "Read-only sessions by database and reason (replica configured)", ["target", "reason"],
+)
+INGEST_QUEUE_DEPTH = Gauge(
+    "metrics_ingest_queue_depth", "Behavior metrics events waiting in the ingest buffer",
+    multiprocess_mode="livesum",
+)
+INGEST_EVENTS = Counter(
+    "metrics_ingest_events_total", "Behavior metrics events by outcome", ["outcome"],
+)
+
+
+@dataclass
+class RequestDbStats:
+    """SQL одного HTTP-запроса: число, время и разбивка по тексту запроса"""
+    scope: dict
+    queries: int = 0
+    seconds: float = 0.0
+    statements: dict = field(default_factory=dict)  # SQL -> [число, секунды]
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.seconds += seconds
+        entry = self.statements.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def top(self, limit: int) -> list[tuple[str, int, float]]:
+        rows = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [(" ".join(sql.split())[:200], count, seconds) for sql, (count, seconds) in rows]
+
+
+_request_db: ContextVar[RequestDbStats | None] = ContextVar("request_db", default=None)
+
+
+def instrument_engine(engine, name: str):
+    """Подписывает sync engine (для async - async_engine.sync_engine) на события выполнения SQL"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_DURATION.labels(name).observe(seconds)
+        stats = _request_db.get()
+        if stats is None:
+            DB_QUERIES.labels(name, BACKGROUND_ROUTE).inc()
+            return
+        DB_QUERIES.labels(name, route_label(stats.scope)).inc()
+        stats.record(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, измеряющий ожидание соединения (имя engine - pool_logging_name)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.logging_name or "default").observe(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool, TimedQueuePool):
+    """То же для async engine"""
+
+
+def instrument_pool(engine, name: str):
+    """Число выданных соединений пула (для async - async_engine.sync_engine)"""
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_IN_USE.labels(name).inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_IN_USE.labels(name).dec()
+
+
+def route_label(scope) -> str:
+    """Шаблон пути маршрута (/applications/{id}); известен после роутинга"""
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+# Маршруты с бесконечным потоком ответа не считаются медленными
+_STREAMING_ROUTES = {"/applications/stream"}
+
+
+class RequestMetricsMiddleware:
+    """
+    Чистый ASGI middleware: в отличие от BaseHTTPMiddleware не мешает
+    потоковым ответам (SSE, экспорт). Длительность потокового ответа -
+    до конца потока. Маршрут становится известен только внутри приложения,
+    поэтому запросы в обработке считаются по методу.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = RequestDbStats(scope)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _request_db.set(stats)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            in_progress.dec()
+            _request_db.reset(token)
+            route = route_label(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(duration)
+            DB_QUERIES_PER_REQUEST.labels(method, route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(method, route).observe(stats.seconds)
+            if duration * 1000 >= SLOW_REQUEST_THRESHOLD_MS and route not in _STREAMING_ROUTES:
+                _log_slow_request(method, route, status, duration, stats)
+
+
+def _log_slow_request(method, route, status, duration, stats: RequestDbStats):
+    breakdown = "; ".join(
+        f"{count}x {seconds * 1000:.1f} ms: {sql}" for sql, count, seconds in stats.top(SLOW_REQUEST_TOP_QUERIES)
+    )
+    logger.warning(
+        "Slow request %s %s -> %s in %.0f ms, %s queries in %.0f ms [%s]",
+        method, route, status, duration * 1000, stats.queries, stats.seconds * 1000, breakdown or "no queries",
+    )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Текст Prometheus; при нескольких воркерах - сумма по всем процессам"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_stopped():
+    """Убирает live-метрики (в обработке, соединения, очередь) остановленного воркера"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,47 @@
+"""
+Курсорная (keyset) пагинация: токен курсора хранит ключ сортировки последней
+строки страницы, следующая страница начинается строго после него.
+
+Токен приходит от клиента, поэтому значения проверяются по типам колонок
+(is_int32, is_float8) до построения запроса: иначе подделанный токен
+(true, 1e400, 2**70) дойдет до драйвера и вернет 500 вместо 400.
+"""
+import base64
+import json
+import math
+
+# Диапазон INTEGER (SERIAL) PostgreSQL
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+
+def encode_cursor(*values) -> str:
+    """Кодирует ключ сортировки последней строки в URL-safe токен"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> list:
+    """
+    Декодирует токен курсора в список из size значений.
+    Бросает ValueError, если токен поврежден или подделан.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def is_int32(value) -> bool:
+    """Значение колонки INTEGER: int (не bool) в диапазоне int32"""
+    return type(value) is int and INT32_MIN <= value <= INT32_MAX
+
+
+def is_float8(value) -> bool:
+    """Значение колонки double precision: конечное число (не bool)"""
+    if type(value) is int:
+        return is_int32(value)
+    return type(value) is float and math.isfinite(value)
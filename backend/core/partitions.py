@@ -0,0 +1,227 @@
+"""
+Секции behavior_metrics: создание заранее и хранение удалением целых секций.
+
+Таблица секционирована по created_at (RANGE) на дни или месяцы
+(METRICS_PARTITION_INTERVAL). Фоновая задача раз в METRICS_PARTITION_CHECK_INTERVAL
+секунд:
+- создает секции на METRICS_PARTITIONS_AHEAD периодов вперед;
+- удаляет секции, целиком старше METRICS_RAW_RETENTION_DAYS (DROP TABLE вместо
+  DELETE: без VACUUM и раздувания таблицы), старые строки секции по умолчанию
+  и визиты behavior_sessions (models/behavior_sessions.py).
+
+Строки, для которых секции еще нет (задача не работала дольше запаса вперед,
+сдвиг часов), попадают в behavior_metrics_default; при создании секции они
+переносятся в нее. Статистика читается из агрегатов (core/rollups.py),
+поэтому удаление сырых событий ее не меняет.
+
+Разовый запуск без backend (в том числе секции для загрузки старых событий):
+    cd backend && python -m core.partitions --from 2026-01-01
+"""
+import argparse
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+
+from core.database import engine
+from core.rollups import hour_bucket
+from models.behavior_metrics import BehaviorMetricsPartitionCRUD
+
+logger = logging.getLogger(__name__)
+
+METRICS_PARTITION_INTERVAL = os.getenv("METRICS_PARTITION_INTERVAL", "day")  # day | month
+METRICS_PARTITIONS_AHEAD = int(os.getenv("METRICS_PARTITIONS_AHEAD", "7"))
+METRICS_PARTITION_CHECK_INTERVAL = float(os.getenv("METRICS_PARTITION_CHECK_INTERVAL", "3600"))
+# 0 - хранить сырые события бессрочно
+METRICS_RAW_RETENTION_DAYS = int(os.getenv("METRICS_RAW_RETENTION_DAYS", "90"))
+PRUNE_CHUNK_SIZE = 10000
+
+if METRICS_PARTITION_INTERVAL not in ("day", "month"):
+    raise ValueError(f"METRICS_PARTITION_INTERVAL must be day or month, got {METRICS_PARTITION_INTERVAL!r}")
+
+# Ключ advisory lock: при нескольких воркерах секции обслуживает только один
+PARTITION_LOCK_KEY = 7_340_004
+
+_stop_requested = threading.Event()
+_job_thread: threading.Thread | None = None
+
+
+def period_start(moment: datetime, interval: str = METRICS_PARTITION_INTERVAL) -> datetime:
+    """Начало дня или месяца (UTC), к которому относится moment"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    day = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if interval == "day" else day.replace(day=1)
+
+
+def next_period(start: datetime, interval: str = METRICS_PARTITION_INTERVAL) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def uncovered(start: datetime, end: datetime, ranges: list[tuple]) -> list[tuple[datetime, datetime]]:
+    """
+    Части [start, end), не занятые существующими секциями (lower, upper; None -
+    без границы). Секции другого размера (смена METRICS_PARTITION_INTERVAL,
+    старая таблица после миграции) не пересекаются с новыми.
+    """
+    gaps = []
+    cursor = start
+    for lower, upper in sorted(ranges, key=lambda bounds: bounds[0] or datetime.min.replace(tzinfo=timezone.utc)):
+        if upper is not None and upper <= cursor:
+            continue
+        if lower is not None and lower >= end:
+            break
+        if lower is not None and lower > cursor:
+            gaps.append((cursor, lower))
+        if upper is None:
+            return gaps
+        cursor = upper
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def ensure_partitions(start: datetime | None = None, ahead: int = METRICS_PARTITIONS_AHEAD) -> list[str]:
+    """
+    Создает секции от периода, в который попадает start (по умолчанию - текущий),
+    до ahead периодов вперед. Каждая секция - отдельная короткая транзакция.
+    Возвращает имена созданных секций.
+    """
+    with engine.begin() as conn:
+        if not BehaviorMetricsPartitionCRUD.is_partitioned(conn):
+            logger.warning("behavior_metrics is not partitioned, apply scripts/partition_behavior_metrics.sql")
+            return []
+        BehaviorMetricsPartitionCRUD.create_default(conn)
+        ranges = [(row.lower, row.upper) for row in BehaviorMetricsPartitionCRUD.get_all(conn) if not row.is_default]
+
+    now = datetime.now(timezone.utc)
+    last = period_start(now)
+    for _ in range(ahead):
+        last = next_period(last)
+
+    created = []
+    period = period_start(start or now)
+    while period <= last:
+        end = next_period(period)
+        for gap_start, gap_end in uncovered(period, end, ranges):
+            with engine.begin() as conn:
+                name, moved = BehaviorMetricsPartitionCRUD.attach(conn, gap_start, gap_end)
+            ranges.append((gap_start, gap_end))
+            created.append(name)
+            if moved:
+                logger.warning("Moved %s rows from the default partition to %s", moved, name)
+        period = end
+    if created:
+        logger.info("Created behavior_metrics partitions: %s", ", ".join(created))
+    return created
+
+
+def apply_retention(retention_days: int = METRICS_RAW_RETENTION_DAYS) -> tuple[list[str], int]:
+    """
+    Удаляет сырые события старше retention_days: секции, целиком попадающие
+    в срок, - DROP TABLE, секцию по умолчанию (или таблицу до миграции) и
+    визиты behavior_sessions - DELETE короткими пачками. Агрегаты не трогаются.
+    Возвращает (удаленные секции, число строк, удаленных DELETE).
+    """
+    # Граница - начало часа: час самого старого оставшегося события хранится
+    # целиком, и core.rollups.backfill может его пересобрать
+    cutoff = hour_bucket(datetime.now(timezone.utc) - timedelta(days=retention_days))
+    with engine.connect() as conn:
+        partitioned = BehaviorMetricsPartitionCRUD.is_partitioned(conn)
+        partitions = BehaviorMetricsPartitionCRUD.get_all(conn) if partitioned else []
+
+    dropped = []
+    for partition in partitions:
+        if partition.is_default or partition.upper is None or partition.upper > cutoff:
+            continue
+        with engine.begin() as conn:
+            BehaviorMetricsPartitionCRUD.drop(conn, partition.name)
+        dropped.append(partition.name)
+    if dropped:
+        logger.info("Dropped expired behavior_metrics partitions: %s", ", ".join(dropped))
+
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            if partitioned:
+                count = BehaviorMetricsPartitionCRUD.delete_from_default(conn, cutoff, PRUNE_CHUNK_SIZE)
+            else:
+                count = conn.execute(text("""
+                    DELETE FROM behavior_metrics
+                    WHERE id IN (SELECT id FROM behavior_metrics WHERE created_at < :cutoff LIMIT :chunk)
+                """), {"cutoff": cutoff, "chunk": PRUNE_CHUNK_SIZE}).rowcount
+        deleted += count
+        if count < PRUNE_CHUNK_SIZE:
+            break
+
+    while True:
+        with engine.begin() as conn:
+            count = conn.execute(text("""
+                DELETE FROM behavior_sessions
+                WHERE session_id IN (
+                    SELECT session_id FROM behavior_sessions WHERE updated_at < :cutoff LIMIT :chunk
+                )
+            """), {"cutoff": cutoff, "chunk": PRUNE_CHUNK_SIZE}).rowcount
+        deleted += count
+        if count < PRUNE_CHUNK_SIZE:
+            return dropped, deleted
+
+
+def run_maintenance() -> bool:
+    """Создание секций и хранение; False, если обслуживание уже идет в другом процессе"""
+    with engine.connect() as lock_conn:
+        locked = lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": PARTITION_LOCK_KEY}).scalar()
+        if not locked:
+            return False
+        try:
+            ensure_partitions()
+            if METRICS_RAW_RETENTION_DAYS > 0:
+                apply_retention()
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PARTITION_LOCK_KEY})
+            lock_conn.commit()
+    return True
+
+
+def _run_job():
+    while True:
+        try:
+            run_maintenance()
+        except Exception:
+            # Например, lock_timeout при DDL: следующая попытка - через интервал
+            logger.exception("behavior_metrics partition maintenance failed")
+        if _stop_requested.wait(METRICS_PARTITION_CHECK_INTERVAL):
+            return
+
+
+def start_partition_job():
+    """Запускает обслуживание секций в фоновом потоке (сразу и затем по интервалу)"""
+    global _job_thread
+    if _job_thread is not None and _job_thread.is_alive():
+        return
+    _stop_requested.clear()
+    _job_thread = threading.Thread(target=_run_job, name="metrics-partitions", daemon=True)
+    _job_thread.start()
+
+
+def stop_partition_job(timeout: float = 10.0):
+    _stop_requested.set()
+    if _job_thread is not None:
+        _job_thread.join(timeout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Секции и хранение сырых поведенческих метрик")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="создать секции начиная с даты (YYYY-MM-DD)")
+    parser.add_argument("--no-prune", action="store_true", help="не удалять старые события")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = datetime.combine(args.start, time(), timezone.utc) if args.start else None
+    print(f"Created {len(ensure_partitions(start))} partitions")
+    if not args.no_prune and METRICS_RAW_RETENTION_DAYS > 0:
+        dropped, deleted = apply_retention()
+        print(f"Dropped {len(dropped)} partitions, deleted {deleted} rows")
@@ -0,0 +1,142 @@
+"""
+Хеширование паролей вне общего threadpool и ограничение попыток входа.
+
+bcrypt тратит 100-300 мс CPU на одну проверку. Если считать его прямо в
+маршруте, серия попыток входа занимает потоки threadpool FastAPI, и
+останавливаются все остальные sync-эндпоинты. Поэтому хеширование идет в
+отдельном пуле из PASSWORD_HASH_WORKERS потоков (bcrypt отпускает GIL), а
+очередь к нему ограничена PASSWORD_HASH_QUEUE задачами: когда пул занят,
+запрос сразу получает 429 и не ждет.
+
+Неудачные попытки входа считаются в памяти процесса отдельно по аккаунту и
+по IP в скользящем окне LOGIN_FAILURE_WINDOW секунд. Пока лимит исчерпан,
+логин отклоняется с 429 еще до проверки пароля.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+LOGIN_FAILURE_WINDOW = float(os.getenv("LOGIN_FAILURE_WINDOW", "300"))
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+# Порог числа ключей, после которого из счетчика вычищаются устаревшие
+_THROTTLE_SWEEP_THRESHOLD = 10000
+
+
+class PasswordPoolBusy(Exception):
+    """В пуле хеширования нет свободного места"""
+
+
+class PasswordHasher:
+    """Ограниченный пул потоков для bcrypt"""
+
+    def __init__(self, workers: int, queue_limit: int, rounds: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Выполняющиеся + ожидающие задачи
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._rounds = rounds
+        self._workers = workers
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(rounds=self._rounds))
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(bcrypt.checkpw, password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    async def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rounds": self._rounds,
+                "workers": self._workers,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+class LoginThrottle:
+    """Счетчик неудачных попыток входа в скользящем окне для каждого ключа"""
+
+    def __init__(self, limit: int, window: float):
+        self._limit = limit
+        self._window = window
+        self._failures: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: str) -> int:
+        """Через сколько секунд можно повторить попытку (0 - можно сейчас)"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(key)
+            if not failures:
+                return 0
+            self._expire(key, failures, now)
+            if len(failures) < self._limit:
+                return 0
+            return max(1, int(failures[0] + self._window - now) + 1)
+
+    def record_failure(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.setdefault(key, deque())
+            self._expire(key, failures, now)
+            failures.append(now)
+            self._failures[key] = failures
+            # Не держим больше limit отметок на ключ
+            while len(failures) > self._limit:
+                failures.popleft()
+            if len(self._failures) > _THROTTLE_SWEEP_THRESHOLD:
+                for stale_key, stale in list(self._failures.items()):
+                    self._expire(stale_key, stale, now)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def tracked_keys(self) -> int:
+        with self._lock:
+            return len(self._failures)
+
+    def _expire(self, key: str, failures: deque, now: float):
+        while failures and failures[0] <= now - self._window:
+            failures.popleft()
+        if not failures:
+            self._failures.pop(key, None)
+
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    queue_limit=PASSWORD_HASH_QUEUE,
+    rounds=BCRYPT_ROUNDS,
+)
+account_throttle = LoginThrottle(limit=LOGIN_MAX_FAILURES_PER_ACCOUNT, window=LOGIN_FAILURE_WINDOW)
+ip_throttle = LoginThrottle(limit=LOGIN_MAX_FAILURES_PER_IP, window=LOGIN_FAILURE_WINDOW)
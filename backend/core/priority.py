@@ -1,6 +1,182 @@
 """
 Алгоритм приоритизации заявок на основе бюджета, размера компании и срочности.
+
+Текстовые поля формы разбираются один раз при записи заявки в типизированные
+колонки (normalize_application): budget_min/budget_max, company_size_bucket,
+deadline_days и urgent_comment. Score считается только по ним
+(score_normalized) - это несколько целочисленных сравнений.
 """
+import re
+from enum import IntEnum
+
+# Версия алгоритма: увеличивайте при любом изменении правил подсчета.
+# Заявки со старой версией пересчитываются фоновой задачей (core/rescoring.py).
+# Версия 2: разбор в типизированные поля вместо поиска подстрок
+# (в версии 1 размер "150" совпадал с "50", а "1 000 000 ₽" не распознавался).
+PRIORITY_ALGORITHM_VERSION = 2
+
+# Правила подсчета. Из этих же таблиц генерируется SQL-функция priority_score()
+# (core/priority_sql.py), поэтому правила меняются только здесь.
+
+# Бюджет (вес 40%): пороги верхней границы бюджета (руб.) и баллы
+BUDGET_TIERS = ((5000000, 40), (1000000, 30), (500000, 20))
+BUDGET_DEFAULT_POINTS = 10
+# Множители сокращений ("500k", "5m", "1,5 млн"); длинные варианты раньше коротких
+BUDGET_MULTIPLIERS = (
+    ("млн", 1_000_000), ("mln", 1_000_000), ("тыс", 1_000),
+    ("m", 1_000_000), ("м", 1_000_000), ("k", 1_000), ("к", 1_000),
+)
+# Ограничение, чтобы любое разобранное значение помещалось в BIGINT
+BUDGET_MAX_VALUE = 10 ** 15
+
+
+class CompanySize(IntEnum):
+    """Корзина численности сотрудников (SMALLINT в applications.company_size_bucket)"""
+    UNKNOWN = 0
+    MICRO = 1       # 1-9
+    SMALL = 2       # 10-49
+    MEDIUM = 3      # 50-99
+    LARGE = 4       # 100-499
+    ENTERPRISE = 5  # 500+
+
+
+# Размер компании (вес 30%): нижние границы корзин; для диапазона из формы
+# ("10-50", "500+") берется его нижняя граница
+COMPANY_SIZE_BUCKETS = (
+    (500, CompanySize.ENTERPRISE),
+    (100, CompanySize.LARGE),
+    (50, CompanySize.MEDIUM),
+    (10, CompanySize.SMALL),
+    (1, CompanySize.MICRO),
+)
+COMPANY_SIZE_POINTS = {
+    CompanySize.ENTERPRISE: 30,
+    CompanySize.LARGE: 20,
+    CompanySize.MEDIUM: 15,
+}
+COMPANY_SIZE_DEFAULT_POINTS = 5
+
+# Срочность (вес 30%): срок в днях или "срочно" в комментарии
+DEADLINE_UNITS = (
+    ("дн", 1), ("день", 1), ("day", 1),
+    ("недел", 7), ("week", 7),
+    ("месяц", 30), ("month", 30),
+    ("год", 365), ("лет", 365), ("year", 365),
+)
+# Срок "как можно скорее" без числа - 0 дней
+DEADLINE_ASAP_MARKERS = ("срочно", "asap")
+URGENT_COMMENT_MARKERS = ("срочно",)
+URGENT_DEADLINE_DAYS = 21
+SOON_DEADLINE_DAYS = 365
+URGENT_POINTS = 30
+MONTH_POINTS = 15
+URGENCY_DEFAULT_POINTS = 5
+
+# Число с необязательной дробной частью и сокращением: "5", "1,5 млн", "500k".
+# Сокращение - отдельное слово ("100 мест" - это не 100 млн)
+_BUDGET_AMOUNT = re.compile(
+    r"([0-9]+(?:[.,][0-9]+)?)\s*(?:("
+    + "|".join(suffix for suffix, _ in BUDGET_MULTIPLIERS)
+    + r")(?![a-zа-яё]))?"
+)
+# Разделители разрядов: "1 000 000", "1,000,000", неразрывный пробел
+_THOUSANDS_SEPARATOR = re.compile(r"(?<=[0-9])[ \u00a0,](?=[0-9]{3}(?![0-9]))")
+_INTEGER = re.compile(r"[0-9]+")
+_MULTIPLIERS = dict(BUDGET_MULTIPLIERS)
+
+
+def _contains_any(value: str, markers) -> bool:
+    return any(marker in value for marker in markers)
+
+
+def parse_budget(budget: str | None) -> tuple[int | None, int | None]:
+    """
+    Строка бюджета -> (budget_min, budget_max) в рублях.
+    "500000-1000000" -> (500000, 1000000), "5m" -> (5000000, 5000000),
+    нераспознанная строка -> (None, None).
+    """
+    text = _THOUSANDS_SEPARATOR.sub("", (budget or "").lower())
+    amounts = []
+    for number, suffix in _BUDGET_AMOUNT.findall(text):
+        value = float(number.replace(",", ".")) * _MULTIPLIERS.get(suffix, 1)
+        # Ограничение до int(): число из 309+ цифр дает float inf
+        amounts.append(int(min(value, BUDGET_MAX_VALUE)))
+    amounts = [amount for amount in amounts[:2] if amount > 0]
+    if not amounts:
+        return None, None
+    return min(amounts), max(amounts)
+
+
+def parse_company_size(company_size: str | None) -> CompanySize:
+    """Строка размера компании -> корзина по первому (нижнему) числу"""
+    match = _INTEGER.search(company_size or "")
+    if match is None:
+        return CompanySize.UNKNOWN
+    employees = int(match.group())
+    for lower_bound, bucket in COMPANY_SIZE_BUCKETS:
+        if employees >= lower_bound:
+            return bucket
+    return CompanySize.UNKNOWN
+
+
+def parse_deadline_days(deadline: str | None) -> int | None:
+    """
+    Срок -> число дней по первому числу и первой единице измерения.
+    "2 недели" -> 14, "2-3 месяца" -> 60, "неделя" -> 7, "asap" -> 0,
+    без единицы измерения -> None.
+    """
+    text = (deadline or "").lower()
+    days_per_unit = next((days for marker, days in DEADLINE_UNITS if marker in text), None)
+    if days_per_unit is None:
+        return 0 if _contains_any(text, DEADLINE_ASAP_MARKERS) else None
+    match = _INTEGER.search(text)
+    count = min(int(match.group()), 100_000) if match else 1
+    return count * days_per_unit
+
+
+def is_urgent_comment(comments: str | None) -> bool:
+    return _contains_any((comments or "").lower(), URGENT_COMMENT_MARKERS)
+
+
+def normalize_application(budget, company_size, deadline, comments) -> dict:
+    """Типизированные колонки заявки (разбор текстовых полей формы)"""
+    budget_min, budget_max = parse_budget(budget)
+    return {
+        "budget_min": budget_min,
+        "budget_max": budget_max,
+        "company_size_bucket": int(parse_company_size(company_size)),
+        "deadline_days": parse_deadline_days(deadline),
+        "urgent_comment": is_urgent_comment(comments),
+    }
+
+
+def score_normalized(budget_max, company_size_bucket, deadline_days, urgent_comment) -> int:
+    """
+    Score (0-100) по типизированным полям:
+    - Бюджет (40% веса) - по верхней границе
+    - Размер компании (30% веса) - по корзине
+    - Срочность (30% веса) - по сроку в днях или "срочно" в комментарии
+    """
+    budget_points = BUDGET_DEFAULT_POINTS
+    if budget_max is not None:
+        for threshold, points in BUDGET_TIERS:
+            if budget_max >= threshold:
+                budget_points = points
+                break
+
+    if urgent_comment or (deadline_days is not None and deadline_days <= URGENT_DEADLINE_DAYS):
+        urgency_points = URGENT_POINTS
+    elif deadline_days is not None and deadline_days <= SOON_DEADLINE_DAYS:
+        urgency_points = MONTH_POINTS
+    else:
+        urgency_points = URGENCY_DEFAULT_POINTS
+
+    return (
+        budget_points
+        + COMPANY_SIZE_POINTS.get(company_size_bucket, COMPANY_SIZE_DEFAULT_POINTS)
+        + urgency_points
+    )
+
 
 def calculate_priority_score(application) -> int:
     """
@@ -8,69 +184,71 @@ def calculate_priority_score(application) -> int:
     - Бюджет (40% веса)
     - Размер компании (30% веса)
     - Срочность (30% веса)
-    
+
     Возвращает: score (0-100)
     """
-    score = 0
-    budget = (application.budget or "").lower()
-    company_size = (application.company_size or "").lower()
-    deadline = (application.deadline or "").lower()
-    comments = (application.comments or "").lower()
-    
-    # Бюджет (вес 40%)
-    # Пытаемся извлечь числовое значение бюджета
-    budget_num = None
-    try:
-        # Убираем все нецифровые символы, кроме дефисов и пробелов
-        budget_clean = ''.join(c for c in budget if c.isdigit() or c in '- ')
-        # Пытаемся найти диапазон (например, "500000-1000000")
-        if '-' in budget_clean:
-            parts = budget_clean.split('-')
-            if len(parts) == 2:
-                budget_num = max(int(parts[0].strip()), int(parts[1].strip()))
-        else:
-            # Одно число
-            budget_num = int(budget_clean.strip())
-    except (ValueError, AttributeError):
-        pass
-    
-    if budget_num:
-        if budget_num >= 5000000:
-            score += 40
-        elif budget_num >= 1000000:
-            score += 30
-        elif budget_num >= 500000:
-            score += 20
-        else:
-            score += 10
-    else:
-        # Fallback на строковую проверку для форматов типа "5m", "500k"
-        if '5000000' in budget or '5m' in budget or '10000000' in budget or '10m' in budget:
-            score += 40
-        elif '1000000' in budget or '1m' in budget:
-            score += 30
-        elif '500000' in budget or '500k' in budget:
-            score += 20
+    fields = normalize_application(
+        application.budget, application.company_size, application.deadline, application.comments
+    )
+    return score_normalized(
+        fields["budget_max"], fields["company_size_bucket"], fields["deadline_days"], fields["urgent_comment"]
+    )
+
+
+def _as_column(values):
+    """Arrow-массивы отдают элементы как скаляры Arrow, приводим их к Python-значениям"""
+    if hasattr(values, "to_pylist"):
+        return values.to_pylist()
+    return values
+
+
+def normalize_applications(budgets, company_sizes, deadlines, comments) -> list[dict]:
+    """
+    Пакетный вариант normalize_application для колонок значений одинаковой длины
+    (list, tuple, массивы NumPy/Arrow). Каждый словарь дополнительно содержит
+    priority_score.
+
+    Бюджет, размер компании и срок выбираются из небольшого набора вариантов формы,
+    поэтому каждое уникальное значение разбирается один раз, остальные берутся из кэша.
+    """
+    budget_cache = {}
+    size_cache = {}
+    deadline_cache = {}
+    rows = []
+
+    for budget, company_size, deadline, comment in zip(
+        _as_column(budgets), _as_column(company_sizes), _as_column(deadlines), _as_column(comments),
+        strict=True,
+    ):
+        budget_range = budget_cache.get(budget)
+        if budget_range is None:
+            budget_range = budget_cache[budget] = parse_budget(budget)
+
+        bucket = size_cache.get(company_size)
+        if bucket is None:
+            bucket = size_cache[company_size] = int(parse_company_size(company_size))
+
+        if deadline in deadline_cache:
+            deadline_days = deadline_cache[deadline]
         else:
-            score += 10
-    
-    # Размер компании (вес 30%)
-    if '500+' in company_size or '500' in company_size:
-        score += 30
-    elif '100-500' in company_size or '100' in company_size:
-        score += 20
-    elif '50-100' in company_size or '50' in company_size:
-        score += 15
-    else:
-        score += 5
-    
-    # Срочность (вес 30%)
-    # Проверяем наличие слов "неделя", "недел", "week" или "срочно"
-    if 'недел' in deadline or 'срочно' in comments or 'week' in deadline:
-        score += 30
-    elif 'месяц' in deadline or 'month' in deadline:
-        score += 15
-    else:
-        score += 5
-    
-    return score
+            deadline_days = deadline_cache[deadline] = parse_deadline_days(deadline)
+
+        urgent = is_urgent_comment(comment)
+        rows.append({
+            "budget_min": budget_range[0],
+            "budget_max": budget_range[1],
+            "company_size_bucket": bucket,
+            "deadline_days": deadline_days,
+            "urgent_comment": urgent,
+            "priority_score": score_normalized(budget_range[1], bucket, deadline_days, urgent),
+        })
+
+    return rows
+
+
+def calculate_priority_scores(budgets, company_sizes, deadlines, comments) -> list[int]:
+    """
+    Пакетный вариант calculate_priority_score. Для любых входов результат
+    поэлементно совпадает со скалярной функцией.
+    """
+    return [row["priority_score"] for row in normalize_applications(budgets, company_sizes, deadlines, comments)]
@@ -0,0 +1,123 @@
+"""
+Генерация PostgreSQL-функции priority_score() из правил core/priority.py.
+
+SQL-версия алгоритма не пишется руками: она собирается из тех же таблиц
+правил, что и Python-функция score_normalized, и устанавливается при старте
+backend. Функция считает score по типизированным колонкам (budget_max,
+company_size_bucket, deadline_days, urgent_comment) - только сравнения чисел.
+
+Разбор текстовых полей формы выполняет только backend (core/priority.py).
+Триггер на applications пересчитывает score при правке типизированных колонок
+прямо в БД, а при правке текстовых полей помечает строку устаревшей
+(priority_version = 0): ее разберет фоновый пересчет (core/rescoring.py).
+Строки, вставленные в обход backend (seed-скрипты, COPY), тоже получают
+версию 0. Пересчет проверяет такие строки каждые RESCORE_CHECK_INTERVAL
+секунд, так что они получают score без перезапуска backend.
+
+Сохранить SQL в файл:
+    cd backend && python -m core.priority_sql > ../scripts/priority_score_function.sql
+"""
+from sqlalchemy import text
+
+from core import priority
+
+# Ключ advisory lock: CREATE OR REPLACE из нескольких воркеров одновременно
+# может упасть с "tuple concurrently updated"
+PRIORITY_FUNCTION_LOCK_KEY = 7_340_002
+
+
+def _budget_case() -> str:
+    tiers = "\n".join(
+        f"            WHEN budget_max >= {threshold} THEN {points}"
+        for threshold, points in priority.BUDGET_TIERS
+    )
+    return f"""        CASE
+{tiers}
+            ELSE {priority.BUDGET_DEFAULT_POINTS}
+        END"""
+
+
+def _company_size_case() -> str:
+    rules = "\n".join(
+        f"            WHEN {int(bucket)} THEN {points}  -- {bucket.name}"
+        for bucket, points in priority.COMPANY_SIZE_POINTS.items()
+    )
+    return f"""        CASE company_size_bucket
+{rules}
+            ELSE {priority.COMPANY_SIZE_DEFAULT_POINTS}
+        END"""
+
+
+def _urgency_case() -> str:
+    return f"""        CASE
+            WHEN urgent_comment OR deadline_days <= {priority.URGENT_DEADLINE_DAYS} THEN {priority.URGENT_POINTS}
+            WHEN deadline_days <= {priority.SOON_DEADLINE_DAYS} THEN {priority.MONTH_POINTS}
+            ELSE {priority.URGENCY_DEFAULT_POINTS}
+        END"""
+
+
+def render_priority_function() -> str:
+    """SQL (DDL) функций priority_score(), priority_score_version() и триггера на applications"""
+    version = priority.PRIORITY_ALGORITHM_VERSION
+    return f"""-- СГЕНЕРИРОВАНО из backend/core/priority.py (core/priority_sql.py), не редактировать вручную.
+-- Версия алгоритма приоритизации: {version}
+
+-- Версия 1 разбирала текстовые поля в SQL
+DROP FUNCTION IF EXISTS priority_score(text, text, text, text);
+
+CREATE OR REPLACE FUNCTION priority_score(
+    budget_max bigint, company_size_bucket smallint, deadline_days integer, urgent_comment boolean
+)
+RETURNS integer
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $fn$
+SELECT (
+{_budget_case()}
+        +
+{_company_size_case()}
+        +
+{_urgency_case()}
+)::integer
+$fn$;
+
+CREATE OR REPLACE FUNCTION priority_score_version()
+RETURNS integer
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $fn$ SELECT {version} $fn$;
+
+-- Правка типизированных колонок пересчитывает score в БД; правка текстовых
+-- полей помечает строку устаревшей - разбор текста выполняет backend
+CREATE OR REPLACE FUNCTION applications_priority_score_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $fn$
+BEGIN
+    IF (NEW.budget, NEW.company_size, NEW.deadline, NEW.comments)
+        IS DISTINCT FROM (OLD.budget, OLD.company_size, OLD.deadline, OLD.comments) THEN
+        NEW.priority_version := 0;
+        RETURN NEW;
+    END IF;
+    NEW.priority_score := priority_score(
+        NEW.budget_max, NEW.company_size_bucket, NEW.deadline_days, NEW.urgent_comment
+    );
+    NEW.priority_version := priority_score_version();
+    RETURN NEW;
+END
+$fn$;
+
+CREATE OR REPLACE TRIGGER applications_priority_score
+    BEFORE UPDATE OF budget, company_size, deadline, comments,
+        budget_max, company_size_bucket, deadline_days, urgent_comment ON applications
+    FOR EACH ROW EXECUTE FUNCTION applications_priority_score_trigger();
+"""
+
+
+def install_priority_function(engine):
+    """Создает/обновляет функции и триггер так, чтобы SQL-версия совпадала с Python"""
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PRIORITY_FUNCTION_LOCK_KEY})
+        conn.exec_driver_sql(render_priority_function())
+
+
+if __name__ == "__main__":
+    print(render_priority_function())
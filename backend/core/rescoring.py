@@ -0,0 +1,252 @@
+"""
+Фоновый пересчет priority_score после смены версии алгоритма (core/priority.py).
+
+Устаревшие заявки (priority_version != PRIORITY_ALGORITHM_VERSION) обходятся
+пачками по id: текстовые поля заново разбираются в типизированные колонки,
+которые вместе со score записываются одним UPDATE на пачку. Этим же заполняются
+типизированные колонки существующих заявок (scripts/add_applications_typed_fields.sql).
+Чтение списка заявок больше ничего не пересчитывает и не пишет в БД.
+
+Заявки, вставленные в обход backend (seed-скрипты, COPY), и заявки с
+отредактированными в SQL текстовыми полями получают priority_version = 0
+(core/priority_sql.py). Поэтому при работе backend раз в RESCORE_CHECK_INTERVAL
+секунд проверяется, есть ли устаревшие заявки, и если есть - запускается пересчет.
+
+Разовый пересчет без запуска backend:
+    cd backend && python -m core.rescoring
+"""
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import func, or_, text
+
+from core.database import SessionLocal, engine
+from core.priority import PRIORITY_ALGORITHM_VERSION, normalize_applications
+from models.applications import Application
+
+logger = logging.getLogger(__name__)
+
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "1000"))
+# 0 - пересчет только при старте и по POST /api/applications/rescore
+RESCORE_CHECK_INTERVAL = float(os.getenv("RESCORE_CHECK_INTERVAL", "30"))
+
+# Ключ advisory lock: при нескольких воркерах пересчет выполняет только один
+RESCORE_LOCK_KEY = 7_340_001
+
+_BULK_UPDATE_SQL = text("""
+    UPDATE applications AS a
+    SET priority_score = v.score,
+        budget_min = v.budget_min,
+        budget_max = v.budget_max,
+        company_size_bucket = v.company_size_bucket,
+        deadline_days = v.deadline_days,
+        urgent_comment = v.urgent_comment,
+        priority_version = :version
+    FROM unnest(
+        CAST(:ids AS integer[]), CAST(:scores AS integer[]),
+        CAST(:budget_min AS bigint[]), CAST(:budget_max AS bigint[]),
+        CAST(:company_size_bucket AS smallint[]), CAST(:deadline_days AS integer[]),
+        CAST(:urgent_comment AS boolean[])
+    ) AS v(id, score, budget_min, budget_max, company_size_bucket, deadline_days, urgent_comment)
+    WHERE a.id = v.id
+""")
+
+
+@dataclass
+class RescoreProgress:
+    version: int = PRIORITY_ALGORITHM_VERSION
+    running: bool = False
+    total: int = 0
+    processed: int = 0
+    changed: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+
+
+_progress = RescoreProgress()
+_job_lock = threading.Lock()
+_job_thread: threading.Thread | None = None
+# Остановка между пачками: оставшиеся заявки пересчитает следующий запуск
+_stop_requested = threading.Event()
+_watcher_stop = threading.Event()
+_watcher_thread: threading.Thread | None = None
+
+
+def get_progress() -> dict:
+    """Снимок состояния последнего (или текущего) пересчета"""
+    return asdict(_progress)
+
+
+def _stale_filter():
+    # < и > вместо != : проверка читается из ix_applications_priority_version
+    return or_(
+        Application.priority_version.is_(None),
+        Application.priority_version < PRIORITY_ALGORITHM_VERSION,
+        Application.priority_version > PRIORITY_ALGORITHM_VERSION,
+    )
+
+
+def has_stale_applications() -> bool:
+    """Есть ли заявки со score устаревшей версии (дешевая проверка по индексу)"""
+    db = SessionLocal()
+    try:
+        return db.query(Application.id).filter(_stale_filter()).limit(1).first() is not None
+    finally:
+        db.close()
+
+
+def rescore_stale_applications(batch_size: int = RESCORE_BATCH_SIZE) -> RescoreProgress:
+    """
+    Пересчитывает все устаревшие заявки пачками по batch_size.
+    Выполняется синхронно; прогресс доступен через get_progress().
+    """
+    global _progress
+    _progress = RescoreProgress(running=True, started_at=datetime.now(timezone.utc))
+
+    with engine.connect() as lock_conn:
+        locked = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": RESCORE_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            # Пересчет уже идет в другом воркере
+            _progress.running = False
+            _progress.finished_at = datetime.now(timezone.utc)
+            return _progress
+        try:
+            _rescore_batches(batch_size)
+        except Exception as exc:
+            _progress.error = str(exc)
+            logger.exception("Priority rescoring failed")
+            raise
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RESCORE_LOCK_KEY})
+            lock_conn.commit()
+            _progress.running = False
+            _progress.finished_at = datetime.now(timezone.utc)
+    return _progress
+
+
+def _rescore_batches(batch_size: int):
+    db = SessionLocal()
+    try:
+        _progress.total = db.query(func.count(Application.id)).filter(_stale_filter()).scalar()
+        if not _progress.total:
+            return
+        logger.info(
+            "Rescoring %s applications to priority version %s",
+            _progress.total, PRIORITY_ALGORITHM_VERSION,
+        )
+
+        last_id = 0
+        while not _stop_requested.is_set():
+            rows = (
+                db.query(
+                    Application.id,
+                    Application.priority_score,
+                    Application.budget,
+                    Application.company_size,
+                    Application.deadline,
+                    Application.comments,
+                )
+                .filter(Application.id > last_id, _stale_filter())
+                .order_by(Application.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            ids = [row.id for row in rows]
+            normalized = normalize_applications(
+                [row.budget for row in rows],
+                [row.company_size for row in rows],
+                [row.deadline for row in rows],
+                [row.comments for row in rows],
+            )
+            scores = [fields["priority_score"] for fields in normalized]
+            db.execute(_BULK_UPDATE_SQL, {
+                "ids": ids,
+                "scores": scores,
+                **{
+                    column: [fields[column] for fields in normalized]
+                    for column in ("budget_min", "budget_max", "company_size_bucket", "deadline_days", "urgent_comment")
+                },
+                "version": PRIORITY_ALGORITHM_VERSION,
+            })
+            db.commit()
+
+            last_id = ids[-1]
+            _progress.processed += len(rows)
+            _progress.changed += sum(
+                1 for row, score in zip(rows, scores) if row.priority_score != score
+            )
+            logger.info("Rescored %s/%s applications", _progress.processed, _progress.total)
+    finally:
+        db.close()
+
+
+def _run_job():
+    try:
+        rescore_stale_applications()
+    except Exception:
+        pass  # Ошибка уже залогирована и сохранена в прогрессе
+    finally:
+        _job_lock.release()
+
+
+def start_rescore_job() -> bool:
+    """
+    Запускает пересчет в фоновом потоке.
+    Возвращает False, если пересчет в этом процессе уже идет.
+    """
+    global _job_thread
+    if not _job_lock.acquire(blocking=False):
+        return False
+    _stop_requested.clear()
+    _job_thread = threading.Thread(target=_run_job, name="priority-rescore", daemon=True)
+    _job_thread.start()
+    return True
+
+
+def stop_rescore_job(timeout: float = 10.0):
+    """Просит пересчет остановиться после текущей пачки и ждет его завершения"""
+    _watcher_stop.set()
+    if _watcher_thread is not None:
+        _watcher_thread.join(timeout)
+    _stop_requested.set()
+    if _job_thread is not None:
+        _job_thread.join(timeout)
+
+
+def _watch():
+    while not _watcher_stop.wait(RESCORE_CHECK_INTERVAL):
+        try:
+            if has_stale_applications():
+                start_rescore_job()
+        except Exception:
+            logger.exception("Stale priority check failed")
+
+
+def start_rescore_watcher():
+    """
+    Запускает пересчет сразу и затем, пока работает процесс, - каждые
+    RESCORE_CHECK_INTERVAL секунд, если появились устаревшие заявки.
+    Останавливается вместе с пересчетом (stop_rescore_job).
+    """
+    global _watcher_thread
+    start_rescore_job()
+    if RESCORE_CHECK_INTERVAL <= 0 or (_watcher_thread is not None and _watcher_thread.is_alive()):
+        return
+    _watcher_stop.clear()
+    _watcher_thread = threading.Thread(target=_watch, name="priority-rescore-watcher", daemon=True)
+    _watcher_thread.start()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    progress = rescore_stale_applications()
+    print(asdict(progress))
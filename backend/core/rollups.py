@@ -0,0 +1,161 @@
+"""
+Агрегаты поведенческих метрик, обновляемые при приеме событий.
+
+apply_rollups() вызывается в той же транзакции, что и запись сырых событий
+(BehaviorMetricsCRUD), поэтому агрегаты не расходятся с таблицей behavior_metrics.
+Для уже накопленных событий агрегаты можно пересобрать:
+    cd backend && python -m core.rollups --backfill
+
+Статистика читается только из агрегатов, поэтому сырые события старше
+METRICS_RAW_RETENTION_DAYS удаляются целыми секциями (core/partitions.py).
+Пересборка затрагивает только часы, начиная с самого старого хранящегося
+события: агрегаты за удаленные дни не пересобираются и не стираются. Ячейки
+heatmap из отправок визитов (models/behavior_sessions.py) сырых строк не имеют
+и хранятся отдельно (models.heatmap.SOURCE_SESSION): пересборка их не трогает.
+"""
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from core.cursor_codec import decode_points, points_from_json
+from core.heatmap import bin_points
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Начало часа (UTC), к которому относится событие"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _row_points(row: dict):
+    data = row.get("cursor_points")
+    if data is None and row.get("cursor_positions"):
+        # Старые строки хранят координаты JSON-строкой
+        data = points_from_json(row["cursor_positions"])
+    if not data:
+        return []
+    try:
+        return decode_points(data)
+    except ValueError:
+        return []
+
+
+def apply_rollups(db, rows: list[dict], time_buckets: dict | None = None, heatmap_source: int | None = None):
+    """
+    Обновляет агрегаты по пачке событий (dict с полями BehaviorMetrics).
+    Событие относится к часу своего created_at или, если его нет, к текущему часу.
+    time_buckets - готовые приращения {час: (секунды, визиты)} для событий без
+    time_on_page (визиты, models/behavior_sessions.py).
+    heatmap_source - источник ячеек (models.heatmap.SOURCE_*), по умолчанию сырые события.
+    Коммит - на стороне вызывающего кода.
+    """
+    from models.heatmap import SOURCE_RAW, HeatmapCRUD
+    from models.time_on_page import TimeOnPageCRUD
+
+    now_bucket = hour_bucket(datetime.now(timezone.utc))
+    heatmap_counts = Counter()
+    time_buckets = dict(time_buckets or {})
+    for row in rows:
+        bucket = hour_bucket(row["created_at"]) if row.get("created_at") else now_bucket
+        for (cell_x, cell_y), hits in bin_points(_row_points(row)).items():
+            heatmap_counts[(bucket, cell_x, cell_y)] += hits
+        if row.get("time_on_page") is not None:
+            total, samples = time_buckets.get(bucket, (0, 0))
+            time_buckets[bucket] = (total + row["time_on_page"], samples + 1)
+
+    if heatmap_counts:
+        HeatmapCRUD.merge(db, heatmap_counts, SOURCE_RAW if heatmap_source is None else heatmap_source)
+    TimeOnPageCRUD.merge(db, time_buckets)
+
+
+def backfill(until: datetime | None = None, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Пересобирает агрегаты за часы до until (по умолчанию - до начала
+    текущего часа) из сырых событий и визитов. Часы раньше самого старого
+    хранящегося события (удалены хранением) не трогаются, ячейки heatmap из
+    отправок визитов - тоже. Возвращает число обработанных событий.
+    """
+    from sqlalchemy import func, text
+    from core.database import SessionLocal
+    from core.partitions import METRICS_RAW_RETENTION_DAYS
+    from models.behavior_metrics import BehaviorMetrics
+    from models.heatmap import SOURCE_RAW, HeatmapCRUD
+    from models.time_on_page import TimeOnPageCRUD
+
+    until = hour_bucket(until or datetime.now(timezone.utc))
+    db = SessionLocal()
+    try:
+        oldest = db.query(func.min(BehaviorMetrics.created_at)).filter(
+            BehaviorMetrics.created_at < until,
+        ).scalar()
+        if oldest is None:
+            logger.info("No raw events before %s, rollups left as is", until)
+            return 0
+        # Хранение режет по границе часа, поэтому час самого старого события полный
+        since = hour_bucket(oldest)
+        # Визиты удаляются хранением по updated_at, а секции сырых событий - целиком,
+        # поэтому до границы хранения визиты могут быть неполными: время на странице
+        # за эти часы остается как есть
+        time_since = since
+        if METRICS_RAW_RETENTION_DAYS > 0:
+            retention_start = hour_bucket(datetime.now(timezone.utc) - timedelta(days=METRICS_RAW_RETENTION_DAYS))
+            time_since = min(max(since, retention_start), until)
+        HeatmapCRUD.delete_range(db, since, until, SOURCE_RAW)
+        TimeOnPageCRUD.delete_range(db, time_since, until)
+        processed = 0
+        last_id = 0
+        while True:
+            rows = db.query(
+                BehaviorMetrics.id,
+                BehaviorMetrics.created_at,
+                BehaviorMetrics.time_on_page,
+                BehaviorMetrics.cursor_points,
+                BehaviorMetrics.cursor_positions,
+            ).filter(
+                BehaviorMetrics.id > last_id,
+                BehaviorMetrics.created_at < until,
+            ).order_by(BehaviorMetrics.id).limit(chunk_size).all()
+            if not rows:
+                break
+            batch = [row._asdict() for row in rows]
+            for row in batch:
+                if row["created_at"] < time_since:
+                    row["time_on_page"] = None
+            apply_rollups(db, batch)
+            last_id = rows[-1].id
+            processed += len(rows)
+            logger.info("Backfilled rollups for %s events", processed)
+        # Визиты (models/behavior_sessions.py) входят в среднее один раз, по часу начала
+        session_buckets = db.execute(text("""
+            SELECT date_trunc('hour', started_at, 'UTC'), sum(time_on_page), count(*)
+            FROM behavior_sessions
+            WHERE started_at >= :since AND started_at < :until
+            GROUP BY 1
+        """), {"since": time_since, "until": until}).all()
+        TimeOnPageCRUD.merge(db, {bucket: (total, samples) for bucket, total, samples in session_buckets})
+        db.commit()
+        return processed
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Агрегаты и хранение сырых поведенческих метрик")
+    parser.add_argument("--backfill", action="store_true", help="пересобрать агрегаты из сырых событий")
+    parser.add_argument("--prune", action="store_true", help="удалить сырые события старше METRICS_RAW_RETENTION_DAYS")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.backfill:
+        print(f"Processed {backfill()} events")
+    if args.prune:
+        from core.partitions import apply_retention
+        dropped, deleted = apply_retention()
+        print(f"Dropped {len(dropped)} partitions, deleted {deleted} raw events")
+    if not (args.backfill or args.prune):
+        parser.print_help()
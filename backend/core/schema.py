@@ -0,0 +1,41 @@
+"""
+Разовая подготовка схемы БД перед запуском backend.
+
+Создание таблиц (Base.metadata.create_all) и установка SQL-функции приоритизации
+раньше выполнялись при импорте main.py - в каждом воркере и при каждом старте.
+Теперь это отдельный шаг деплоя (сервис migrate в docker-compose.yml), который
+выполняется один раз, до запуска воркеров:
+    cd backend && python -m core.schema
+
+Изменения существующих таблиц по-прежнему выполняются скриптами scripts/*.sql.
+"""
+import logging
+import time
+
+from sqlalchemy import text
+
+import models  # noqa: F401 - регистрирует все модели в Base.metadata
+from core.database import Base, engine
+from core.partitions import ensure_partitions
+from core.priority_sql import install_priority_function
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock: два одновременных запуска не создают таблицы параллельно
+SCHEMA_LOCK_KEY = 7_340_003
+
+
+def create_schema():
+    """Создает недостающие таблицы, индексы и ближайшие секции behavior_metrics, устанавливает priority_score()"""
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        Base.metadata.create_all(bind=conn)
+    ensure_partitions()
+    install_priority_function(engine)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    started = time.perf_counter()
+    create_schema()
+    logger.info("Schema is up to date (%.0f ms)", (time.perf_counter() - started) * 1000)
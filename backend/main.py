@@ -1,16 +1,86 @@
-from fastapi import FastAPI
+import time
+
+# Отсчет времени старта воркера: импорты ниже - заметная его часть
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from core.database import engine, Base
+from core.clicks import click_sketches
+from core.database import (
+    ReadYourWritesMiddleware,
+    async_engine,
+    async_replica_engine,
+    engine,
+    replica_engine,
+    replica_monitor,
+    warm_up_pools,
+)
+from core.events import application_events
+from core.ingest import METRICS_INGEST_MODE, metrics_buffer
+from core.instrumentation import RequestMetricsMiddleware, mark_worker_stopped, render_metrics
+from core.partitions import start_partition_job, stop_partition_job
+from core.rescoring import start_rescore_watcher, stop_rescore_job
 from routes import admin_settings, applications, auth, behavior_metrics
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# Таблицы и SQL-функция приоритизации создаются отдельным шагом до запуска
+# воркеров: cd backend && python -m core.schema (сервис migrate в docker-compose.yml)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Прогрев: пулы соединений и кэш публичных списков, до приема запросов
+    warmup_started = time.perf_counter()
+    await warm_up_pools()
+    await asyncio.to_thread(admin_settings.warm_settings_cache)
+    app.state.startup = {
+        "pid": os.getpid(),
+        "import_ms": round(_import_ms),
+        "warmup_ms": round((time.perf_counter() - warmup_started) * 1000),
+        "total_ms": round((time.perf_counter() - _import_started) * 1000),
+    }
+    logger.info("Worker %(pid)s ready in %(total_ms)s ms (imports %(import_ms)s ms, warm-up %(warmup_ms)s ms)", app.state.startup)
+    
+    # Отставание реплики для чтения (если настроена): до первой проверки чтение идет на primary
+    replica_monitor.start()
+    # Пересчет score заявок, посчитанных старой версией алгоритма приоритизации,
+    # и периодически - вставленных или измененных в обход backend
+    start_rescore_watcher()
+    # Секции behavior_metrics вперед и удаление старых секций (один воркер за раз)
+    start_partition_job()
+    if METRICS_INGEST_MODE == "buffered":
+        metrics_buffer.start()
+    click_sketches.start()
+    await application_events.start()
+    yield
+    # Закрываем LISTEN-соединение и SSE-потоки, еще открытые к этому моменту
+    await application_events.stop()
+    # Пересчет останавливается после текущей пачки, остаток продолжит следующий старт
+    await asyncio.to_thread(stop_rescore_job)
+    await asyncio.to_thread(stop_partition_job)
+    # Дописываем накопленные метрики, чтобы перезапуск не терял события
+    await asyncio.to_thread(metrics_buffer.stop)
+    # Клики, накопленные с последнего слияния (в том числе из дописанного буфера)
+    await asyncio.to_thread(click_sketches.stop)
+    await asyncio.to_thread(replica_monitor.stop)
+    # Соединения asyncpg привязаны к event loop - закрываем их вместе с ним
+    await async_engine.dispose()
+    engine.dispose()
+    if replica_engine is not None:
+        await async_replica_engine.dispose()
+        replica_engine.dispose()
+    mark_worker_stopped()
 
 app = FastAPI(
     title="Autéllo Backend API",
     description="Backend for order processing",
     version="1.0.0",
-    root_path="/api"
+    root_path="/api",
+    lifespan=lifespan
 )
 
 # CORS
@@ -21,6 +91,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Латентность, SQL-запросы на маршрут и лог медленных запросов (GET /metrics)
+app.add_middleware(RequestMetricsMiddleware)
+# После записи с JWT клиент какое-то время читает с primary (только при реплике)
+app.add_middleware(ReadYourWritesMiddleware)
 
 # Include routers
 app.include_router(auth.router)
@@ -31,3 +105,16 @@ app.include_router(behavior_metrics.router)
 @app.get("/")
 def root():
     return {"message": "Autéllo Backend API is running"}
+
+@app.get("/health")
+def health():
+    """Проверка готовности воркера (healthcheck контейнера) и время его старта"""
+    return {"status": "ok", "startup": app.state.startup}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики Prometheus; снаружи закрыт в nginx, собирается из сети docker (backend:8000/metrics)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+_import_ms = (time.perf_counter() - _import_started) * 1000
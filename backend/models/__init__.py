@@ -1,4 +1,8 @@
 from models.admin_settings import AdminSettings
 from models.applications import Application
 from models.behavior_metrics import BehaviorMetrics
-from models.admins import Admin
\ No newline at end of file
+from models.behavior_sessions import BehaviorSession
+from models.click_sketches import ClickSketch
+from models.admins import Admin
+from models.heatmap import HeatmapCell
+from models.time_on_page import TimeOnPageBucket
\ No newline at end of file
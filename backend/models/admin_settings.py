@@ -39,3 +39,4 @@ class AdminSettingsCRUD:
     @staticmethod
     def get_all(db):
         return db.query(AdminSettings).all()
+
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, event, select
 from sqlalchemy.sql import func
+from core.auth_cache import principal_cache
 from core.database import Base
 
 class Admin(Base):
@@ -10,6 +11,15 @@ class Admin(Base):
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+# Изменение или удаление админа через ORM сбрасывает его записи в кэше токенов.
+# Массовые update()/delete() и правки в обход приложения события не вызывают -
+# такие изменения видны после AUTH_CACHE_TTL.
+@event.listens_for(Admin, "after_update")
+@event.listens_for(Admin, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate(target.id)
+
 # CRUD Operations
 class AdminCRUD:
     @staticmethod
@@ -31,3 +41,23 @@ class AdminCRUD:
     @staticmethod
     def count(db):
         return db.query(Admin).count()
+
+
+# Async CRUD Operations (AsyncSession, см. core.database.get_async_db)
+class AsyncAdminCRUD:
+    @staticmethod
+    async def create(db, **kwargs):
+        obj = Admin(**kwargs)
+        db.add(obj)
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+    
+    @staticmethod
+    async def get_by_email(db, email: str):
+        result = await db.scalars(select(Admin).where(Admin.email == email))
+        return result.first()
+    
+    @staticmethod
+    async def count(db):
+        return await db.scalar(select(func.count(Admin.id)))
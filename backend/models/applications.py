@@ -19,15 +19,53 @@ CREATE TABLE IF NOT EXISTS applications (
     interested_product TEXT,
     preferred_contact TEXT,
     convenient_time TEXT,
+    priority_score INTEGER NOT NULL DEFAULT 0,
+    priority_version INTEGER NOT NULL DEFAULT 0,  -- версия алгоритма, посчитавшего score
+    -- типизированные поля, разобранные из текста формы (core/priority.py)
+    budget_min BIGINT,
+    budget_max BIGINT,
+    company_size_bucket SMALLINT NOT NULL DEFAULT 0,  -- core.priority.CompanySize
+    deadline_days INTEGER,
+    urgent_comment BOOLEAN NOT NULL DEFAULT false,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- полнотекстовый поиск (russian + english), см. SEARCH_VECTOR_SQL
+    search_vector TSVECTOR GENERATED ALWAYS AS (...) STORED
 );
+
+-- Индекс для keyset-пагинации по приоритету
+CREATE INDEX IF NOT EXISTS ix_applications_priority_id
+    ON applications (priority_score DESC, id DESC);
+
+-- Индексы фильтров и аналитики по типизированным полям
+CREATE INDEX IF NOT EXISTS ix_applications_budget_max ON applications (budget_max);
+CREATE INDEX IF NOT EXISTS ix_applications_company_size_bucket ON applications (company_size_bucket);
+CREATE INDEX IF NOT EXISTS ix_applications_deadline_days ON applications (deadline_days);
+
+-- Индекс для поиска устаревших score (core/rescoring.py)
+CREATE INDEX IF NOT EXISTS ix_applications_priority_version ON applications (priority_version);
+
+-- Индекс для полнотекстового поиска (GET /api/applications/search)
+CREATE INDEX IF NOT EXISTS ix_applications_search_vector
+    ON applications USING GIN (search_vector);
 """
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, Computed, Float, Integer, SmallInteger, String, DateTime, Index, cast, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from core.database import Base
 
+# Полнотекстовый поиск: поля и их веса для ранжирования (A - самый важный)
+SEARCH_FIELDS = (("business_niche", "A"), ("business_info", "B"), ("comments", "C"))
+# Заявки пишут и на русском, и на английском - индексируем обеими конфигурациями
+SEARCH_CONFIGS = ("russian", "english")
+SEARCH_VECTOR_SQL = " || ".join(
+    f"setweight(to_tsvector('{config}'::regconfig, coalesce({field}, '')), '{weight}')"
+    for field, weight in SEARCH_FIELDS
+    for config in SEARCH_CONFIGS
+)
+
 class Application(Base):
     __tablename__ = "applications"
     
@@ -50,9 +88,28 @@ class Application(Base):
     interested_product = Column(String)
     preferred_contact = Column(String)
     convenient_time = Column(String)
-    priority_score = Column(Integer, default=0)  # Score приоритизации (0-100)
+    priority_score = Column(Integer, default=0, server_default="0", nullable=False)  # Score приоритизации (0-100)
+    priority_version = Column(Integer, default=0, server_default="0", nullable=False)  # Версия алгоритма score
+    # Типизированные поля: разбираются из текста один раз при записи (core.priority.normalize_application)
+    budget_min = Column(BigInteger)  # Бюджет, руб.
+    budget_max = Column(BigInteger)
+    company_size_bucket = Column(SmallInteger, default=0, server_default="0", nullable=False)  # CompanySize
+    deadline_days = Column(Integer)  # Срок в днях (0 - "срочно")
+    urgent_comment = Column(Boolean, default=False, server_default="false", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Вычисляется PostgreSQL; deferred - не читается вместе с остальными полями
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        # Keyset-пагинация: ORDER BY priority_score DESC, id DESC читается прямо из индекса
+        Index("ix_applications_priority_id", priority_score.desc(), id.desc()),
+        Index("ix_applications_budget_max", budget_max),
+        Index("ix_applications_company_size_bucket", company_size_bucket),
+        Index("ix_applications_deadline_days", deadline_days),
+        Index("ix_applications_priority_version", priority_version),
+        Index("ix_applications_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
 # CRUD Operations
@@ -68,3 +125,135 @@ class ApplicationCRUD:
     @staticmethod
     def get_all(db):
         return db.query(Application).all()
+    
+    @staticmethod
+    def get_rows_by_priority(db, columns):
+        """Все заявки по приоритету: кортежи выбранных колонок, без создания ORM-объектов"""
+        return db.execute(
+            select(*columns).order_by(Application.priority_score.desc(), Application.id.desc())
+        ).all()
+    
+    @staticmethod
+    def get_page_rows(db, columns, limit: int, after=None, created_from=None, created_to=None, min_score=None):
+        """
+        Страница заявок в порядке (priority_score DESC, id DESC): кортежи колонок columns.
+        after — ключ (priority_score, id) последней строки предыдущей страницы.
+        """
+        return db.execute(_page_select(columns, limit, after, created_from, created_to, min_score)).all()
+
+
+def _page_select(columns, limit: int, after=None, created_from=None, created_to=None, min_score=None):
+    stmt = select(*columns)
+    if created_from is not None:
+        stmt = stmt.where(Application.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Application.created_at < created_to)
+    if min_score is not None:
+        stmt = stmt.where(Application.priority_score >= min_score)
+    if after is not None:
+        stmt = stmt.where(tuple_(Application.priority_score, Application.id) < tuple_(*after))
+    return stmt.order_by(Application.priority_score.desc(), Application.id.desc()).limit(limit)
+
+
+def _search_query(q: str):
+    """Запрос в синтаксисе веб-поиска ("фраза", or, -исключение) по обеим конфигурациям"""
+    queries = [func.websearch_to_tsquery(config, q) for config in SEARCH_CONFIGS]
+    result = queries[0]
+    for query in queries[1:]:
+        result = result.op("||")(query)
+    return result
+
+
+def _search_select(
+    columns,
+    limit: int,
+    after=None,
+    q: str | None = None,
+    min_score=None,
+    max_score=None,
+    company_sizes=None,
+    deadlines=None,
+    products=None,
+    created_from=None,
+    created_to=None,
+    company_size_buckets=None,
+    min_budget=None,
+    max_budget=None,
+    max_deadline_days=None,
+):
+    """
+    Поиск заявок: структурные фильтры + полнотекстовый запрос q.
+    С q порядок (rank DESC, id DESC), без q - (priority_score DESC, id DESC),
+    after - ключ сортировки последней строки предыдущей страницы.
+    Возвращает строки (*columns, rank); без q rank = None.
+    """
+    if q:
+        tsquery = _search_query(q)
+        # float8, чтобы значение из курсора сравнивалось с тем же самым числом
+        rank = cast(func.ts_rank_cd(Application.search_vector, tsquery), Float)
+        stmt = select(*columns, rank.label("rank")).where(Application.search_vector.op("@@")(tsquery))
+        sort_key = (rank, Application.id)
+    else:
+        stmt = select(*columns, cast(None, Float).label("rank"))
+        sort_key = (Application.priority_score, Application.id)
+    
+    if min_score is not None:
+        stmt = stmt.where(Application.priority_score >= min_score)
+    if max_score is not None:
+        stmt = stmt.where(Application.priority_score <= max_score)
+    if company_sizes:
+        stmt = stmt.where(Application.company_size.in_(company_sizes))
+    if deadlines:
+        stmt = stmt.where(Application.deadline.in_(deadlines))
+    if products:
+        stmt = stmt.where(Application.interested_product.in_(products))
+    if company_size_buckets:
+        stmt = stmt.where(Application.company_size_bucket.in_(company_size_buckets))
+    if min_budget is not None:
+        stmt = stmt.where(Application.budget_max >= min_budget)
+    if max_budget is not None:
+        stmt = stmt.where(Application.budget_max <= max_budget)
+    if max_deadline_days is not None:
+        stmt = stmt.where(Application.deadline_days <= max_deadline_days)
+    if created_from is not None:
+        stmt = stmt.where(Application.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Application.created_at < created_to)
+    if after is not None:
+        stmt = stmt.where(tuple_(*sort_key) < tuple_(*after))
+    return stmt.order_by(*(column.desc() for column in sort_key)).limit(limit)
+
+
+# Async CRUD Operations (AsyncSession, см. core.database.get_async_db)
+class AsyncApplicationCRUD:
+    @staticmethod
+    async def create(db, **kwargs):
+        obj = Application(**kwargs)
+        db.add(obj)
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+    
+    @staticmethod
+    async def create_many(db, rows: list[dict]):
+        """Многострочный INSERT одной пачкой (executemany -> INSERT ... VALUES (...), (...))"""
+        if not rows:
+            return
+        await db.execute(insert(Application), rows)
+        await db.commit()
+    
+    @staticmethod
+    async def get(db, id: int):
+        return await db.get(Application, id)
+    
+    @staticmethod
+    async def get_page_rows(db, columns, limit: int, after=None, created_from=None, created_to=None, min_score=None):
+        """Как ApplicationCRUD.get_page_rows"""
+        result = await db.execute(_page_select(columns, limit, after, created_from, created_to, min_score))
+        return result.all()
+    
+    @staticmethod
+    async def search_rows(db, columns, limit: int, after=None, **filters):
+        """Страница результатов поиска: строки (*columns, rank), см. _search_select"""
+        result = await db.execute(_search_select(columns, limit, after, **filters))
+        return result.all()
@@ -1,29 +1,58 @@
 """
 CREATE TABLE IF NOT EXISTS behavior_metrics (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     application_id INTEGER,  -- может быть NULL или 0 (НЕ FK для анонимных метрик!)
     time_on_page INTEGER,
     buttons_clicked TEXT,  -- JSON строка
-    cursor_positions TEXT,  -- JSON строка
+    cursor_positions TEXT,  -- JSON строка (старый формат beacon)
+    cursor_points BYTEA,  -- пары int16 (x, y), дельта-кодирование (core/cursor_codec.py)
     return_frequency INTEGER DEFAULT 0,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)  -- ключ секционирования обязан входить в PK
+) PARTITION BY RANGE (created_at);
+CREATE INDEX IF NOT EXISTS ix_behavior_metrics_created_at ON behavior_metrics (created_at);
+-- Секции по дням или месяцам создает core/partitions.py (behavior_metrics_pYYYYMMDD),
+-- строки вне созданных секций попадают в behavior_metrics_default.
+-- Перевод существующей таблицы: scripts/partition_behavior_metrics.sql
 """
 
-from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, insert, text
 from sqlalchemy.sql import func
 from core.database import Base
+from core.rollups import apply_rollups
+
+DEFAULT_PARTITION = "behavior_metrics_default"
+# Короткое ожидание блокировок DDL: прием событий не должен стоять за обслуживанием секций
+PARTITION_LOCK_TIMEOUT = "5s"
+
+_PARTITIONS_SQL = text("""
+    SELECT c.relname AS name,
+           b.expr = 'DEFAULT' AS is_default,
+           CAST((regexp_match(b.expr, 'FROM \\(''([^'']*)''\\)'))[1] AS timestamptz) AS lower,
+           CAST((regexp_match(b.expr, 'TO \\(''([^'']*)''\\)'))[1] AS timestamptz) AS upper
+    FROM pg_inherits AS i
+    JOIN pg_class AS c ON c.oid = i.inhrelid
+    CROSS JOIN LATERAL (SELECT pg_get_expr(c.relpartbound, c.oid) AS expr) AS b
+    WHERE i.inhparent = CAST('behavior_metrics' AS regclass)
+    ORDER BY lower NULLS FIRST
+""")
 
 class BehaviorMetrics(Base):
     __tablename__ = "behavior_metrics"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # Секционирование по created_at: PK включает ключ секционирования
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
     application_id = Column(Integer)  # Может быть NULL или 0 для анонимных метрик (НЕ FK!)
     time_on_page = Column(Integer)
     buttons_clicked = Column(String)  # JSON строка
-    cursor_positions = Column(String)  # JSON строка
+    cursor_positions = Column(String)  # JSON строка (старый формат beacon)
+    cursor_points = Column(LargeBinary)  # Пары int16 (x, y), дельта-кодирование (core/cursor_codec.py)
     return_frequency = Column(Integer, default=0)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
 
 
 # CRUD Operations
@@ -32,10 +61,100 @@ class BehaviorMetricsCRUD:
     def create(db, **kwargs):
         obj = BehaviorMetrics(**kwargs)
         db.add(obj)
+        apply_rollups(db, [kwargs])
         db.commit()
         db.refresh(obj)
         return obj
     
+    @staticmethod
+    def create_many(db, rows: list[dict]):
+        """Пачка событий одним multi-row INSERT (и агрегаты), без загрузки объектов обратно"""
+        if not rows:
+            return
+        db.execute(insert(BehaviorMetrics), rows)
+        apply_rollups(db, rows)
+        db.commit()
+    
     @staticmethod
     def get_all(db):
         return db.query(BehaviorMetrics).all()
+
+
+# Async CRUD Operations (AsyncSession, см. core.database.get_async_db)
+class AsyncBehaviorMetricsCRUD:
+    @staticmethod
+    async def create(db, **kwargs):
+        obj = BehaviorMetrics(**kwargs)
+        db.add(obj)
+        # Агрегаты обновляются синхронным кодом на том же соединении
+        await db.run_sync(lambda session: apply_rollups(session, [kwargs]))
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+    
+    @staticmethod
+    async def create_many(db, rows: list[dict]):
+        if not rows:
+            return
+        await db.execute(insert(BehaviorMetrics), rows)
+        await db.run_sync(lambda session: apply_rollups(session, rows))
+        await db.commit()
+
+
+# Секции таблицы (DDL на соединении; коммит - на стороне вызывающего кода)
+class BehaviorMetricsPartitionCRUD:
+    @staticmethod
+    def is_partitioned(conn) -> bool:
+        """False для таблицы, созданной до секционирования (до миграции)"""
+        return conn.execute(text(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = CAST('behavior_metrics' AS regclass)"
+        )).scalar()
+    
+    @staticmethod
+    def get_all(conn):
+        """Секции: name, is_default, lower, upper (None вместо MINVALUE/MAXVALUE)"""
+        return conn.execute(_PARTITIONS_SQL).all()
+    
+    @staticmethod
+    def create_default(conn):
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+        conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF behavior_metrics DEFAULT")
+    
+    @staticmethod
+    def attach(conn, start: datetime, end: datetime) -> tuple[str, int]:
+        """
+        Создает секцию [start, end) и переносит в нее строки из секции по умолчанию.
+        Таблица создается отдельно и подключается через ATTACH PARTITION: это
+        блокирует родительскую таблицу слабее, чем CREATE TABLE ... PARTITION OF.
+        Возвращает (имя секции, число перенесенных строк).
+        """
+        name = f"behavior_metrics_p{start:%Y%m%d}"
+        lower, upper = f"'{start.isoformat()}'", f"'{end.isoformat()}'"
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+        conn.exec_driver_sql(f"CREATE TABLE {name} (LIKE behavior_metrics INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        moved = conn.exec_driver_sql(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE created_at >= {lower} AND created_at < {upper}
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """).rowcount
+        conn.exec_driver_sql(f"ALTER TABLE behavior_metrics ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})")
+        return name, moved
+    
+    @staticmethod
+    def drop(conn, name: str):
+        """Удаляет секцию целиком - без DELETE, VACUUM и раздувания таблицы"""
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+        conn.exec_driver_sql(f'DROP TABLE "{name}"')
+    
+    @staticmethod
+    def delete_from_default(conn, before: datetime, limit: int) -> int:
+        """Удаляет до limit строк старше before из секции по умолчанию"""
+        return conn.execute(text(f"""
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE ctid IN (
+                SELECT ctid FROM {DEFAULT_PARTITION} WHERE created_at < :before LIMIT :limit
+            )
+        """), {"before": before, "limit": limit}).rowcount
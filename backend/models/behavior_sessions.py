@@ -0,0 +1,233 @@
+"""
+CREATE TABLE IF NOT EXISTS behavior_sessions (
+    session_id VARCHAR(64) PRIMARY KEY,  -- визит: генерирует beacon при загрузке страницы
+    visitor_id VARCHAR(64),  -- браузер (localStorage): по нему считается return_frequency
+    application_id INTEGER,  -- может быть NULL для анонимных метрик (НЕ FK!)
+    time_on_page INTEGER NOT NULL DEFAULT 0,  -- последнее (максимальное) накопленное значение
+    buttons_clicked JSONB NOT NULL DEFAULT '{}',  -- {элемент: количество}, накопленное за визит
+    return_frequency INTEGER NOT NULL DEFAULT 0,  -- число более ранних визитов того же visitor_id
+    beacons INTEGER NOT NULL DEFAULT 0,  -- сколько отправок beacon слито в строку
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_behavior_sessions_visitor_id ON behavior_sessions (visitor_id);
+CREATE INDEX IF NOT EXISTS ix_behavior_sessions_updated_at ON behavior_sessions (updated_at);
+"""
+
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, String, insert, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from core.clicks import click_sketches
+from core.database import Base
+from core.rollups import apply_rollups, hour_bucket
+from models.behavior_metrics import BehaviorMetrics
+from models.heatmap import SOURCE_SESSION
+
+
+class BehaviorSession(Base):
+    __tablename__ = "behavior_sessions"
+
+    session_id = Column(String(64), primary_key=True)
+    visitor_id = Column(String(64), index=True)
+    application_id = Column(Integer)  # Может быть NULL для анонимных метрик (НЕ FK!)
+    time_on_page = Column(Integer, nullable=False, server_default="0")
+    buttons_clicked = Column(JSONB, nullable=False, server_default="{}")
+    return_frequency = Column(Integer, nullable=False, server_default="0")
+    beacons = Column(Integer, nullable=False, server_default="0")
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+
+# Новые визиты; return_frequency - число уже известных визитов того же браузера
+_INSERT_NEW_SQL = text("""
+    INSERT INTO behavior_sessions (session_id, visitor_id, application_id, return_frequency, started_at, updated_at)
+    SELECT v.session_id, v.visitor_id, v.application_id,
+           CASE WHEN v.visitor_id IS NULL THEN 0
+                ELSE (SELECT count(*) FROM behavior_sessions AS p WHERE p.visitor_id = v.visitor_id)
+           END,
+           v.started_at, v.started_at
+    FROM unnest(
+        CAST(:session_ids AS varchar[]), CAST(:visitor_ids AS varchar[]),
+        CAST(:application_ids AS integer[]), CAST(:started_at AS timestamptz[])
+    ) AS v(session_id, visitor_id, application_id, started_at)
+    ORDER BY v.session_id
+    ON CONFLICT (session_id) DO NOTHING
+    RETURNING session_id
+""")
+
+# Блокировка строк в порядке session_id: параллельные пачки не взаимоблокируются
+_LOCK_SQL = text("""
+    SELECT session_id, time_on_page, buttons_clicked, return_frequency, started_at
+    FROM behavior_sessions
+    WHERE session_id = ANY(CAST(:session_ids AS varchar[]))
+    ORDER BY session_id
+    FOR UPDATE
+""")
+
+_BULK_UPDATE_SQL = text("""
+    UPDATE behavior_sessions AS s
+    SET time_on_page = v.time_on_page,
+        buttons_clicked = v.buttons_clicked,
+        application_id = COALESCE(v.application_id, s.application_id),
+        beacons = s.beacons + v.beacons,
+        updated_at = v.updated_at
+    FROM unnest(
+        CAST(:session_ids AS varchar[]), CAST(:time_on_page AS integer[]),
+        CAST(:buttons_clicked AS jsonb[]), CAST(:application_ids AS integer[]),
+        CAST(:beacons AS integer[]), CAST(:updated_at AS timestamptz[])
+    ) AS v(session_id, time_on_page, buttons_clicked, application_id, beacons, updated_at)
+    WHERE s.session_id = v.session_id
+""")
+
+
+def new_clicks(stored: dict, merged: dict) -> dict:
+    """Клики, появившиеся с прошлой отправки визита: {элемент: прирост}"""
+    return {
+        element: count - stored.get(element, 0)
+        for element, count in merged.items()
+        if count > stored.get(element, 0)
+    }
+
+
+def merge_clicks(stored: dict, incoming: dict) -> dict:
+    """
+    Beacon каждый раз присылает накопленную за визит карту кликов, поэтому
+    карты сливаются максимумом по элементу: повторная отправка не удваивает счет.
+    """
+    merged = dict(stored)
+    for element, count in incoming.items():
+        if count > merged.get(element, 0):
+            merged[element] = count
+    return merged
+
+
+def _collapse(beacons: list[dict]) -> dict:
+    """Отправки одной пачки по session_id: максимум времени, слитые клики, число отправок"""
+    now = datetime.now(timezone.utc)
+    sessions = {}
+    for beacon in beacons:
+        moment = beacon.get("created_at") or now
+        session = sessions.get(beacon["session_id"])
+        if session is None:
+            session = sessions[beacon["session_id"]] = {
+                "visitor_id": beacon.get("visitor_id"),
+                "application_id": beacon.get("application_id"),
+                "time_on_page": 0,
+                "buttons_clicked": {},
+                "beacons": 0,
+                "started_at": moment,
+                "updated_at": moment,
+            }
+        session["time_on_page"] = max(session["time_on_page"], beacon.get("time_on_page") or 0)
+        session["buttons_clicked"] = merge_clicks(session["buttons_clicked"], beacon.get("buttons_clicked") or {})
+        session["application_id"] = beacon.get("application_id") or session["application_id"]
+        session["beacons"] += 1
+        session["started_at"] = min(session["started_at"], moment)
+        session["updated_at"] = max(session["updated_at"], moment)
+    return sessions
+
+
+def _merge_beacons(db, beacons: list[dict]) -> list[dict]:
+    """
+    Сливает отправки beacon (dict: session_id, visitor_id, application_id,
+    time_on_page, buttons_clicked - dict, cursor_points, created_at) в строки
+    визитов и обновляет агрегаты в той же транзакции:
+    - время на странице: час начала визита получает прирост накопленного
+      времени, а новый визит - +1 к числу визитов, поэтому среднее - это
+      средняя длительность визита, а не среднее промежуточных счетчиков;
+    - heatmap: точки курсора каждой отправки (они не накопительные), в ячейки
+      SOURCE_SESSION - сырых строк для пересборки у них нет.
+    Возвращает итоговое состояние затронутых визитов и прирост кликов
+    (new_clicks, для core.clicks). Коммит - на стороне вызывающего кода.
+    """
+    if not beacons:
+        return []
+    sessions = _collapse(beacons)
+    session_ids = sorted(sessions)
+    inserted = set(db.execute(_INSERT_NEW_SQL, {
+        "session_ids": session_ids,
+        "visitor_ids": [sessions[key]["visitor_id"] for key in session_ids],
+        "application_ids": [sessions[key]["application_id"] for key in session_ids],
+        "started_at": [sessions[key]["started_at"] for key in session_ids],
+    }).scalars())
+    stored = {row.session_id: row for row in db.execute(_LOCK_SQL, {"session_ids": session_ids})}
+
+    time_buckets = {}
+    results = []
+    for key in session_ids:
+        session, row = sessions[key], stored[key]
+        time_on_page = max(row.time_on_page, session["time_on_page"])
+        bucket = hour_bucket(row.started_at)
+        total, samples = time_buckets.get(bucket, (0, 0))
+        time_buckets[bucket] = (
+            total + time_on_page - row.time_on_page,
+            samples + (1 if key in inserted else 0),
+        )
+        session["time_on_page"] = time_on_page
+        session["buttons_clicked"] = merge_clicks(row.buttons_clicked, session["buttons_clicked"])
+        results.append({
+            "session_id": key,
+            "time_on_page": time_on_page,
+            "buttons_clicked": session["buttons_clicked"],
+            "new_clicks": new_clicks(row.buttons_clicked, session["buttons_clicked"]),
+            "return_frequency": row.return_frequency,
+            "started_at": row.started_at,
+            "updated_at": session["updated_at"],
+        })
+    db.execute(_BULK_UPDATE_SQL, {
+        "session_ids": session_ids,
+        "time_on_page": [sessions[key]["time_on_page"] for key in session_ids],
+        "buttons_clicked": [
+            json.dumps(sessions[key]["buttons_clicked"], ensure_ascii=False, separators=(",", ":"))
+            for key in session_ids
+        ],
+        "application_ids": [sessions[key]["application_id"] for key in session_ids],
+        "beacons": [sessions[key]["beacons"] for key in session_ids],
+        "updated_at": [sessions[key]["updated_at"] for key in session_ids],
+    })
+    time_buckets = {bucket: value for bucket, value in time_buckets.items() if value != (0, 0)}
+    # Время уже учтено по визитам: в apply_rollups идут только точки курсора
+    apply_rollups(
+        db,
+        [{"cursor_points": beacon.get("cursor_points"), "created_at": beacon.get("created_at")} for beacon in beacons],
+        time_buckets,
+        SOURCE_SESSION,
+    )
+    return results
+
+
+def _record_clicks(results: list[dict]):
+    # Только после коммита: откаченная пачка не попадает в скетчи
+    for result in results:
+        click_sketches.record(hour_bucket(result["updated_at"]), result["new_clicks"])
+
+
+# CRUD Operations
+class BehaviorSessionCRUD:
+    @staticmethod
+    def upsert_many(db, beacons: list[dict], events: list[dict] | None = None) -> list[dict]:
+        """
+        events - события без session_id (строки behavior_metrics) в той же транзакции:
+        пачку буфера (core/ingest.py) можно повторить целиком, не слив визиты дважды.
+        """
+        results = _merge_beacons(db, beacons)
+        if events:
+            db.execute(insert(BehaviorMetrics), events)
+            apply_rollups(db, events)
+        db.commit()
+        _record_clicks(results)
+        return results
+
+
+# Async CRUD Operations (AsyncSession, см. core.database.get_async_db)
+class AsyncBehaviorSessionCRUD:
+    @staticmethod
+    async def upsert_many(db, beacons: list[dict]) -> list[dict]:
+        # Слияние выполняется синхронным кодом на том же соединении, как и агрегаты
+        results = await db.run_sync(lambda session: _merge_beacons(session, beacons))
+        await db.commit()
+        _record_clicks(results)
+        return results
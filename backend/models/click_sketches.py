@@ -0,0 +1,50 @@
+"""
+CREATE TABLE IF NOT EXISTS click_sketches (
+    bucket_start TIMESTAMP WITH TIME ZONE PRIMARY KEY,  -- начало часа
+    total BIGINT NOT NULL DEFAULT 0,  -- все клики за час, включая вытесненные элементы
+    counters JSONB NOT NULL DEFAULT '{}'  -- скетч Space-Saving: {элемент: [count, error]}
+);
+"""
+
+from sqlalchemy import Column, DateTime, BigInteger, func
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from core.clicks import SpaceSaving
+from core.database import Base
+
+class ClickSketch(Base):
+    __tablename__ = "click_sketches"
+
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # Начало часа
+    total = Column(BigInteger, nullable=False, server_default="0")
+    counters = Column(JSONB, nullable=False, server_default="{}")
+
+
+# CRUD Operations
+class ClickSketchCRUD:
+    @staticmethod
+    def merge(db, sketches: dict):
+        """
+        Сливает {bucket_start: SpaceSaving} с сохраненными скетчами часов.
+        Строки блокируются в порядке часа: воркеры, сливающие одни и те же
+        часы, не взаимоблокируются.
+        """
+        buckets = sorted(sketches)
+        db.execute(pg_insert(ClickSketch).values([{"bucket_start": bucket} for bucket in buckets]).on_conflict_do_nothing())
+        rows = db.query(ClickSketch).filter(
+            ClickSketch.bucket_start.in_(buckets)
+        ).order_by(ClickSketch.bucket_start).with_for_update().all()
+        for row in rows:
+            stored = SpaceSaving(counters=row.counters, total=row.total)
+            stored.merge(sketches[row.bucket_start])
+            row.counters = stored.counters
+            row.total = stored.total
+        db.commit()
+
+    @staticmethod
+    def get_window(db, start, end) -> SpaceSaving:
+        """Скетч за часы [start, end), начиная с часа, в который попадает start"""
+        rows = db.query(ClickSketch.counters, ClickSketch.total).filter(
+            ClickSketch.bucket_start >= func.date_trunc("hour", start),
+            ClickSketch.bucket_start < end,
+        ).all()
+        return SpaceSaving.combine([SpaceSaving(counters=counters, total=total) for counters, total in rows])
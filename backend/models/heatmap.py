@@ -0,0 +1,74 @@
+"""
+CREATE TABLE IF NOT EXISTS heatmap_cells (
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,  -- начало часа
+    source SMALLINT NOT NULL DEFAULT 0,  -- 0 - сырые события, 1 - отправки визитов
+    cell_x SMALLINT NOT NULL,
+    cell_y SMALLINT NOT NULL,
+    hits BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, source, cell_x, cell_y)
+);
+"""
+
+from sqlalchemy import Column, DateTime, SmallInteger, BigInteger, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from core.database import Base
+
+# Сколько ячеек отправлять в одном INSERT ... ON CONFLICT
+MERGE_CHUNK_SIZE = 1000
+
+# Источник точек. Сырые события хранятся в behavior_metrics, и их ячейки
+# пересобирает core.rollups.backfill; отправки визитов (models/behavior_sessions.py)
+# сырых строк не оставляют, поэтому их ячейки пересборка не трогает.
+SOURCE_RAW = 0
+SOURCE_SESSION = 1
+
+class HeatmapCell(Base):
+    __tablename__ = "heatmap_cells"
+    
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # Начало часа
+    source = Column(SmallInteger, primary_key=True, default=SOURCE_RAW)  # SOURCE_RAW / SOURCE_SESSION
+    cell_x = Column(SmallInteger, primary_key=True)
+    cell_y = Column(SmallInteger, primary_key=True)
+    hits = Column(BigInteger, nullable=False, default=0)
+
+
+# CRUD Operations
+class HeatmapCRUD:
+    @staticmethod
+    def merge(db, counts: dict, source: int = SOURCE_RAW):
+        """
+        Прибавляет {(bucket_start, cell_x, cell_y): hits} к сохраненным сеткам источника source.
+        Коммит - на стороне вызывающего кода (в одной транзакции с сырыми событиями).
+        Ячейки пишутся в порядке ключа: параллельные пачки блокируют общие
+        строки в одном порядке и не взаимоблокируются.
+        """
+        values = [
+            {"bucket_start": bucket, "source": source, "cell_x": cell_x, "cell_y": cell_y, "hits": hits}
+            for (bucket, cell_x, cell_y), hits in sorted(counts.items())
+        ]
+        for start in range(0, len(values), MERGE_CHUNK_SIZE):
+            stmt = pg_insert(HeatmapCell).values(values[start:start + MERGE_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[HeatmapCell.bucket_start, HeatmapCell.source, HeatmapCell.cell_x, HeatmapCell.cell_y],
+                set_={"hits": HeatmapCell.hits + stmt.excluded.hits},
+            )
+            db.execute(stmt)
+    
+    @staticmethod
+    def get_cells(db, start, end):
+        """Суммы по ячейкам за часы [start, end) по всем источникам"""
+        return db.query(
+            HeatmapCell.cell_x, HeatmapCell.cell_y, func.sum(HeatmapCell.hits)
+        ).filter(
+            HeatmapCell.bucket_start >= start,
+            HeatmapCell.bucket_start < end,
+        ).group_by(HeatmapCell.cell_x, HeatmapCell.cell_y).all()
+    
+    @staticmethod
+    def delete_range(db, start, end, source: int = SOURCE_RAW):
+        """Удаляет часы [start, end) источника source. Коммит - на стороне вызывающего кода"""
+        db.query(HeatmapCell).filter(
+            HeatmapCell.bucket_start >= start,
+            HeatmapCell.bucket_start < end,
+            HeatmapCell.source == source,
+        ).delete(synchronize_session=False)
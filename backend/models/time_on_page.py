@@ -0,0 +1,61 @@
+"""
+CREATE TABLE IF NOT EXISTS time_on_page_buckets (
+    bucket_start TIMESTAMP WITH TIME ZONE PRIMARY KEY,  -- начало часа
+    total_seconds BIGINT NOT NULL DEFAULT 0,  -- сумма time_on_page за час
+    samples BIGINT NOT NULL DEFAULT 0  -- количество событий за час
+);
+"""
+
+from sqlalchemy import Column, DateTime, BigInteger, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from core.database import Base
+
+class TimeOnPageBucket(Base):
+    __tablename__ = "time_on_page_buckets"
+    
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # Начало часа
+    total_seconds = Column(BigInteger, nullable=False, default=0)
+    samples = Column(BigInteger, nullable=False, default=0)
+
+
+# CRUD Operations
+class TimeOnPageCRUD:
+    @staticmethod
+    def merge(db, buckets: dict):
+        """
+        Прибавляет {bucket_start: (total_seconds, samples)} к сохраненным часам.
+        Коммит - на стороне вызывающего кода. Часы пишутся по порядку (см. HeatmapCRUD.merge).
+        """
+        if not buckets:
+            return
+        stmt = pg_insert(TimeOnPageBucket).values([
+            {"bucket_start": bucket, "total_seconds": total, "samples": samples}
+            for bucket, (total, samples) in sorted(buckets.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TimeOnPageBucket.bucket_start],
+            set_={
+                "total_seconds": TimeOnPageBucket.total_seconds + stmt.excluded.total_seconds,
+                "samples": TimeOnPageBucket.samples + stmt.excluded.samples,
+            },
+        )
+        db.execute(stmt)
+    
+    @staticmethod
+    def get_average(db, start, end=None) -> float:
+        """Среднее time_on_page за часы, начиная с часа, в который попадает start"""
+        query = db.query(
+            func.sum(TimeOnPageBucket.total_seconds), func.sum(TimeOnPageBucket.samples)
+        ).filter(TimeOnPageBucket.bucket_start >= func.date_trunc("hour", start))
+        if end is not None:
+            query = query.filter(TimeOnPageBucket.bucket_start < end)
+        total, samples = query.one()
+        return float(total) / float(samples) if samples else 0
+    
+    @staticmethod
+    def delete_range(db, start, end):
+        """Удаляет часы [start, end). Коммит - на стороне вызывающего кода"""
+        db.query(TimeOnPageBucket).filter(
+            TimeOnPageBucket.bucket_start >= start,
+            TimeOnPageBucket.bucket_start < end,
+        ).delete(synchronize_session=False)
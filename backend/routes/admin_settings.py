@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
-from core.database import get_db
+from core.database import SessionLocal, get_db
+from core.http_cache import PUBLIC_CACHE_TTL, ResponseCache, cached_json_response
 from models.admin_settings import AdminSettings, AdminSettingsCRUD
 from routes.auth import get_current_admin
 
@@ -26,6 +27,17 @@ class AdminSettingsResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Публичные списки услуг отдаются из кэша, изменения через API его сбрасывают.
+# Кэш заполняется с primary, а не с реплики: запрос раз в PUBLIC_CACHE_TTL, а
+# отстающая реплика сразу после сброса закрепила бы в кэше старый список
+settings_cache = ResponseCache(ttl=PUBLIC_CACHE_TTL)
+_settings_list = TypeAdapter(list[AdminSettingsResponse])
+
+def _last_modified(rows):
+    stamps = [row.updated_at or row.created_at for row in rows]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return max(stamps) if stamps else None
+
 @router.post("/", response_model=AdminSettingsResponse, status_code=status.HTTP_201_CREATED)
 def create_admin_setting(
     data: AdminSettingsCreate,
@@ -34,6 +46,7 @@ def create_admin_setting(
 ):
     """Создать новую услугу (требует JWT авторизацию)"""
     result = AdminSettingsCRUD.create(db, services=data.services, budget_range=data.budget_range)
+    settings_cache.invalidate()
     return result
 
 @router.put("/{id}", response_model=AdminSettingsResponse)
@@ -55,6 +68,7 @@ def update_admin_setting(
     
     db.commit()
     db.refresh(admin_setting)
+    settings_cache.invalidate()
     return admin_setting
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -70,17 +84,39 @@ def delete_admin_setting(
     
     db.delete(admin_setting)
     db.commit()
+    settings_cache.invalidate()
     return None
 
-@router.get("/latest", response_model=AdminSettingsResponse)
-def get_latest_settings(db: Session = Depends(get_db)):
-    """Получить последнюю услугу (публичный)"""
+def _load_latest(db):
     result = AdminSettingsCRUD.get_latest(db)
+    last_modified = _last_modified([result]) if result else None
     if not result:
-        return {"id": 0, "services": "", "budget_range": "", "created_at": datetime.now(), "updated_at": datetime.now()}
-    return result
+        result = {"id": 0, "services": "", "budget_range": "", "created_at": datetime.now(), "updated_at": datetime.now()}
+    body = AdminSettingsResponse.model_validate(result).model_dump_json().encode()
+    return settings_cache.put("latest", body, last_modified)
+
+def _load_all(db):
+    rows = AdminSettingsCRUD.get_all(db)
+    body = _settings_list.dump_json(_settings_list.validate_python(rows))
+    return settings_cache.put("all", body, _last_modified(rows))
+
+def warm_settings_cache():
+    """Заполняет кэш публичных списков при старте воркера (первый посетитель не ждет БД)"""
+    db = SessionLocal()
+    try:
+        _load_latest(db)
+        _load_all(db)
+    finally:
+        db.close()
+
+@router.get("/latest", response_model=AdminSettingsResponse)
+def get_latest_settings(request: Request, db: Session = Depends(get_db)):
+    """Получить последнюю услугу (публичный)"""
+    entry = settings_cache.get("latest") or _load_latest(db)
+    return cached_json_response(request, entry)
 
 @router.get("/", response_model=list[AdminSettingsResponse])
-def get_all_settings(db: Session = Depends(get_db)):
+def get_all_settings(request: Request, db: Session = Depends(get_db)):
     """Получить все услуги (публичный)"""
-    return AdminSettingsCRUD.get_all(db)
+    entry = settings_cache.get("all") or _load_all(db)
+    return cached_json_response(request, entry)
@@ -1,14 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, field_validator
 from datetime import datetime
-from core.database import get_db
-from models.applications import Application, ApplicationCRUD
-from core.priority import calculate_priority_score
+from typing import Literal
+from core.application_io import (
+    IMPORT_BATCH_SIZE,
+    ImportFormatError,
+    iter_csv_records,
+    iter_ndjson_records,
+    stream_export,
+)
+from core.database import get_async_db, get_async_read_db, get_db, get_read_db, get_read_engine
+from core.events import application_events, stream_events
+from core.json_responses import json_response
+from core.pagination import decode_cursor, encode_cursor, is_float8, is_int32
+from models.applications import Application, ApplicationCRUD, AsyncApplicationCRUD
+from core.priority import (
+    PRIORITY_ALGORITHM_VERSION,
+    CompanySize,
+    normalize_application,
+    normalize_applications,
+    score_normalized,
+)
+from core.rescoring import get_progress, start_rescore_job
 from routes.auth import get_current_admin
 
 router = APIRouter(prefix="/applications", tags=["Applications"])
 
+# Длина текстовых полей push-события: четыре поля с запасом укладываются
+# в лимит NOTIFY (core.events.NOTIFY_MAX_PAYLOAD)
+EVENT_TEXT_MAX_LENGTH = 200
+
 class ApplicationCreate(BaseModel):
     first_name: str | None = None
     last_name: str | None = None
@@ -41,44 +66,341 @@ class ApplicationResponse(BaseModel):
     comments: str | None
     interested_product: str | None
     priority_score: int | None = 0
+    budget_min: int | None = None
+    budget_max: int | None = None
+    company_size_bucket: CompanySize = CompanySize.UNKNOWN
+    deadline_days: int | None = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class ApplicationPage(BaseModel):
+    items: list[ApplicationResponse]
+    next_cursor: str | None = None
+
+class ApplicationEvent(BaseModel):
+    """
+    Краткие данные заявки для push-уведомления (строка таблицы админ-панели).
+    Текстовые поля обрезаны до EVENT_TEXT_MAX_LENGTH символов: событие должно
+    помещаться в NOTIFY (APPLICATION_EVENTS_BRIDGE=postgres), полная заявка - GET /{id}.
+    """
+    id: int
+    first_name: str | None
+    last_name: str | None
+    interested_product: str | None
+    budget: str | None
+    priority_score: int
+    created_at: datetime
+    
+    @field_validator("first_name", "last_name", "interested_product", "budget")
+    @classmethod
+    def truncate_text(cls, value: str | None) -> str | None:
+        if value is not None and len(value) > EVENT_TEXT_MAX_LENGTH:
+            return value[:EVENT_TEXT_MAX_LENGTH - 1] + "…"
+        return value
+    
+    class Config:
+        from_attributes = True
+
+class ApplicationSearchHit(ApplicationResponse):
+    rank: float | None = None  # релевантность полнотекстового запроса (None без q)
+
+class ApplicationSearchPage(BaseModel):
+    items: list[ApplicationSearchHit]
+    next_cursor: str | None = None
+
+class ImportRecordError(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    rejected: int
+    errors: list[ImportRecordError]
+
+# Колонки экспорта: все поля формы + служебные; файл экспорта можно импортировать обратно
+EXPORT_COLUMNS = [
+    "id", *ApplicationCreate.model_fields,
+    "budget_min", "budget_max", "company_size_bucket", "deadline_days", "urgent_comment",
+    "priority_score", "priority_version", "created_at",
+]
+# Колонки списков заявок (поля ApplicationResponse): строки читаются кортежами
+# и кодируются orjson без валидации моделью (core/json_responses.py)
+LIST_COLUMNS = list(ApplicationResponse.model_fields)
+LIST_SELECT = [getattr(Application, name) for name in LIST_COLUMNS]
+SEARCH_COLUMNS = [*LIST_COLUMNS, "rank"]
+# Сколько ошибок валидации вернуть в ответе импорта (остальные только считаются)
+IMPORT_MAX_REPORTED_ERRORS = 100
+
 @router.post("/", response_model=ApplicationResponse, status_code=201)
 def create_application(data: ApplicationCreate, db: Session = Depends(get_db)):
-    # Вычисляем priority_score при создании
+    # Разбираем текстовые поля в типизированные колонки и считаем по ним priority_score
     application_dict = data.model_dump()
-    application_dict['priority_score'] = calculate_priority_score(data)
+    application_dict.update(normalize_application(data.budget, data.company_size, data.deadline, data.comments))
+    application_dict['priority_score'] = score_normalized(
+        application_dict['budget_max'],
+        application_dict['company_size_bucket'],
+        application_dict['deadline_days'],
+        application_dict['urgent_comment'],
+    )
+    application_dict['priority_version'] = PRIORITY_ALGORITHM_VERSION
     
     result = ApplicationCRUD.create(db, **application_dict)
+    # Push подключенным админ-панелям (после commit - заявка уже видна в списке)
+    application_events.publish({
+        "type": "application_created",
+        "application": ApplicationEvent.model_validate(result).model_dump(mode="json"),
+    })
     return result
 
 @router.get("/", response_model=list[ApplicationResponse])
 def get_all_applications(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
 ):
     """
     Получить все заявки с приоритизацией (сортировка по score DESC).
+    Score хранится в БД; после смены версии алгоритма его пересчитывает
+    фоновая задача (POST /applications/rescore), чтение ничего не пишет.
+    Ответ сжимается по Accept-Encoding (brotli, gzip).
     Требует JWT авторизацию.
     """
-    applications = ApplicationCRUD.get_all(db)
+    rows = ApplicationCRUD.get_rows_by_priority(db, LIST_SELECT)
+    return json_response(request, [dict(zip(LIST_COLUMNS, row)) for row in rows], utc_z=True)
+
+@router.post("/rescore", status_code=status.HTTP_202_ACCEPTED)
+def start_rescore(current_admin = Depends(get_current_admin)):
+    """
+    Запустить фоновый пересчет заявок, посчитанных старой версией алгоритма.
+    Требует JWT авторизацию.
+    """
+    started = start_rescore_job()
+    return {"started": started, "progress": get_progress()}
+
+@router.get("/rescore/status")
+def get_rescore_status(current_admin = Depends(get_current_admin)):
+    """Прогресс фонового пересчета score (требует JWT авторизацию)"""
+    return get_progress()
+
+@router.get("/stream")
+async def stream_applications(
+    min_score: int | None = Query(None, ge=0, le=100),
+    current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
+):
+    """
+    Server-Sent Events: новые заявки сразу после сохранения (event: application_created,
+    id - id заявки, data - JSON с полем application). min_score - только заявки
+    с score не ниже. event: resync - события могли потеряться, перечитайте список.
+    Требует JWT авторизацию.
+    """
+    # async-маршрут: подписчики меняются только в event loop, где идет раздача
+    subscriber = application_events.subscribe(min_score)
+    return StreamingResponse(
+        stream_events(application_events, subscriber),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx отдает события сразу, без буферизации
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stream/stats")
+def get_stream_stats(current_admin = Depends(get_current_admin)):
+    """Счетчики push-уведомлений о заявках (требует JWT авторизацию)"""
+    return application_events.stats()
+
+@router.get("/page", response_model=ApplicationPage)
+async def get_applications_page(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    min_score: int | None = Query(None, ge=0, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
+):
+    """
+    Страница заявок по приоритету (score DESC, id DESC) с keyset-пагинацией.
+    Следующая страница запрашивается с cursor=next_cursor; next_cursor = null на последней странице.
+    Требует JWT авторизацию.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # (priority_score, id) - обе колонки INTEGER
+        if not all(is_int32(v) for v in after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    # Пересчитываем score для всех заявок (на случай если алгоритм изменился)
-    # и обновляем в БД, если score изменился
-    for app in applications:
-        new_score = calculate_priority_score(app)
-        if app.priority_score != new_score:
-            app.priority_score = new_score
-            db.commit()
-            db.refresh(app)
+    # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+    rows = await AsyncApplicationCRUD.get_page_rows(
+        db,
+        LIST_SELECT,
+        limit=limit + 1,
+        after=after,
+        created_from=created_from,
+        created_to=created_to,
+        min_score=min_score,
+    )
+    items = [dict(zip(LIST_COLUMNS, row)) for row in rows]
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last["priority_score"], last["id"])
+    return json_response(request, {"items": items, "next_cursor": next_cursor}, utc_z=True)
+
+@router.get("/search", response_model=ApplicationSearchPage)
+async def search_applications(
+    request: Request,
+    q: str | None = Query(None, max_length=200),
+    min_score: int | None = Query(None, ge=0, le=100),
+    max_score: int | None = Query(None, ge=0, le=100),
+    company_size: list[str] | None = Query(None),
+    deadline: list[str] | None = Query(None),
+    interested_product: list[str] | None = Query(None),
+    company_size_bucket: list[CompanySize] | None = Query(None),
+    min_budget: int | None = Query(None, ge=0),
+    max_budget: int | None = Query(None, ge=0),
+    max_deadline_days: int | None = Query(None, ge=0),
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
+):
+    """
+    Поиск заявок одним индексным запросом.
+    q - полнотекстовый запрос по business_niche, business_info и comments
+    (русский и английский, синтаксис веб-поиска: "фраза", or, -слово);
+    company_size, deadline, interested_product - значения полей формы
+    (можно передать несколько раз); company_size_bucket (0-5, см. CompanySize),
+    min_budget/max_budget (верхняя граница бюджета, руб.) и max_deadline_days -
+    фильтры по типизированным полям. С q результаты упорядочены по
+    релевантности, без q - по приоритету. Пагинация курсором, как у /page.
+    Требует JWT авторизацию.
+    """
+    q = q.strip() if q else None
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # С q - (rank float8, id), без q - (priority_score, id)
+        first_valid = is_float8 if q else is_int32
+        if not (first_valid(after[0]) and is_int32(after[1])):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    # Сортировка по score (убывание)
-    applications_sorted = sorted(applications, key=lambda x: x.priority_score or 0, reverse=True)
+    rows = await AsyncApplicationCRUD.search_rows(
+        db,
+        LIST_SELECT,
+        limit=limit + 1,
+        after=after,
+        q=q,
+        min_score=min_score,
+        max_score=max_score,
+        company_sizes=company_size,
+        deadlines=deadline,
+        products=interested_product,
+        company_size_buckets=company_size_bucket,
+        min_budget=min_budget,
+        max_budget=max_budget,
+        max_deadline_days=max_deadline_days,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    items = [dict(zip(SEARCH_COLUMNS, row)) for row in rows]
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last["rank"] if q else last["priority_score"], last["id"])
+    return json_response(request, {"items": items, "next_cursor": next_cursor}, utc_z=True)
+
+async def _insert_batch(db: AsyncSession, batch: list[dict]):
+    normalized = normalize_applications(
+        [row["budget"] for row in batch],
+        [row["company_size"] for row in batch],
+        [row["deadline"] for row in batch],
+        [row["comments"] for row in batch],
+    )
+    for row, fields in zip(batch, normalized):
+        row.update(fields)
+        row["priority_version"] = PRIORITY_ALGORITHM_VERSION
+    await AsyncApplicationCRUD.create_many(db, batch)
+
+@router.post("/import", response_model=ImportResult)
+async def import_applications(
+    request: Request,
+    format: Literal["ndjson", "csv"] | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
+):
+    """
+    Потоковый импорт заявок: NDJSON (объект на строку) или CSV с заголовком.
+    Формат берется из параметра format, иначе из Content-Type (text/csv -> CSV).
+    Каждая запись проверяется схемой ApplicationCreate, типизированные поля и
+    score считаются пачкой,
+    запись в БД - многострочными INSERT по IMPORT_BATCH_SIZE строк, каждая пачка
+    в своей транзакции. Невалидные записи пропускаются и попадают в errors.
+    Требует JWT авторизацию.
+    """
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    records = iter_csv_records if format == "csv" else iter_ndjson_records
     
-    return applications_sorted
+    imported = rejected = 0
+    errors = []
+    batch = []
+    try:
+        async for line, record, error in records(request.stream()):
+            if error is None:
+                try:
+                    batch.append(ApplicationCreate.model_validate(record).model_dump())
+                except ValidationError as exc:
+                    error = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+            if error is not None:
+                rejected += 1
+                if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "error": error})
+                continue
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await _insert_batch(db, batch)
+                imported += len(batch)
+                batch = []
+    except ImportFormatError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": str(exc), "imported": imported, "rejected": rejected},
+        )
+    if batch:
+        await _insert_batch(db, batch)
+        imported += len(batch)
+    return {"imported": imported, "rejected": rejected, "errors": errors}
+
+@router.get("/export")
+def export_applications(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    read_engine = Depends(get_read_engine),
+    current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
+):
+    """
+    Потоковый экспорт всех заявок в порядке id (NDJSON или CSV).
+    Строки читаются server-side cursor-ом (с реплики, если она есть) и
+    отдаются частями, память не зависит от размера таблицы. Требует JWT авторизацию.
+    """
+    stmt = select(*(getattr(Application, name) for name in EXPORT_COLUMNS)).order_by(Application.id)
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_export(read_engine, stmt, EXPORT_COLUMNS, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="applications.{format}"'},
+    )
 
 @router.get("/{id}", response_model=ApplicationResponse)
 def get_application(
@@ -86,7 +408,11 @@ def get_application(
     db: Session = Depends(get_db),
     current_admin = Depends(get_current_admin)  # Требует JWT авторизацию
 ):
-    """Получить детали конкретной заявки (требует JWT авторизацию)"""
+    """
+    Получить детали конкретной заявки (требует JWT авторизацию).
+    Читается с primary: админ открывает заявку сразу после push-уведомления,
+    на реплику она могла еще не попасть.
+    """
     application = db.query(Application).filter(Application.id == id).first()
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-import bcrypt
 import os
 
-from core.database import get_db
-from models.admins import Admin, AdminCRUD
+from core.auth_cache import Principal, principal_cache, principal_from_claims
+from core.passwords import PasswordPoolBusy, account_throttle, ip_throttle, password_hasher
+from core.database import AsyncSessionLocal, get_async_db, get_db
+from models.admins import AdminCRUD, AsyncAdminCRUD
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -45,16 +47,25 @@ class AdminExistsResponse(BaseModel):
     admin_exists: bool
 
 # Helper functions
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля с использованием bcrypt"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля с использованием bcrypt (в отдельном пуле, см. core/passwords.py)"""
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Хеширование пароля с использованием bcrypt"""
+async def get_password_hash(password: str) -> str:
+    """Хеширование пароля с использованием bcrypt (стоимость - BCRYPT_ROUNDS)"""
     # Bcrypt автоматически обрезает пароль до 72 байт
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    return await password_hasher.hash(password)
+
+def _too_many_requests(detail: str, retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+def _client_ip(request: Request) -> str:
+    # За nginx адрес клиента приходит в X-Real-IP (см. nginx/conf.d/default.conf)
+    return request.headers.get("x-real-ip") or (request.client.host if request.client else "unknown")
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -62,11 +73,11 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_admin(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -80,10 +91,25 @@ async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = D
     except JWTError:
         raise credentials_exception
     
-    admin = AdminCRUD.get_by_email(db, email=email)
+    # Свежий токен в режиме доверия claims - без обращения к БД
+    principal = principal_from_claims(payload)
+    if principal is not None:
+        principal_cache.record_trusted()
+        return principal
+    
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+    
+    # Своя короткая async-сессия, а не Depends(get_async_db): зависимость живет до
+    # конца ответа, и SSE-поток или выгрузка держали бы соединение пула все время
+    async with AsyncSessionLocal() as db:
+        admin = await AsyncAdminCRUD.get_by_email(db, email=email)
     if admin is None:
         raise credentials_exception
-    return admin
+    principal = Principal(id=admin.id, email=admin.email, created_at=admin.created_at)
+    principal_cache.put(email, principal)
+    return principal
 
 # Routes
 @router.get("/check", response_model=AdminExistsResponse)
@@ -93,17 +119,17 @@ def check_admin_exists(db: Session = Depends(get_db)):
     return {"admin_exists": count > 0}
 
 @router.post("/register", response_model=AdminResponse, status_code=status.HTTP_201_CREATED)
-def register_admin(admin_data: AdminRegister, db: Session = Depends(get_db)):
+async def register_admin(admin_data: AdminRegister, db: AsyncSession = Depends(get_async_db)):
     """Регистрация первого админа (только если админов нет)"""
     # Проверка наличия админов
-    if AdminCRUD.count(db) > 0:
+    if await AsyncAdminCRUD.count(db) > 0:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Registration is only allowed when no admins exist"
         )
     
     # Проверка существования email
-    existing_admin = AdminCRUD.get_by_email(db, email=admin_data.email)
+    existing_admin = await AsyncAdminCRUD.get_by_email(db, email=admin_data.email)
     if existing_admin:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -111,8 +137,11 @@ def register_admin(admin_data: AdminRegister, db: Session = Depends(get_db)):
         )
     
     # Создание админа
-    hashed_password = get_password_hash(admin_data.password)
-    admin = AdminCRUD.create(
+    try:
+        hashed_password = await get_password_hash(admin_data.password)
+    except PasswordPoolBusy:
+        raise _too_many_requests("Password hashing is busy, retry later", retry_after=1)
+    admin = await AsyncAdminCRUD.create(
         db,
         email=admin_data.email,
         hashed_password=hashed_password
@@ -120,23 +149,57 @@ def register_admin(admin_data: AdminRegister, db: Session = Depends(get_db)):
     return admin
 
 @router.post("/login", response_model=Token)
-def login_admin(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_admin(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Вход админа (получение JWT токена)"""
-    admin = AdminCRUD.get_by_email(db, email=form_data.username)
-    if not admin or not verify_password(form_data.password, admin.hashed_password):
+    account_key = form_data.username.lower()
+    ip_key = _client_ip(request)
+    
+    # Аккаунт или IP с исчерпанным лимитом неудачных попыток - без проверки пароля
+    retry_after = max(account_throttle.retry_after(account_key), ip_throttle.retry_after(ip_key))
+    if retry_after:
+        raise _too_many_requests("Too many failed login attempts", retry_after=retry_after)
+    
+    admin = await AsyncAdminCRUD.get_by_email(db, email=form_data.username)
+    try:
+        password_ok = admin is not None and await verify_password(form_data.password, admin.hashed_password)
+    except PasswordPoolBusy:
+        raise _too_many_requests("Login is busy, retry later", retry_after=1)
+    if not password_ok:
+        account_throttle.record_failure(account_key)
+        ip_throttle.record_failure(ip_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    account_throttle.reset(account_key)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": admin.email}, expires_delta=access_token_expires
+        data={"sub": admin.email, "uid": admin.id, "created_at": admin.created_at.isoformat()},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=AdminResponse)
-async def get_current_admin_info(current_admin: Admin = Depends(get_current_admin)):
+async def get_current_admin_info(current_admin: Principal = Depends(get_current_admin)):
     """Получение профиля текущего админа (защищенный endpoint)"""
     return current_admin
+
+@router.get("/cache-stats")
+def get_auth_cache_stats(current_admin = Depends(get_current_admin)):
+    """Счетчики кэша проверенных токенов (требует JWT авторизацию)"""
+    return principal_cache.stats()
+
+@router.get("/login-stats")
+def get_login_stats(current_admin = Depends(get_current_admin)):
+    """Состояние пула bcrypt и счетчиков неудачных входов (требует JWT авторизацию)"""
+    return {
+        **password_hasher.stats(),
+        "throttled_accounts": account_throttle.tracked_keys(),
+        "throttled_ips": ip_throttle.tracked_keys(),
+    }
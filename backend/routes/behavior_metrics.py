@@ -1,20 +1,50 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
-from core.database import get_db
-from models.behavior_metrics import BehaviorMetrics, BehaviorMetricsCRUD
+import json
+from core.cursor_codec import MAX_BASE64_LENGTH, MAX_JSON_LENGTH, decode_base64, points_from_json
+from core import heatmap
+from core.database import get_async_db, get_read_db
+from core.ingest import METRICS_INGEST_MODE, metrics_buffer
+from core.json_responses import json_response
+from models.behavior_metrics import AsyncBehaviorMetricsCRUD
+from models.behavior_sessions import AsyncBehaviorSessionCRUD
+from models.click_sketches import ClickSketchCRUD
+from models.heatmap import HeatmapCRUD
+from models.time_on_page import TimeOnPageCRUD
 from routes.auth import get_current_admin
 
 router = APIRouter(prefix="/behavior-metrics", tags=["Behavior Metrics"])
 
+# Идентификаторы визита и браузера генерирует beacon (UUID)
+ID_PATTERN = r"^[A-Za-z0-9_-]{8,64}$"
+
 class BehaviorMetricsCreate(BaseModel):
     application_id: Optional[int] = 0  # Может быть 0 для анонимных метрик
+    # С session_id отправки визита сливаются в одну строку behavior_sessions
+    session_id: Optional[str] = Field(None, pattern=ID_PATTERN)
+    visitor_id: Optional[str] = Field(None, pattern=ID_PATTERN)
     time_on_page: int
     buttons_clicked: str  # JSON строка
-    cursor_positions: str  # JSON строка
+    cursor_positions: str = Field(..., max_length=MAX_JSON_LENGTH)  # JSON строка
+    return_frequency: int = 0  # С session_id считается на сервере по visitor_id
+
+class CompactMetricsEvent(BaseModel):
+    time_on_page: int
+    buttons_clicked: dict[str, int] = {}
+    # base64: пары int16 (x, y), дельта-кодирование, до MAX_POINTS точек (core/cursor_codec.py)
+    cursor: str = Field("", max_length=MAX_BASE64_LENGTH)
+
+class BehaviorMetricsBatch(BaseModel):
+    application_id: Optional[int] = 0  # Может быть 0 для анонимных метрик
+    session_id: Optional[str] = Field(None, pattern=ID_PATTERN)
+    visitor_id: Optional[str] = Field(None, pattern=ID_PATTERN)
     return_frequency: int = 0
+    events: list[CompactMetricsEvent] = Field(..., min_length=1, max_length=100)
 
 class BehaviorMetricsResponse(BaseModel):
     id: int
@@ -25,73 +55,198 @@ class BehaviorMetricsResponse(BaseModel):
     class Config:
         from_attributes = True
 
-@router.post("/", response_model=BehaviorMetricsResponse, status_code=201)
-def create_metrics(data: BehaviorMetricsCreate, db: Session = Depends(get_db)):
+class BehaviorSessionResponse(BaseModel):
+    session_id: str
+    time_on_page: int
+    return_frequency: int
+    started_at: datetime
+
+def _parse_clicks(raw: str) -> dict[str, int]:
+    """Карта кликов из JSON-строки старого формата; некорректные значения отбрасываются"""
+    try:
+        clicks = json.loads(raw)
+    except ValueError:
+        return {}
+    if not isinstance(clicks, dict):
+        return {}
+    return {str(key): value for key, value in clicks.items() if isinstance(value, int) and value > 0}
+
+@router.post(
+    "/",
+    response_model=BehaviorMetricsResponse | BehaviorSessionResponse,
+    status_code=201,
+    responses={202: {"description": "Метрики приняты в буфер (METRICS_INGEST_MODE=buffered)"}},
+)
+async def create_metrics(data: BehaviorMetricsCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Принимает поведенческие метрики и записывает в БД.
     ВАЖНО: application_id может быть 0 или null - это нормально для анонимных метрик.
+    С session_id отправка сливается со строкой визита (ответ - состояние визита),
+    без него сохраняется отдельной строкой.
+    В режиме buffered событие ставится в очередь и пишется пачкой, ответ 202 без id.
     """
     # Преобразуем 0 в None для корректного хранения в БД
     metrics_data = data.model_dump()
     if metrics_data.get('application_id') == 0:
         metrics_data['application_id'] = None
+    # Координаты храним в компактном бинарном виде, а не JSON-строкой
+    metrics_data['cursor_points'] = points_from_json(metrics_data.pop('cursor_positions'))
     
-    result = BehaviorMetricsCRUD.create(db, **metrics_data)
+    if data.session_id:
+        beacon = {
+            "session_id": data.session_id,
+            "visitor_id": data.visitor_id,
+            "application_id": metrics_data["application_id"],
+            "time_on_page": data.time_on_page,
+            "buttons_clicked": _parse_clicks(data.buttons_clicked),
+            "cursor_points": metrics_data["cursor_points"],
+        }
+        if METRICS_INGEST_MODE == "buffered":
+            _submit_buffered([beacon])
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "accepted"})
+        [session] = await AsyncBehaviorSessionCRUD.upsert_many(db, [beacon])
+        return BehaviorSessionResponse(**session)
+    
+    metrics_data.pop('session_id')
+    metrics_data.pop('visitor_id')
+    if METRICS_INGEST_MODE == "buffered":
+        _submit_buffered([metrics_data])
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "accepted"})
+    
+    result = await AsyncBehaviorMetricsCRUD.create(db, **metrics_data)
     return result
 
+@router.post(
+    "/batch",
+    status_code=201,
+    responses={202: {"description": "Метрики приняты в буфер (METRICS_INGEST_MODE=buffered)"}},
+)
+async def create_metrics_batch(data: BehaviorMetricsBatch, db: AsyncSession = Depends(get_async_db)):
+    """
+    Пакет событий beacon в компактном формате: координаты курсора - base64
+    от дельта-кодированных пар int16, клики - объект {элемент: количество}.
+    С session_id события сливаются со строкой визита (время и клики -
+    накопленные значения), без него каждое событие сохраняется одной строкой.
+    """
+    application_id = data.application_id or None
+    rows = []
+    for event in data.events:
+        try:
+            cursor_points = decode_base64(event.cursor) if event.cursor else None
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+        if data.session_id:
+            rows.append({
+                "session_id": data.session_id,
+                "visitor_id": data.visitor_id,
+                "application_id": application_id,
+                "time_on_page": event.time_on_page,
+                "buttons_clicked": event.buttons_clicked,
+                "cursor_points": cursor_points or None,
+            })
+            continue
+        rows.append({
+            "application_id": application_id,
+            "time_on_page": event.time_on_page,
+            "buttons_clicked": json.dumps(event.buttons_clicked, ensure_ascii=False, separators=(",", ":")),
+            "cursor_points": cursor_points or None,
+            "return_frequency": data.return_frequency,
+        })
+    
+    if METRICS_INGEST_MODE == "buffered":
+        _submit_buffered(rows)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"accepted": len(rows)})
+    
+    if data.session_id:
+        await AsyncBehaviorSessionCRUD.upsert_many(db, rows)
+    else:
+        await AsyncBehaviorMetricsCRUD.create_many(db, rows)
+    return {"accepted": len(rows)}
+
+def _submit_buffered(rows: list[dict]):
+    if not metrics_buffer.submit(rows):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Metrics queue is full",
+            headers={"Retry-After": "1"},
+        )
+
+@router.get("/ingest-stats")
+def get_ingest_stats(current_admin = Depends(get_current_admin)):
+    """Счетчики буфера приема метрик: глубина очереди, отклоненные и записанные события"""
+    return metrics_buffer.stats()
+
 @router.get("/stats")
-def get_metrics_stats(db: Session = Depends(get_db), current_admin = Depends(get_current_admin)):
+def get_metrics_stats(
+    request: Request,
+    heatmap_from: Optional[datetime] = None,
+    heatmap_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+    current_admin = Depends(get_current_admin)
+):
     """
     Возвращает агрегированную статистику:
     - Среднее время на странице (день/неделя/месяц)
-    - Топ координат курсора для heatmap
+    - Heatmap курсора: матрица счетчиков по ячейкам сетки за окно
+      [heatmap_from, heatmap_to) (по умолчанию - последние 30 дней)
+    Матрица - тысячи чисел, поэтому ответ кодируется orjson и сжимается
+    (core/json_responses.py).
     """
-    from datetime import timedelta
-    from sqlalchemy import func
+    from datetime import timedelta, timezone
     
-    now = datetime.utcnow()
+    now = datetime.now(timezone.utc)
     
-    # Среднее время на странице за день
-    day_ago = now - timedelta(days=1)
-    avg_day = db.query(func.avg(BehaviorMetrics.time_on_page)).filter(
-        BehaviorMetrics.created_at >= day_ago
-    ).scalar() or 0
+    # Средние считаются по почасовым агрегатам (точность окна - до часа)
+    avg_day = TimeOnPageCRUD.get_average(db, now - timedelta(days=1))
+    avg_week = TimeOnPageCRUD.get_average(db, now - timedelta(days=7))
+    avg_month = TimeOnPageCRUD.get_average(db, now - timedelta(days=30))
     
-    # Среднее время на странице за неделю
-    week_ago = now - timedelta(days=7)
-    avg_week = db.query(func.avg(BehaviorMetrics.time_on_page)).filter(
-        BehaviorMetrics.created_at >= week_ago
-    ).scalar() or 0
+    # Heatmap собирается из почасовых сеток, а не из сырых координат
+    heatmap_to = heatmap_to or now
+    heatmap_from = heatmap_from or heatmap_to - timedelta(days=30)
+    grid = heatmap.dense_grid(HeatmapCRUD.get_cells(db, heatmap_from, heatmap_to))
     
-    # Среднее время на странице за месяц
-    month_ago = now - timedelta(days=30)
-    avg_month = db.query(func.avg(BehaviorMetrics.time_on_page)).filter(
-        BehaviorMetrics.created_at >= month_ago
-    ).scalar() or 0
-    
-    # Получаем все cursor_positions для heatmap (последние 1000 записей)
-    recent_metrics = db.query(BehaviorMetrics.cursor_positions).filter(
-        BehaviorMetrics.cursor_positions.isnot(None),
-        BehaviorMetrics.created_at >= month_ago
-    ).order_by(BehaviorMetrics.created_at.desc()).limit(1000).all()
-    
-    # Парсим JSON строки и собираем координаты
-    import json
-    all_coordinates = []
-    for (positions_str,) in recent_metrics:
-        try:
-            if positions_str:
-                positions = json.loads(positions_str)
-                if isinstance(positions, list):
-                    all_coordinates.extend(positions)
-        except (json.JSONDecodeError, TypeError):
-            continue
-    
-    return {
+    return json_response(request, {
         "average_time_on_page": {
             "day": round(avg_day, 2),
             "week": round(avg_week, 2),
             "month": round(avg_month, 2)
         },
-        "heatmap_coordinates": all_coordinates[:1000]  # Ограничиваем для производительности
+        "heatmap": {
+            "grid_width": heatmap.HEATMAP_GRID_WIDTH,
+            "grid_height": heatmap.HEATMAP_GRID_HEIGHT,
+            "max_x": heatmap.HEATMAP_MAX_X,
+            "max_y": heatmap.HEATMAP_MAX_Y,
+            "from": heatmap_from,
+            "to": heatmap_to,
+            "total": sum(map(sum, grid)),
+            "counts": grid  # counts[y][x]
+        }
+    })
+
+@router.get("/top-clicks")
+def get_top_clicks(
+    clicks_from: Optional[datetime] = None,
+    clicks_to: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    Самые кликаемые элементы за окно [clicks_from, clicks_to) (по умолчанию -
+    последние 30 дней) из почасовых скетчей Space-Saving (core/clicks.py).
+    count - верхняя граница числа кликов, count - error - нижняя; клики
+    последних CLICK_SKETCH_FLUSH_INTERVAL секунд могут быть еще не учтены.
+    """
+    from datetime import timedelta, timezone
+    
+    clicks_to = clicks_to or datetime.now(timezone.utc)
+    clicks_from = clicks_from or clicks_to - timedelta(days=30)
+    sketch = ClickSketchCRUD.get_window(db, clicks_from, clicks_to)
+    return {
+        "from": clicks_from,
+        "to": clicks_to,
+        "total": sketch.total,
+        "capacity": sketch.capacity,
+        "elements": sketch.top(limit),
     }
@@ -0,0 +1,82 @@
+"""
+Production-запуск backend: несколько процессов uvicorn без --reload.
+
+    python -m core.schema   # один раз перед запуском (сервис migrate в docker-compose.yml)
+    python serve.py
+
+Число воркеров - WEB_CONCURRENCY, по умолчанию по числу ядер, доступных
+контейнеру (учитываются cpuset и лимит CPU cgroup). Каждый воркер - отдельный
+процесс со своим event loop и пулами соединений, поэтому пропускная способность
+растет с числом ядер. Упавший воркер перезапускается. SIGHUP - поочередный
+перезапуск: новый воркер поднимается (и прогревается в lifespan) раньше, чем
+останавливается старый. SIGTERM останавливает воркеры, давая запросам
+завершиться за GRACEFUL_SHUTDOWN_TIMEOUT секунд.
+
+Метрики Prometheus воркеры пишут в PROMETHEUS_MULTIPROC_DIR (по умолчанию
+временный каталог, очищается при старте), GET /metrics суммирует их по всем воркерам.
+
+Для разработки: uvicorn main:app --reload
+"""
+import copy
+import math
+import os
+import shutil
+import tempfile
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "5"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+ACCESS_LOG = os.getenv("ACCESS_LOG", "true").lower() in ("1", "true", "yes")
+
+
+def available_cpus() -> int:
+    """Ядра, доступные процессу: cpuset (sched_getaffinity) и квота cgroup v2 (cpu.max)"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+def worker_count() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or available_cpus())
+
+
+def prepare_metrics_dir():
+    """Каталог метрик нескольких процессов: задается до импорта prometheus_client в воркерах"""
+    path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-backend"))
+    # Файлы прошлого запуска (другие pid) исказили бы счетчики
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def log_config() -> dict:
+    """Конфигурация логов uvicorn + корневой логгер: сообщения модулей приложения (INFO) тоже выводятся"""
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["root"] = {"handlers": ["default"], "level": LOG_LEVEL.upper()}
+    return config
+
+
+if __name__ == "__main__":
+    prepare_metrics_dir()
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=worker_count(),
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        # nginx передает адрес клиента в X-Forwarded-For / X-Forwarded-Proto
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        log_config=log_config(),
+        log_level=LOG_LEVEL,
+        access_log=ACCESS_LOG,
+    )
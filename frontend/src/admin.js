@@ -68,13 +68,26 @@ document.addEventListener('DOMContentLoaded', () => {
     loadServices();
     setupServiceModal();
     setupApplicationModal();
+    
+    document.getElementById('load-more-applications').addEventListener('click', () => {
+        loadApplications(true);
+    });
+    
+    document.getElementById('applications-search-form').addEventListener('submit', (e) => {
+        e.preventDefault();
+        loadApplications();
+    });
+    
+    // Новые заявки приходят сами, без перезагрузки списка
+    subscribeApplications();
 });
 
 // ========== Услуги (CRUD) ==========
 async function loadServices() {
     try {
-        const response = await fetch(`${API_BASE}/admin-settings/`);
-        if (!response.ok) throw new Error('Failed to load services');
+        // С токеном: nginx не отдает этот запрос из микрокэша, список сразу свежий
+        const response = await authFetch(`${API_BASE}/admin-settings/`);
+        if (!response || !response.ok) throw new Error('Failed to load services');
         
         const services = await response.json();
         const tbody = document.getElementById('services-tbody');
@@ -177,39 +190,138 @@ window.deleteService = async function(id) {
 };
 
 // ========== Заявки ==========
-async function loadApplications() {
+const APPLICATIONS_PAGE_SIZE = 50;
+let applicationsCursor = null;
+
+async function loadApplications(append = false) {
     try {
-        const response = await authFetch(`${API_BASE}/applications/`);
+        const params = new URLSearchParams({ limit: APPLICATIONS_PAGE_SIZE });
+        if (append && applicationsCursor) {
+            params.set('cursor', applicationsCursor);
+        }
+        
+        // С текстом поиска - серверный полнотекстовый поиск (по релевантности)
+        const query = document.getElementById('applications-search').value.trim();
+        let endpoint = 'page';
+        if (query) {
+            params.set('q', query);
+            endpoint = 'search';
+        }
+        
+        const response = await authFetch(`${API_BASE}/applications/${endpoint}?${params}`);
         if (!response || !response.ok) throw new Error('Failed to load applications');
         
-        const applications = await response.json();
+        const page = await response.json();
         const tbody = document.getElementById('applications-tbody');
-        tbody.innerHTML = '';
+        if (!append) {
+            tbody.innerHTML = '';
+        }
         
-        applications.forEach(app => {
-            const tr = document.createElement('tr');
-            const priorityClass = getPriorityClass(app.priority_score || 0);
-            const priorityEmoji = getPriorityEmoji(app.priority_score || 0);
-            
-            tr.className = priorityClass;
-            tr.innerHTML = `
-                <td>${app.id}</td>
-                <td>${app.first_name || ''} ${app.last_name || ''}</td>
-                <td>${app.interested_product || '-'}</td>
-                <td>${app.budget || '-'}</td>
-                <td>${priorityEmoji} ${app.priority_score || 0}</td>
-                <td>
-                    <button class="btn btn-primary" onclick="viewApplication(${app.id})">Просмотр</button>
-                </td>
-            `;
-            tbody.appendChild(tr);
+        page.items.forEach(app => {
+            tbody.appendChild(renderApplicationRow(app));
         });
+        
+        // Курсор следующей страницы (null - страниц больше нет)
+        applicationsCursor = page.next_cursor;
+        document.getElementById('load-more-applications').style.display = applicationsCursor ? 'inline-block' : 'none';
     } catch (error) {
         console.error('Error loading applications:', error);
         alert('Ошибка загрузки заявок');
     }
 }
 
+function renderApplicationRow(app) {
+    const tr = document.createElement('tr');
+    const priorityClass = getPriorityClass(app.priority_score || 0);
+    const priorityEmoji = getPriorityEmoji(app.priority_score || 0);
+    
+    tr.className = priorityClass;
+    tr.dataset.score = app.priority_score || 0;
+    tr.innerHTML = `
+        <td>${app.id}</td>
+        <td>${app.first_name || ''} ${app.last_name || ''}</td>
+        <td>${app.interested_product || '-'}</td>
+        <td>${app.budget || '-'}</td>
+        <td>${priorityEmoji} ${app.priority_score || 0}</td>
+        <td>
+            <button class="btn btn-primary" onclick="viewApplication(${app.id})">Просмотр</button>
+        </td>
+    `;
+    return tr;
+}
+
+// ========== Push новых заявок (Server-Sent Events) ==========
+// EventSource не умеет передавать заголовок Authorization, поэтому поток
+// читается через fetch: токен не попадает в URL и логи nginx
+const STREAM_RETRY_MAX_MS = 30000;
+
+async function subscribeApplications() {
+    let retryMs = 1000;
+    let reconnecting = false;
+    
+    while (isAuthenticated()) {
+        try {
+            const response = await authFetch(`${API_BASE}/applications/stream`, {
+                headers: { 'Accept': 'text/event-stream' }
+            });
+            if (!response || response.status === 401) return;
+            if (!response.ok) throw new Error(`Stream failed: ${response.status}`);
+            
+            // После разрыва список мог устареть - перечитываем его один раз
+            if (reconnecting) loadApplications();
+            retryMs = 1000;
+            
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                const messages = buffer.split('\n\n');
+                buffer = messages.pop();
+                messages.forEach(handleStreamMessage);
+            }
+        } catch (error) {
+            console.error('Applications stream error:', error);
+        }
+        reconnecting = true;
+        await new Promise(resolve => setTimeout(resolve, retryMs));
+        retryMs = Math.min(retryMs * 2, STREAM_RETRY_MAX_MS);
+    }
+}
+
+function handleStreamMessage(message) {
+    // Строки "event: ...", "id: ...", "data: ..."; строки ": ..." - heartbeat
+    const data = message.split('\n')
+        .filter(line => line.startsWith('data: '))
+        .map(line => line.slice(6))
+        .join('\n');
+    if (!data) return;
+    
+    const event = JSON.parse(data);
+    if (event.type === 'resync') {
+        loadApplications();
+    } else if (event.type === 'application_created') {
+        insertApplicationRow(event.application);
+    }
+}
+
+function insertApplicationRow(app) {
+    // В результатах поиска новую заявку не показываем: она может не подходить под запрос
+    if (document.getElementById('applications-search').value.trim()) return;
+    
+    const tbody = document.getElementById('applications-tbody');
+    const tr = renderApplicationRow(app);
+    // Список отсортирован по (score DESC, id DESC), у новой заявки id максимальный
+    const before = Array.from(tbody.children).find(row => Number(row.dataset.score) <= app.priority_score);
+    if (before) {
+        tbody.insertBefore(tr, before);
+    } else if (!applicationsCursor) {
+        // Ниже всех загруженных строк - только если загружена последняя страница
+        tbody.appendChild(tr);
+    }
+}
+
 function getPriorityClass(score) {
     if (score > 80) return 'priority-high';
     if (score >= 50) return 'priority-medium';
@@ -274,83 +386,49 @@ async function loadStatistics() {
         document.getElementById('avg-month').textContent = Math.round(stats.average_time_on_page.month || 0);
         
         // Отрисовка heatmap
-        drawHeatmap(stats.heatmap_coordinates || []);
+        drawHeatmap(stats.heatmap);
     } catch (error) {
         console.error('Error loading statistics:', error);
         document.getElementById('stats-content').innerHTML = '<p>Ошибка загрузки статистики</p>';
     }
 }
 
-function drawHeatmap(coordinates) {
+function drawHeatmap(heatmap) {
     const canvas = document.getElementById('heatmap-canvas');
     if (!canvas) return;
     
     const ctx = canvas.getContext('2d');
     ctx.clearRect(0, 0, canvas.width, canvas.height);
     
-    if (coordinates.length === 0) {
+    if (!heatmap || !heatmap.total) {
         ctx.font = '16px Arial';
         ctx.fillStyle = '#666';
         ctx.fillText('Нет данных для heatmap', 10, 30);
         return;
     }
     
-    // Фильтруем валидные координаты (в пределах разумных значений)
-    const validCoords = coordinates.filter(coord => 
-        coord && typeof coord.x === 'number' && typeof coord.y === 'number' &&
-        coord.x >= 0 && coord.y >= 0 && coord.x < 10000 && coord.y < 10000
-    );
+    // Сервер присылает готовую сетку счетчиков counts[y][x]
+    const cellWidth = canvas.width / heatmap.grid_width;
+    const cellHeight = canvas.height / heatmap.grid_height;
+    const maxFreq = Math.max(...heatmap.counts.map(row => Math.max(...row)));
     
-    if (validCoords.length === 0) {
-        ctx.font = '16px Arial';
-        ctx.fillStyle = '#666';
-        ctx.fillText('Нет валидных координат для heatmap', 10, 30);
-        return;
-    }
-    
-    // Находим границы координат для масштабирования
-    const minX = Math.min(...validCoords.map(c => c.x));
-    const maxX = Math.max(...validCoords.map(c => c.x));
-    const minY = Math.min(...validCoords.map(c => c.y));
-    const maxY = Math.max(...validCoords.map(c => c.y));
-    
-    // Масштабируем под размер canvas с отступами
-    const padding = 20;
-    const scaleX = (canvas.width - padding * 2) / Math.max(maxX - minX, 1);
-    const scaleY = (canvas.height - padding * 2) / Math.max(maxY - minY, 1);
-    const scale = Math.min(scaleX, scaleY); // Используем меньший масштаб для сохранения пропорций
-    
-    // Агрегация координат (подсчет частоты) с учетом масштабирования
-    const coordMap = {};
-    validCoords.forEach(coord => {
-        const scaledX = Math.floor((coord.x - minX) * scale + padding);
-        const scaledY = Math.floor((coord.y - minY) * scale + padding);
-        const key = `${scaledX},${scaledY}`;
-        coordMap[key] = (coordMap[key] || 0) + 1;
-    });
-    
-    // Находим максимальную частоту для нормализации
-    const maxFreq = Math.max(...Object.values(coordMap));
-    
-    // Отрисовка точек (градиент от синего к красному)
-    Object.entries(coordMap).forEach(([key, freq]) => {
-        const [x, y] = key.split(',').map(Number);
-        const intensity = freq / maxFreq;
-        
-        // Градиент: синий (холодный) → красный (горячий)
-        const r = Math.floor(intensity * 255);
-        const b = Math.floor((1 - intensity) * 255);
-        
-        ctx.fillStyle = `rgb(${r}, 0, ${b})`;
-        ctx.beginPath();
-        // Размер точки зависит от частоты
-        const radius = 2 + Math.floor(intensity * 4);
-        ctx.arc(x, y, radius, 0, Math.PI * 2);
-        ctx.fill();
+    // Отрисовка ячеек (градиент от синего к красному)
+    heatmap.counts.forEach((row, y) => {
+        row.forEach((freq, x) => {
+            if (!freq) return;
+            const intensity = freq / maxFreq;
+            
+            // Градиент: синий (холодный) → красный (горячий)
+            const r = Math.floor(intensity * 255);
+            const b = Math.floor((1 - intensity) * 255);
+            
+            ctx.fillStyle = `rgba(${r}, 0, ${b}, ${0.3 + intensity * 0.7})`;
+            ctx.fillRect(x * cellWidth, y * cellHeight, Math.ceil(cellWidth), Math.ceil(cellHeight));
+        });
     });
     
     // Добавляем информацию о количестве точек
     ctx.font = '12px Arial';
     ctx.fillStyle = '#333';
-    ctx.fillText(`Всего точек: ${validCoords.length}`, 10, canvas.height - 10);
+    ctx.fillText(`Всего точек: ${heatmap.total}`, 10, canvas.height - 10);
 }
@@ -1,10 +1,46 @@
 // Сбор поведенческих метрик на главной странице
 const API_BASE = '/api';
 
+// Режим отправки:
+// 'batch'  - раз в BATCH_INTERVAL_MS компактный пакет в /behavior-metrics/batch
+//            (координаты - base64 от дельта-кодированных пар int16)
+// 'single' - старый формат: JSON каждую секунду в /behavior-metrics/
+const BEACON_MODE = 'batch';
+const BATCH_INTERVAL_MS = 10000;
+const SINGLE_INTERVAL_MS = 1000;
+const MAX_COORDINATE = 32767;
+// Точка курсора - не чаще раза в CURSOR_SAMPLE_MS и не больше MAX_CURSOR_POINTS
+// за отправку (сервер отклоняет событие больше 1000 точек)
+const CURSOR_SAMPLE_MS = 50;
+const MAX_CURSOR_POINTS = 500;
+
 let timeOnPage = 0;
 let cursorPositions = [];
+let lastCursorSample = 0;
 let buttonsClicked = {};
 
+// Визит - одна загрузка страницы: сервер сливает все его отправки в одну строку.
+// Браузер помнится между визитами, по нему сервер считает return_frequency.
+function newId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 14);
+}
+
+const SESSION_ID = newId();
+let VISITOR_ID = null;
+try {
+    VISITOR_ID = localStorage.getItem('visitor_id');
+    if (!VISITOR_ID) {
+        VISITOR_ID = newId();
+        localStorage.setItem('visitor_id', VISITOR_ID);
+    }
+} catch (error) {
+    // localStorage недоступен (приватный режим): визит считается первым
+    VISITOR_ID = null;
+}
+
 // Таймер для времени на странице (каждую секунду)
 setInterval(() => {
     timeOnPage++;
@@ -12,6 +48,10 @@ setInterval(() => {
 
 // Сбор координат курсора
 document.addEventListener('mousemove', (e) => {
+    if (e.timeStamp - lastCursorSample < CURSOR_SAMPLE_MS || cursorPositions.length >= MAX_CURSOR_POINTS) {
+        return;
+    }
+    lastCursorSample = e.timeStamp;
     cursorPositions.push({ x: e.clientX, y: e.clientY });
 });
 
@@ -21,8 +61,60 @@ document.addEventListener('click', (e) => {
     buttonsClicked[target] = (buttonsClicked[target] || 0) + 1;
 });
 
-// Отправка метрик каждую секунду
-setInterval(async () => {
+// Пары int16 little-endian: первая точка абсолютная, остальные - разница с предыдущей
+function encodeCursor(points) {
+    const view = new DataView(new ArrayBuffer(points.length * 4));
+    let prevX = 0;
+    let prevY = 0;
+    points.forEach((point, i) => {
+        const x = Math.min(Math.max(Math.round(point.x), 0), MAX_COORDINATE);
+        const y = Math.min(Math.max(Math.round(point.y), 0), MAX_COORDINATE);
+        view.setInt16(i * 4, x - prevX, true);
+        view.setInt16(i * 4 + 2, y - prevY, true);
+        prevX = x;
+        prevY = y;
+    });
+
+    let binary = '';
+    const bytes = new Uint8Array(view.buffer);
+    for (let i = 0; i < bytes.length; i++) {
+        binary += String.fromCharCode(bytes[i]);
+    }
+    return btoa(binary);
+}
+
+function buildBatch() {
+    const batch = {
+        application_id: 0,  // Для анонимных метрик
+        session_id: SESSION_ID,
+        visitor_id: VISITOR_ID,
+        events: [{
+            time_on_page: timeOnPage,
+            buttons_clicked: buttonsClicked,
+            cursor: encodeCursor(cursorPositions)
+        }]
+    };
+    // Очистка массива координат после упаковки (чтобы не раздувался)
+    cursorPositions = [];
+    return JSON.stringify(batch);
+}
+
+async function sendBatch() {
+    try {
+        await fetch(`${API_BASE}/behavior-metrics/batch`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: buildBatch()
+        });
+    } catch (error) {
+        // Тихо игнорируем ошибки, чтобы не мешать пользователю
+        console.debug('Metrics send error (silent):', error);
+    }
+}
+
+async function sendSingle() {
     try {
         await fetch(`${API_BASE}/behavior-metrics/`, {
             method: 'POST',
@@ -31,17 +123,30 @@ setInterval(async () => {
             },
             body: JSON.stringify({
                 application_id: 0,  // Для анонимных метрик
+                session_id: SESSION_ID,
+                visitor_id: VISITOR_ID,
                 time_on_page: timeOnPage,
                 buttons_clicked: JSON.stringify(buttonsClicked),
-                cursor_positions: JSON.stringify(cursorPositions),
-                return_frequency: 0
+                cursor_positions: JSON.stringify(cursorPositions)
             })
         });
-        
+
         // Очистка массива координат после отправки (чтобы не раздувался)
         cursorPositions = [];
     } catch (error) {
         // Тихо игнорируем ошибки, чтобы не мешать пользователю
         console.debug('Metrics send error (silent):', error);
     }
-}, 1000);
+}
+
+if (BEACON_MODE === 'batch') {
+    setInterval(sendBatch, BATCH_INTERVAL_MS);
+
+    // Досылаем накопленное при уходе со страницы
+    window.addEventListener('pagehide', () => {
+        const blob = new Blob([buildBatch()], { type: 'application/json' });
+        navigator.sendBeacon(`${API_BASE}/behavior-metrics/batch`, blob);
+    });
+} else {
+    setInterval(sendSingle, SINGLE_INTERVAL_MS);
+}
@@ -0,0 +1,14 @@
+-- Миграция: keyset-пагинация заявок по приоритету (GET /api/applications/page)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_applications_priority_index.sql
+-- CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции, поэтому без BEGIN/COMMIT
+
+-- Пустой score считаем нулевым, чтобы сравнение (priority_score, id) было однозначным
+UPDATE applications SET priority_score = 0 WHERE priority_score IS NULL;
+
+ALTER TABLE applications
+    ALTER COLUMN priority_score SET DEFAULT 0,
+    ALTER COLUMN priority_score SET NOT NULL;
+
+-- Составной индекс: первая страница читается из индекса без сортировки всей таблицы
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_priority_id
+    ON applications (priority_score DESC, id DESC);
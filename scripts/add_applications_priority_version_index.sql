@@ -0,0 +1,5 @@
+-- Миграция: индекс для периодической проверки устаревших score (core/rescoring.py)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_applications_priority_version_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_priority_version
+    ON applications (priority_version);
@@ -0,0 +1,17 @@
+-- Миграция: полнотекстовый поиск заявок (GET /api/applications/search)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_applications_search.sql
+-- CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции, поэтому без BEGIN/COMMIT
+-- Выражение совпадает с SEARCH_VECTOR_SQL в backend/models/applications.py
+
+-- Добавление STORED-колонки переписывает таблицу (блокировка на время миграции)
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian'::regconfig, coalesce(business_niche, '')), 'A') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(business_niche, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(business_info, '')), 'B') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(business_info, '')), 'B') ||
+    setweight(to_tsvector('russian'::regconfig, coalesce(comments, '')), 'C') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(comments, '')), 'C')
+) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_search_vector
+    ON applications USING GIN (search_vector);
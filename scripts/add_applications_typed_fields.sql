@@ -0,0 +1,21 @@
+-- Миграция: типизированные поля заявки, разобранные из текста формы (core/priority.py)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_applications_typed_fields.sql
+-- CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции, поэтому без BEGIN/COMMIT
+--
+-- Колонки заполняет фоновый пересчет: версия алгоритма приоритизации 2 делает все
+-- заявки устаревшими, и backend при старте разбирает их пачками (core/rescoring.py).
+-- Заполнить без запуска backend: cd backend && python -m core.rescoring
+
+ALTER TABLE applications
+    ADD COLUMN IF NOT EXISTS budget_min BIGINT,
+    ADD COLUMN IF NOT EXISTS budget_max BIGINT,
+    ADD COLUMN IF NOT EXISTS company_size_bucket SMALLINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS deadline_days INTEGER,
+    ADD COLUMN IF NOT EXISTS urgent_comment BOOLEAN NOT NULL DEFAULT false;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_budget_max
+    ON applications (budget_max);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_company_size_bucket
+    ON applications (company_size_bucket);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_deadline_days
+    ON applications (deadline_days);
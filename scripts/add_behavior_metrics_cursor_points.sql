@@ -0,0 +1,6 @@
+-- Миграция: компактное хранение координат курсора (пары int16, дельта-кодирование)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_behavior_metrics_cursor_points.sql
+-- Старые строки сохраняют JSON в cursor_positions, новые пишут только cursor_points
+
+ALTER TABLE behavior_metrics
+    ADD COLUMN IF NOT EXISTS cursor_points BYTEA;
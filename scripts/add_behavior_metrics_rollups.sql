@@ -0,0 +1,8 @@
+-- Миграция: почасовые агрегаты времени на странице и индекс по created_at
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_behavior_metrics_rollups.sql
+-- Таблица time_on_page_buckets создается backend автоматически (create_all);
+-- после миграции пересоберите агрегаты: docker compose exec backend python -m core.rollups --backfill
+
+-- Индекс для backfill/удаления старых событий по времени
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_behavior_metrics_created_at
+    ON behavior_metrics (created_at);
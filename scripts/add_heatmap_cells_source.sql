@@ -0,0 +1,16 @@
+-- Миграция: источник ячеек heatmap (0 - сырые события, 1 - отправки визитов)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_heatmap_cells_source.sql
+-- Ячейки визитов не пересобираются из behavior_metrics, поэтому core.rollups --backfill
+-- их не удаляет. Ячейки, записанные до миграции, считаются сырыми: в часах, когда
+-- уже шли отправки визитов, источники не разделить, и --backfill до истечения
+-- хранения сырых событий за эти часы заменит их сетки сетками сырых событий.
+
+BEGIN;
+
+ALTER TABLE heatmap_cells
+    ADD COLUMN IF NOT EXISTS source SMALLINT NOT NULL DEFAULT 0;
+
+ALTER TABLE heatmap_cells DROP CONSTRAINT IF EXISTS heatmap_cells_pkey;
+ALTER TABLE heatmap_cells ADD PRIMARY KEY (bucket_start, source, cell_x, cell_y);
+
+COMMIT;
@@ -0,0 +1,7 @@
+-- Миграция: версия алгоритма приоритизации для каждой заявки
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/add_priority_version.sql
+-- Существующие заявки получают версию 0 и будут пересчитаны фоновой задачей
+-- при следующем старте backend (или через POST /api/applications/rescore)
+
+ALTER TABLE applications
+    ADD COLUMN IF NOT EXISTS priority_version INTEGER NOT NULL DEFAULT 0;
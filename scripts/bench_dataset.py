@@ -0,0 +1,244 @@
+"""
+Генератор набора данных для нагрузочного тестирования (scripts/loadtest.py).
+
+Заполняет БД правдоподобными данными:
+- applications     - заявки формы с разбросом бюджета, размера компании, сроков
+                     и created_at; score и типизированные поля считаются сразу;
+- behavior_metrics - события beacon (время на странице, клики, траектория
+                     курсора) за последние --days дней, вместе с агрегатами;
+- admins           - админ для входа (BENCH_ADMIN_EMAIL / BENCH_ADMIN_PASSWORD).
+
+Данные детерминированы при одинаковом --seed, поэтому прогоны сравнимы.
+Запуск из корня репозитория (переменные POSTGRES_* как у backend):
+    PYTHONPATH=backend python scripts/bench_dataset.py --applications 10000 --metrics 50000 --truncate
+
+--truncate очищает applications, behavior_metrics и агрегаты - только для
+отдельной БД бенчмарка (docker-compose.bench.yml), не для рабочей.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import bcrypt
+from sqlalchemy import insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.cursor_codec import decode_points, encode_points
+from core.database import SessionLocal
+from core.heatmap import bin_points
+from core.partitions import ensure_partitions
+from core.passwords import BCRYPT_ROUNDS
+from core.priority import PRIORITY_ALGORITHM_VERSION, normalize_applications
+from core.rollups import hour_bucket
+from core.schema import create_schema
+from models.admins import Admin, AdminCRUD
+from models.applications import Application
+from models.behavior_metrics import BehaviorMetrics
+from models.heatmap import SOURCE_RAW, HeatmapCell
+from models.time_on_page import TimeOnPageCRUD
+
+BENCH_ADMIN_EMAIL = "bench@example.com"
+BENCH_ADMIN_PASSWORD = "bench-password"
+CHUNK_SIZE = 5000
+
+FIRST_NAMES = ["Иван", "Анна", "Дмитрий", "Елена", "Алексей", "Мария", "Сергей", "Ольга", "John", "Kate"]
+LAST_NAMES = ["Петров", "Смирнова", "Козлов", "Морозова", "Новиков", "Волкова", "Соколов", "Smith"]
+NICHES = ["IT", "E-commerce", "Услуги", "Промышленность", "Автомобильный бизнес", "Ритейл", "Логистика"]
+PRODUCTS = [
+    "Полировка кузова премиум-класса", "Химчистка салона с озонированием",
+    "Нанесение керамического покрытия", "Тонировка стекол", "Полная покраска кузова авто",
+]
+CONTACT_METHODS = ["phone", "email", "telegram", "whatsapp"]
+# (значение, вес): частые значения формы чаще редких
+BUDGETS = [
+    ("50000-100000", 20), ("100000-500000", 20), ("500000-1000000", 15), ("1000000-5000000", 10),
+    ("5000000-10000000", 3), ("10000-50000", 15), ("500k", 5), ("1m", 5), ("5m", 2), ("", 5),
+]
+COMPANY_SIZES = [("1-10", 30), ("10-50", 25), ("50-100", 15), ("100-500", 12), ("500+", 8), ("", 10)]
+DEADLINES = [
+    ("1 неделя", 10), ("2 недели", 10), ("1 месяц", 30), ("3 месяца", 20),
+    ("6 месяцев", 10), ("asap", 5), ("1 month", 5), ("", 10),
+]
+COMMENTS = [
+    ("Хотим обсудить детали проекта", 40), ("Очень срочно! Нужно запустить до конца месяца", 8),
+    ("СРОЧНО", 4), ("Просто узнать цену", 20), ("Planning ahead, no rush", 8), ("", 20),
+]
+BUTTONS = ["submit", "cta_hero", "cta_pricing", "phone", "telegram", "faq", "gallery"]
+SCREEN_WIDTH, SCREEN_HEIGHT = 1920, 1080
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def generate_application(rng: random.Random, created_at: datetime) -> dict:
+    first_name = rng.choice(FIRST_NAMES)
+    return {
+        "first_name": first_name,
+        "last_name": rng.choice(LAST_NAMES),
+        "email": f"{first_name.lower()}.{rng.randrange(10**6)}@example.com",
+        "business_info": f"{rng.choice(NICHES)}: {rng.choice(PRODUCTS).lower()}",
+        "business_niche": rng.choice(NICHES),
+        "company_size": _weighted(rng, COMPANY_SIZES),
+        "budget": _weighted(rng, BUDGETS),
+        "deadline": _weighted(rng, DEADLINES),
+        "comments": _weighted(rng, COMMENTS),
+        "preferred_contact_method": rng.choice(CONTACT_METHODS),
+        "interested_product": rng.choice(PRODUCTS),
+        "convenient_time": rng.choice(["9:00-18:00", "10:00-19:00", "в любое время"]),
+        "created_at": created_at,
+    }
+
+
+def cursor_trajectory(rng: random.Random) -> list[tuple[int, int]]:
+    """Случайное блуждание курсора: соседние точки близко, как в реальном beacon"""
+    x, y = rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT)
+    points = []
+    for _ in range(rng.randint(10, 80)):
+        x = min(max(x + rng.randint(-60, 60), 0), SCREEN_WIDTH - 1)
+        y = min(max(y + rng.randint(-40, 40), 0), SCREEN_HEIGHT - 1)
+        points.append((x, y))
+    return points
+
+
+def generate_clicks(rng: random.Random) -> dict[str, int]:
+    return {button: rng.randint(1, 3) for button in rng.sample(BUTTONS, rng.choice([0, 0, 1, 1, 2, 3]))}
+
+
+def generate_metrics_event(rng: random.Random, application_ids: list[int], created_at: datetime) -> dict:
+    # Большая часть посетителей заявку не оставляет - метрики анонимные
+    application_id = rng.choice(application_ids) if application_ids and rng.random() < 0.3 else None
+    return {
+        "application_id": application_id,
+        "time_on_page": min(int(rng.lognormvariate(3.5, 1.0)), 3600),
+        "buttons_clicked": json.dumps(generate_clicks(rng), separators=(",", ":")),
+        "cursor_points": encode_points(cursor_trajectory(rng)),
+        "return_frequency": rng.choices([0, 1, 2, 5], [70, 20, 8, 2])[0],
+        "created_at": created_at,
+    }
+
+
+def _spread(rng: random.Random, now: datetime, days: int) -> datetime:
+    return now - timedelta(seconds=rng.uniform(0, days * 86400))
+
+
+def truncate(db):
+    db.execute(text(
+        "TRUNCATE applications, behavior_metrics, heatmap_cells, time_on_page_buckets RESTART IDENTITY"
+    ))
+    db.commit()
+
+
+def ensure_admin(db):
+    """Админ для сценария входа; пароль хешируется с рабочим BCRYPT_ROUNDS"""
+    if AdminCRUD.get_by_email(db, BENCH_ADMIN_EMAIL) is None:
+        hashed = bcrypt.hashpw(BENCH_ADMIN_PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+        AdminCRUD.create(db, email=BENCH_ADMIN_EMAIL, hashed_password=hashed.decode("utf-8"))
+
+
+def seed_applications(db, count: int, days: int, rng: random.Random) -> list[int]:
+    now = datetime.now(timezone.utc)
+    ids = []
+    for start in range(0, count, CHUNK_SIZE):
+        batch = [generate_application(rng, _spread(rng, now, days)) for _ in range(min(CHUNK_SIZE, count - start))]
+        normalized = normalize_applications(
+            [row["budget"] for row in batch],
+            [row["company_size"] for row in batch],
+            [row["deadline"] for row in batch],
+            [row["comments"] for row in batch],
+        )
+        for row, fields in zip(batch, normalized):
+            row.update(fields)
+            row["priority_version"] = PRIORITY_ALGORITHM_VERSION
+        ids.extend(db.scalars(insert(Application).returning(Application.id), batch))
+        db.commit()
+    return ids
+
+
+def _merge_heatmap(db, counts: Counter):
+    """
+    Как HeatmapCRUD.merge, но одним executemany: на миллионах ячеек
+    компиляция многострочного VALUES в merge заняла бы большую часть заполнения.
+    """
+    stmt = pg_insert(HeatmapCell)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HeatmapCell.bucket_start, HeatmapCell.source, HeatmapCell.cell_x, HeatmapCell.cell_y],
+        set_={"hits": HeatmapCell.hits + stmt.excluded.hits},
+    )
+    db.execute(stmt, [
+        {"bucket_start": bucket, "source": SOURCE_RAW, "cell_x": cell_x, "cell_y": cell_y, "hits": hits}
+        for (bucket, cell_x, cell_y), hits in counts.items()
+    ])
+
+
+def seed_metrics(db, count: int, days: int, application_ids: list[int], rng: random.Random):
+    """Сырые события и их агрегаты (те же, что строит core.rollups.apply_rollups) по пачкам"""
+    now = datetime.now(timezone.utc)
+    # События приходят по времени: пачка покрывает несколько соседних часов
+    moments = sorted(_spread(rng, now, days) for _ in range(count))
+    for start in range(0, count, CHUNK_SIZE):
+        batch = [generate_metrics_event(rng, application_ids, moment) for moment in moments[start:start + CHUNK_SIZE]]
+        heatmap_counts = Counter()
+        time_buckets = {}
+        for row in batch:
+            bucket = hour_bucket(row["created_at"])
+            for (cell_x, cell_y), hits in bin_points(decode_points(row["cursor_points"])).items():
+                heatmap_counts[(bucket, cell_x, cell_y)] += hits
+            total, samples = time_buckets.get(bucket, (0, 0))
+            time_buckets[bucket] = (total + row["time_on_page"], samples + 1)
+        db.execute(insert(BehaviorMetrics), batch)
+        _merge_heatmap(db, heatmap_counts)
+        TimeOnPageCRUD.merge(db, time_buckets)
+        db.commit()
+
+
+def seed(applications: int, metrics: int, days: int = 14, seed: int = 0, reset: bool = False) -> dict:
+    create_schema()
+    # Секции behavior_metrics на всю историю, иначе события лягут в секцию по умолчанию
+    ensure_partitions(start=datetime.now(timezone.utc) - timedelta(days=days))
+    rng = random.Random(seed)
+    db = SessionLocal()
+    try:
+        if reset:
+            truncate(db)
+        ensure_admin(db)
+        started = time.perf_counter()
+        application_ids = seed_applications(db, applications, days, rng)
+        applications_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        seed_metrics(db, metrics, days, application_ids, rng)
+        metrics_seconds = time.perf_counter() - started
+        totals = {
+            "applications": db.execute(text("SELECT count(*) FROM applications")).scalar_one(),
+            "behavior_metrics": db.execute(text("SELECT count(*) FROM behavior_metrics")).scalar_one(),
+            "admins": db.query(Admin).count(),
+        }
+    finally:
+        db.close()
+    return {"applications_seconds": applications_seconds, "metrics_seconds": metrics_seconds, "totals": totals}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applications", type=int, default=10_000)
+    parser.add_argument("--metrics", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=14, help="created_at в пределах последних N дней")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед заполнением")
+    args = parser.parse_args()
+
+    result = seed(args.applications, args.metrics, args.days, args.seed, reset=args.truncate)
+    print(f"applications: {args.applications} in {result['applications_seconds']:.1f} s")
+    print(f"behavior_metrics: {args.metrics} in {result['metrics_seconds']:.1f} s")
+    print(f"rows now: {result['totals']}")
+    print(f"admin: {BENCH_ADMIN_EMAIL} / {BENCH_ADMIN_PASSWORD}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Сравнение sync и async слоя БД на уровне CRUD: запись поведенческих метрик
+(BehaviorMetricsCRUD.create) и страница заявок (ApplicationCRUD.get_page_rows).
+
+sync  - пул потоков по образцу threadpool FastAPI, каждый запрос в своей Session;
+async - asyncio.gather, каждый запрос в своей AsyncSession.
+
+Запуск из корня репозитория (нужен доступ к PostgreSQL, переменные POSTGRES_*):
+    PYTHONPATH=backend python scripts/bench_db_layer.py --requests 2000 --concurrency 40
+
+Скрипт пишет в behavior_metrics строки с application_id = -1 и удаляет их в конце.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete
+
+from core.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from core.schema import create_schema
+from models.applications import Application, ApplicationCRUD, AsyncApplicationCRUD
+from models.behavior_metrics import AsyncBehaviorMetricsCRUD, BehaviorMetrics, BehaviorMetricsCRUD
+
+BENCH_APPLICATION_ID = -1
+# Колонки строки списка заявок, как в GET /api/applications/page
+PAGE_COLUMNS = [
+    Application.id, Application.first_name, Application.last_name, Application.interested_product,
+    Application.budget, Application.priority_score, Application.created_at,
+]
+
+
+def _metrics_row(i: int) -> dict:
+    return {
+        "application_id": BENCH_APPLICATION_ID,
+        "time_on_page": i % 300,
+        "buttons_clicked": '{"submit":1}',
+        "cursor_points": None,
+        "return_frequency": 0,
+    }
+
+
+def _sync_ingest(i: int):
+    db = SessionLocal()
+    try:
+        BehaviorMetricsCRUD.create(db, **_metrics_row(i))
+    finally:
+        db.close()
+
+
+def _sync_page(i: int):
+    db = SessionLocal()
+    try:
+        ApplicationCRUD.get_page_rows(db, PAGE_COLUMNS, limit=50)
+    finally:
+        db.close()
+
+
+async def _async_ingest(i: int):
+    async with AsyncSessionLocal() as db:
+        await AsyncBehaviorMetricsCRUD.create(db, **_metrics_row(i))
+
+
+async def _async_page(i: int):
+    async with AsyncSessionLocal() as db:
+        await AsyncApplicationCRUD.get_page_rows(db, PAGE_COLUMNS, limit=50)
+
+
+def run_sync(func, requests: int, concurrency: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(func, range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def run_async(func, requests: int, concurrency: int) -> float:
+    # Ограничиваем число одновременных запросов так же, как размер пула потоков
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i: int):
+        async with semaphore:
+            await func(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main_async(args) -> list[tuple[str, float, float]]:
+    results = []
+    for name, sync_func, async_func in (
+        ("metrics ingest", _sync_ingest, _async_ingest),
+        ("applications page", _sync_page, _async_page),
+    ):
+        # Прогрев пулов соединений
+        run_sync(sync_func, args.concurrency, args.concurrency)
+        await run_async(async_func, args.concurrency, args.concurrency)
+
+        sync_rps = run_sync(sync_func, args.requests, args.concurrency)
+        async_rps = await run_async(async_func, args.requests, args.concurrency)
+        results.append((name, sync_rps, async_rps))
+    await async_engine.dispose()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    args = parser.parse_args()
+
+    create_schema()
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(BehaviorMetrics).where(BehaviorMetrics.application_id == BENCH_APPLICATION_ID))
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'':20} {'sync req/s':>12} {'async req/s':>12}")
+    for name, sync_rps, async_rps in results:
+        print(f"{name:20} {sync_rps:12.0f} {async_rps:12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Микробенчмарк и профилирование core.priority.
+
+Для каждой функции (--targets) на корпусе scripts/priority_corpus.py:
+- ns/call    - лучшее и медианное время вызова по --repeat прогонам корпуса;
+- peak B     - память, выделенная за вызов на пике (tracemalloc, выборка
+               --alloc-sample вызовов): временные строки, списки, совпадения re;
+- retained B - память, оставшаяся после вызова (кэши, утечки), на вызов.
+batch - calculate_priority_scores по колонкам, время и память на строку.
+
+Профиль:
+- --pstats FILE - cProfile (python -m pstats FILE, snakeviz FILE);
+- --flame FILE  - свернутые стеки "a;b;c мкс" для flamegraph.pl, speedscope
+                  или inferno-flamegraph (трассировка sys.setprofile, время
+                  завышено, но пропорции между функциями сохраняются).
+
+Запуск из корня репозитория:
+    PYTHONPATH=backend python scripts/bench_priority.py --rows 20000 --profile mixed
+    PYTHONPATH=backend python scripts/bench_priority.py --profile adversarial --flame priority.folded
+"""
+import argparse
+import cProfile
+import pstats
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from core.priority import (
+    calculate_priority_score,
+    calculate_priority_scores,
+    is_urgent_comment,
+    normalize_application,
+    parse_budget,
+    parse_company_size,
+    parse_deadline_days,
+    score_normalized,
+)
+from priority_corpus import PROFILES, generate_corpus
+
+
+def build_targets(corpus) -> dict:
+    """Имя -> (функция одного элемента, элементы); batch - одна функция на весь корпус"""
+    normalized = [
+        normalize_application(item.budget, item.company_size, item.deadline, item.comments) for item in corpus
+    ]
+    columns = (
+        [item.budget for item in corpus],
+        [item.company_size for item in corpus],
+        [item.deadline for item in corpus],
+        [item.comments for item in corpus],
+    )
+    return {
+        "score": (calculate_priority_score, corpus),
+        "normalize": (
+            lambda item: normalize_application(item.budget, item.company_size, item.deadline, item.comments),
+            corpus,
+        ),
+        "score_normalized": (
+            lambda fields: score_normalized(
+                fields["budget_max"], fields["company_size_bucket"], fields["deadline_days"], fields["urgent_comment"]
+            ),
+            normalized,
+        ),
+        "parse_budget": (parse_budget, columns[0]),
+        "parse_company_size": (parse_company_size, columns[1]),
+        "parse_deadline_days": (parse_deadline_days, columns[2]),
+        "is_urgent_comment": (is_urgent_comment, columns[3]),
+        "batch": (lambda cols: calculate_priority_scores(*cols), [columns]),
+    }
+
+
+def time_target(func, items, repeat: int, rows: int) -> tuple[float, float]:
+    """Лучшее и медианное время на строку (нс)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for item in items:
+            func(item)
+        samples.append((time.perf_counter_ns() - started) / rows)
+    return min(samples), statistics.median(samples)
+
+
+def measure_allocations(func, items, sample: int, rows_per_item: int) -> tuple[float, float]:
+    """Средние (пиковые, оставшиеся) байты на строку по первым sample элементам"""
+    items = items[:sample]
+    peak_total = retained_total = 0
+    tracemalloc.start()
+    try:
+        for item in items:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = func(item)
+            peak = tracemalloc.get_traced_memory()[1]
+            del result
+            retained_total += tracemalloc.get_traced_memory()[0] - before
+            peak_total += peak - before
+    finally:
+        tracemalloc.stop()
+    calls = len(items) * rows_per_item
+    return peak_total / calls, retained_total / calls
+
+
+def collapsed_stacks(func, items) -> Counter:
+    """Время (нс) по полным стекам вызовов, включая C-функции (re, str)"""
+    stacks = Counter()
+    stack = []
+    last = [0]
+
+    def profiler(frame, event, arg):
+        now = time.perf_counter_ns()
+        if stack:
+            stacks[";".join(stack)] += now - last[0]
+        if event == "call":
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        elif event == "c_call":
+            stack.append(getattr(arg, "__qualname__", None) or repr(arg))
+        elif stack and event in ("return", "c_return", "c_exception"):
+            stack.pop()
+        # Время самого профайлера не относится к стеку
+        last[0] = time.perf_counter_ns()
+
+    sys.setprofile(profiler)
+    try:
+        for item in items:
+            func(item)
+    finally:
+        sys.setprofile(None)
+    return stacks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", choices=PROFILES, default="mixed", help="профиль корпуса")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--targets", help="через запятую; по умолчанию все")
+    parser.add_argument("--alloc-sample", type=int, default=2000)
+    parser.add_argument("--pstats", help="сохранить профиль cProfile функции --profile-target")
+    parser.add_argument("--flame", help="сохранить свернутые стеки функции --profile-target")
+    parser.add_argument("--profile-target", default="score")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.rows, args.seed, args.profile)
+    targets = build_targets(corpus)
+    names = args.targets.split(",") if args.targets else list(targets)
+    unknown = set(names + [args.profile_target]) - set(targets)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    print(f"corpus: {args.rows} rows, profile {args.profile}, seed {args.seed}")
+    print(f"{'target':<20} {'best ns':>10} {'median ns':>10} {'peak B':>9} {'retained B':>11}")
+    for name in names:
+        func, items = targets[name]
+        rows_per_item = args.rows if name == "batch" else 1
+        best, median = time_target(func, items, args.repeat, args.rows)
+        peak, retained = measure_allocations(func, items, args.alloc_sample, rows_per_item)
+        print(f"{name:<20} {best:>10.0f} {median:>10.0f} {peak:>9.0f} {retained:>11.1f}")
+
+    func, items = targets[args.profile_target]
+    if args.pstats:
+        profile = cProfile.Profile()
+        profile.runcall(lambda: [func(item) for item in items])
+        profile.dump_stats(args.pstats)
+        print(f"\ncProfile of {args.profile_target} saved to {args.pstats}, top by own time:")
+        pstats.Stats(profile).sort_stats("tottime").print_stats(10)
+    if args.flame:
+        stacks = collapsed_stacks(func, items)
+        with open(args.flame, "w") as f:
+            for stack, nanoseconds in sorted(stacks.items()):
+                if nanoseconds >= 1000:
+                    f.write(f"{stack} {nanoseconds // 1000}\n")
+        print(f"collapsed stacks of {args.profile_target} saved to {args.flame} (microseconds)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
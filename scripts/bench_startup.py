@@ -0,0 +1,125 @@
+"""
+Время старта и перезапуска production-профиля backend (backend/serve.py).
+
+Для каждого прогона запускает serve.py с WEB_CONCURRENCY=--workers и измеряет:
+- first_ready - от запуска процесса до первого ответа GET /health;
+- all_ready   - пока /health не ответят все воркеры (разные pid);
+- rolling     - SIGHUP: пока все воркеры не сменятся новыми (поочередный перезапуск);
+- shutdown    - SIGTERM: до завершения процесса.
+Дополнительно выводит время импорта и прогрева из /health каждого воркера
+и время разового шага схемы (python -m core.schema).
+
+Запуск из корня репозитория (нужна PostgreSQL, переменные POSTGRES_* как у backend):
+    PYTHONPATH=backend python scripts/bench_startup.py --workers 4 --runs 3
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def _health(port: int) -> dict | None:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+            return json.load(response)
+    except OSError:
+        return None
+
+
+def _wait_for_workers(port: int, workers: int, timeout: float, exclude=frozenset()):
+    """
+    Опрашивает /health, пока не ответят workers разных воркеров (pid не из exclude).
+    Возвращает (секунды до первого ответа, секунды до всех, {pid: startup}).
+    """
+    started = time.perf_counter()
+    first = None
+    seen = {}
+    while time.perf_counter() - started < timeout:
+        health = _health(port)
+        if health is None or health["startup"]["pid"] in exclude:
+            time.sleep(0.01)
+            continue
+        if first is None:
+            first = time.perf_counter() - started
+        seen[health["startup"]["pid"]] = health["startup"]
+        if len(seen) >= workers:
+            return first, time.perf_counter() - started, seen
+    raise TimeoutError(f"{len(seen)} of {workers} workers ready after {timeout}s")
+
+
+def _run_once(args) -> dict:
+    env = {**os.environ, "WEB_CONCURRENCY": str(args.workers), "PORT": str(args.port), "ACCESS_LOG": "false"}
+    process = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_ready, all_ready, workers = _wait_for_workers(args.port, args.workers, args.timeout)
+
+        process.send_signal(signal.SIGHUP)
+        _, rolling, _ = _wait_for_workers(args.port, args.workers, args.timeout, exclude=frozenset(workers))
+
+        shutdown_started = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        process.wait(args.timeout)
+        shutdown = time.perf_counter() - shutdown_started
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return {
+        "first_ready": first_ready,
+        "all_ready": all_ready,
+        "rolling": rolling,
+        "shutdown": shutdown,
+        "workers": list(workers.values()),
+    }
+
+
+def _schema_step() -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "core.schema"], cwd=BACKEND_DIR, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print(f"schema step (python -m core.schema): {_schema_step() * 1000:.0f} ms")
+    results = []
+    for run in range(args.runs):
+        result = _run_once(args)
+        results.append(result)
+        per_worker = ", ".join(
+            f"{w['pid']}: import {w['import_ms']} ms + warm-up {w['warmup_ms']} ms" for w in result["workers"]
+        )
+        print(
+            f"run {run + 1}: first_ready {result['first_ready'] * 1000:.0f} ms, "
+            f"all_ready {result['all_ready'] * 1000:.0f} ms, rolling {result['rolling'] * 1000:.0f} ms, "
+            f"shutdown {result['shutdown'] * 1000:.0f} ms ({per_worker})"
+        )
+
+    print(f"median of {args.runs} runs, {args.workers} workers:")
+    for key in ("first_ready", "all_ready", "rolling", "shutdown"):
+        print(f"  {key:<12} {statistics.median(r[key] for r in results) * 1000:8.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""
+Нагрузочный тест горячих путей API: латентность p50/p95/p99 и пропускная способность.
+
+Сценарии (--scenarios, по умолчанию все):
+- ingest - POST /behavior-metrics/ (beacon: время на странице, клики, курсор);
+- list   - GET /applications/ (все заявки по приоритету);
+- page   - GET /applications/page (страница админ-панели);
+- stats  - GET /behavior-metrics/stats (средние и heatmap);
+- login  - POST /auth/login (bcrypt, своя конкурентность --login-concurrency).
+Каждый сценарий идет --duration секунд после --warmup секунд прогрева
+с --concurrency параллельными клиентами (потоки с keep-alive соединениями).
+
+Набор данных - scripts/bench_dataset.py. Полный воспроизводимый прогон на
+отдельной PostgreSQL (docker-compose.bench.yml): поднимает БД, заполняет
+данными, запускает backend/serve.py и после прогона все останавливает:
+    python scripts/loadtest.py --compose --workers 2
+
+Против уже запущенного backend (данные заполнены заранее):
+    python scripts/loadtest.py --base-url http://127.0.0.1:8000
+
+Базовая линия для сравнения изменений производительности:
+    ... --save-baseline scripts/loadtest_baseline.json   # сохранить
+    ... --baseline scripts/loadtest_baseline.json        # сравнить
+Сравнение завершается с кодом 1, если в каком-то сценарии p95 вырос или
+пропускная способность упала больше, чем на --max-regression (доля).
+Сравнимы только прогоны с одинаковыми параметрами на одной машине.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+COMPOSE_FILE = ROOT_DIR / "docker-compose.bench.yml"
+COMPOSE_PROJECT = "autello-bench"
+# Совпадает с docker-compose.bench.yml
+COMPOSE_ENV = {
+    "POSTGRES_HOST": "127.0.0.1",
+    "POSTGRES_PORT": "55432",
+    "POSTGRES_USER": "app_user",
+    "POSTGRES_PASSWORD": "bench",
+    "POSTGRES_DB": "app_db",
+}
+# Совпадает с scripts/bench_dataset.py
+BENCH_ADMIN_EMAIL = "bench@example.com"
+BENCH_ADMIN_PASSWORD = "bench-password"
+
+SCENARIOS = ("ingest", "list", "page", "stats", "login")
+
+
+class Client:
+    """Keep-alive соединение одного потока нагрузки"""
+
+    def __init__(self, base_url: str):
+        url = urllib.parse.urlsplit(base_url)
+        self._host = url.hostname
+        self._port = url.port or (443 if url.scheme == "https" else 80)
+        self._https = url.scheme == "https"
+        self._prefix = url.path.rstrip("/")
+        self._conn = None
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None):
+        # Сервер может закрыть keep-alive соединение (например, после ответа 500):
+        # запрос на таком соединении повторяется один раз на новом
+        for retry in (False, True):
+            reused = self._conn is not None
+            if not reused:
+                conn_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+                self._conn = conn_class(self._host, self._port, timeout=30)
+            try:
+                self._conn.request(method, self._prefix + path, body=body, headers=headers or {})
+                response = self._conn.getresponse()
+                return response.status, response.read()
+            except (ConnectionResetError, BrokenPipeError, http.client.RemoteDisconnected):
+                self.close()
+                if retry or not reused:
+                    raise
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _cursor_json(rng: random.Random) -> str:
+    x, y = rng.randrange(1920), rng.randrange(1080)
+    points = []
+    for _ in range(rng.randint(10, 80)):
+        x = min(max(x + rng.randint(-60, 60), 0), 1919)
+        y = min(max(y + rng.randint(-40, 40), 0), 1079)
+        points.append({"x": x, "y": y})
+    return json.dumps(points, separators=(",", ":"))
+
+
+def _ingest_bodies(count: int = 500, seed: int = 0) -> list[bytes]:
+    """Заранее подготовленные тела beacon: генерация не входит в измерение"""
+    rng = random.Random(seed)
+    return [
+        json.dumps({
+            "application_id": 0,
+            "time_on_page": rng.randint(1, 600),
+            "buttons_clicked": json.dumps({"submit": 1} if rng.random() < 0.3 else {}),
+            "cursor_positions": _cursor_json(rng),
+            "return_frequency": rng.choice([0, 0, 1]),
+        }).encode()
+        for _ in range(count)
+    ]
+
+
+def login(base_url: str) -> str:
+    body = urllib.parse.urlencode({"username": BENCH_ADMIN_EMAIL, "password": BENCH_ADMIN_PASSWORD}).encode()
+    status, data = Client(base_url).request(
+        "POST", "/auth/login", body, {"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    if status != 200:
+        raise SystemExit(f"login as {BENCH_ADMIN_EMAIL} failed ({status}): run scripts/bench_dataset.py first")
+    return json.loads(data)["access_token"]
+
+
+def build_scenario(name: str, token: str):
+    """Функция (rng) -> (method, path, body, headers) для сценария"""
+    auth = {"Authorization": f"Bearer {token}"}
+    if name == "ingest":
+        bodies = _ingest_bodies()
+        headers = {"Content-Type": "application/json"}
+        return lambda rng: ("POST", "/behavior-metrics/", rng.choice(bodies), headers)
+    if name == "list":
+        return lambda rng: ("GET", "/applications/", None, auth)
+    if name == "page":
+        return lambda rng: ("GET", "/applications/page?limit=50", None, auth)
+    if name == "stats":
+        return lambda rng: ("GET", "/behavior-metrics/stats", None, auth)
+    if name == "login":
+        body = urllib.parse.urlencode({"username": BENCH_ADMIN_EMAIL, "password": BENCH_ADMIN_PASSWORD}).encode()
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        return lambda rng: ("POST", "/auth/login", body, headers)
+    raise ValueError(f"unknown scenario: {name}")
+
+
+def run_scenario(base_url: str, make_request, concurrency: int, duration: float, warmup: float) -> dict:
+    """
+    Нагрузка из concurrency потоков до конца --duration. Учитываются запросы,
+    завершившиеся после прогрева: медленный запрос, начатый во время прогрева,
+    тоже попадает в замер, иначе сценарий дольше окна остался бы без результатов.
+    """
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def worker(index: int):
+        rng = random.Random(index)
+        client = Client(base_url)
+        local_latencies, local_errors = [], Counter()
+        while time.perf_counter() < stop_at:
+            method, path, body, headers = make_request(rng)
+            request_started = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body, headers)
+            except (OSError, http.client.HTTPException) as exc:
+                status = type(exc).__name__
+            finished = time.perf_counter()
+            if finished < measure_from:
+                continue
+            if isinstance(status, int) and status < 400:
+                local_latencies.append(finished - request_started)
+            else:
+                local_errors[str(status)] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Последние запросы завершаются после stop_at - окно замера до фактического конца
+    elapsed = time.perf_counter() - measure_from
+    error_count = sum(errors.values())
+    result = {
+        "concurrency": concurrency,
+        "requests": len(latencies) + error_count,
+        "errors": error_count,
+        "errors_by_status": dict(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+    if len(latencies) >= 2:
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        result.update({
+            "p50_ms": round(quantiles[49] * 1000, 2),
+            "p95_ms": round(quantiles[94] * 1000, 2),
+            "p99_ms": round(quantiles[98] * 1000, 2),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        })
+    return result
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Сценарии, где p95 вырос или rps упал больше допустимого"""
+    regressions = []
+    print(f"\ncompared to baseline from {baseline['meta'].get('created_at')} ({baseline['meta'].get('git_commit')}):")
+    for name, current in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base or "p95_ms" not in base or "p95_ms" not in current:
+            continue
+        if base["concurrency"] != current["concurrency"]:
+            print(f"  {name:<7} skipped: concurrency {current['concurrency']} vs {base['concurrency']} in baseline")
+            continue
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1
+        rps_change = current["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        regressed = p95_change > max_regression or rps_change < -max_regression
+        print(f"  {name:<7} p95 {p95_change:+7.1%}  rps {rps_change:+7.1%}  {'REGRESSION' if regressed else 'ok'}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_for_health(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if Client(base_url).request("GET", "/health")[0] == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"backend at {base_url} is not ready after {timeout}s")
+
+
+def _compose(*args: str):
+    subprocess.run(["docker", "compose", "-f", str(COMPOSE_FILE), "-p", COMPOSE_PROJECT, *args], check=True)
+
+
+def _seed(args, env: dict):
+    subprocess.run(
+        [
+            sys.executable, str(ROOT_DIR / "scripts" / "bench_dataset.py"), "--truncate",
+            "--applications", str(args.applications), "--metrics", str(args.metrics),
+        ],
+        env={**env, "PYTHONPATH": str(BACKEND_DIR)}, check=True,
+    )
+
+
+def _start_server(args, env: dict) -> subprocess.Popen:
+    env = {
+        **env,
+        "PORT": str(args.port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "ACCESS_LOG": "false",
+        # Порог выше любого сценария: лог медленных запросов не влияет на замер
+        "SLOW_REQUEST_THRESHOLD_MS": "60000",
+    }
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env, stdout=log, stderr=log)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--login-concurrency", type=int, default=4, help="bcrypt-пул мал, вход - отдельно")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--spawn", action="store_true", help="запустить backend/serve.py на --port")
+    parser.add_argument("--seed-dataset", action="store_true", help="перезаполнить БД из POSTGRES_* (bench_dataset.py --truncate)")
+    parser.add_argument("--compose", action="store_true", help="PostgreSQL из docker-compose.bench.yml + --seed-dataset + --spawn")
+    parser.add_argument("--keep", action="store_true", help="не останавливать БД --compose после прогона")
+    parser.add_argument("--workers", type=int, default=2, help="WEB_CONCURRENCY для --spawn")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--server-log", help="файл для логов backend, запущенного --spawn")
+    parser.add_argument("--applications", type=int, default=10_000, help="размер набора данных для --seed-dataset")
+    parser.add_argument("--metrics", type=int, default=50_000, help="размер набора данных для --seed-dataset")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    parser.add_argument("--save-baseline", help="сохранить результаты как базовую линию")
+    parser.add_argument("--baseline", help="сравнить с базовой линией")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    env = dict(os.environ)
+    server = None
+    if args.compose:
+        env.update(COMPOSE_ENV)
+        _compose("up", "-d", "--wait")
+        args.seed_dataset = args.spawn = True
+    try:
+        if args.seed_dataset:
+            _seed(args, env)
+        if args.spawn:
+            # Схема - отдельный шаг, как сервис migrate в docker-compose.yml
+            subprocess.run([sys.executable, "-m", "core.schema"], cwd=BACKEND_DIR, env=env, check=True)
+            server = _start_server(args, env)
+            args.base_url = f"http://127.0.0.1:{args.port}"
+            _wait_for_health(args.base_url, timeout=60)
+
+        token = login(args.base_url)
+        results = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_commit": _git_commit(),
+                "base_url": args.base_url,
+                "duration": args.duration,
+                "warmup": args.warmup,
+                "workers": args.workers if args.spawn else None,
+                "dataset": {"applications": args.applications, "metrics": args.metrics} if args.seed_dataset else None,
+                "cpus": os.cpu_count(),
+                "python": platform.python_version(),
+            },
+            "scenarios": {},
+        }
+        print(f"{'scenario':<8} {'conc':>4} {'requests':>8} {'errors':>6} {'rps':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name in scenarios:
+            concurrency = args.login_concurrency if name == "login" else args.concurrency
+            result = run_scenario(
+                args.base_url, build_scenario(name, token), concurrency, args.duration, args.warmup,
+            )
+            results["scenarios"][name] = result
+            print(f"{name:<8} {concurrency:>4} {result['requests']:>8} {result['errors']:>6} {result['rps']:>8.1f} "
+                  f"{result.get('p50_ms', 0):>8.1f} {result.get('p95_ms', 0):>8.1f} {result.get('p99_ms', 0):>8.1f}"
+                  + (f"  errors: {result['errors_by_status']}" if result["errors"] else ""))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(60)
+        if args.compose and not args.keep:
+            _compose("down", "-v")
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+-- Миграция: секционирование behavior_metrics по created_at (RANGE)
+-- Запуск: docker compose exec -T postgres psql -U app_user -d app_db < scripts/partition_behavior_metrics.sql
+--
+-- Данные не копируются: существующая таблица становится секцией
+-- behavior_metrics_legacy с диапазоном от MINVALUE до начала завтрашнего дня (UTC)
+-- и удаляется целиком, когда все ее события старше METRICS_RAW_RETENTION_DAYS.
+-- Следующие секции создает backend (сервис migrate и фоновая задача, core/partitions.py).
+--
+-- ATTACH строит первичный ключ (id, created_at) по старой таблице, запись в нее
+-- на это время заблокирована: на больших таблицах выполняйте в тихое время.
+-- Повторный запуск ничего не меняет.
+
+BEGIN;
+
+LOCK TABLE behavior_metrics IN ACCESS EXCLUSIVE MODE;
+
+DO $$
+DECLARE
+    bound timestamptz := date_trunc('day', now(), 'UTC') + interval '1 day';
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'behavior_metrics'::regclass) = 'p' THEN
+        RAISE NOTICE 'behavior_metrics is already partitioned';
+        RETURN;
+    END IF;
+
+    -- Ключ секционирования не может быть NULL
+    UPDATE behavior_metrics SET created_at = now() WHERE created_at IS NULL;
+    ALTER TABLE behavior_metrics ALTER COLUMN created_at SET NOT NULL;
+
+    ALTER TABLE behavior_metrics RENAME TO behavior_metrics_legacy;
+    -- У секции не может быть собственного PK: его заменит (id, created_at) родителя
+    ALTER TABLE behavior_metrics_legacy DROP CONSTRAINT behavior_metrics_pkey;
+    DROP INDEX IF EXISTS ix_behavior_metrics_id;
+    ALTER INDEX ix_behavior_metrics_created_at RENAME TO behavior_metrics_legacy_created_at_idx;
+
+    -- Те же типы и значения по умолчанию (включая последовательность id)
+    CREATE TABLE behavior_metrics (LIKE behavior_metrics_legacy INCLUDING DEFAULTS)
+        PARTITION BY RANGE (created_at);
+    ALTER TABLE behavior_metrics ADD PRIMARY KEY (id, created_at);
+    ALTER SEQUENCE behavior_metrics_id_seq OWNED BY behavior_metrics.id;
+    CREATE INDEX ix_behavior_metrics_created_at ON behavior_metrics (created_at);
+
+    -- С проверочным ограничением ATTACH не сканирует таблицу
+    EXECUTE format(
+        'ALTER TABLE behavior_metrics_legacy ADD CONSTRAINT behavior_metrics_legacy_bound CHECK (created_at < %L)',
+        bound
+    );
+    EXECUTE format(
+        'ALTER TABLE behavior_metrics ATTACH PARTITION behavior_metrics_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+        bound
+    );
+    ALTER TABLE behavior_metrics_legacy DROP CONSTRAINT behavior_metrics_legacy_bound;
+
+    CREATE TABLE behavior_metrics_default PARTITION OF behavior_metrics DEFAULT;
+END $$;
+
+COMMIT;
@@ -0,0 +1,137 @@
+"""
+Корпус входных данных core.priority для бенчмарка (scripts/bench_priority.py)
+и проверки эквивалентности скореров (scripts/priority_equivalence.py).
+
+Профили generate_corpus():
+- form        - только типичные значения формы;
+- parity      - корпус scripts/priority_parity.py: 80% формы, 20% случайных строк;
+- adversarial - граничные и враждебные строки: тысячи цифр, длинные комментарии
+                со смешанной кириллицей и латиницей, похожие буквы ("5м" и "5m",
+                "cрочно" с латинской c), цифры других алфавитов, NBSP и
+                zero-width символы, повторяющиеся разделители;
+- mixed       - 90% parity + 10% adversarial (по умолчанию).
+"""
+import random
+from types import SimpleNamespace
+
+from priority_parity import BUDGETS, COMMENTS, COMPANY_SIZES, DEADLINES
+from priority_parity import generate_corpus as generate_parity_corpus
+
+PROFILES = ("form", "parity", "adversarial", "mixed")
+
+CYRILLIC_WORDS = [
+    "проект", "бюджет", "компания", "сроки", "заказ", "клиент", "полировка", "кузов",
+    "нужно", "обсудить", "цена", "месяц", "неделя", "срочно", "Срочно", "СРОЧНО",
+]
+LATIN_WORDS = [
+    "project", "budget", "company", "deadline", "asap", "ASAP", "week", "month",
+    "premium", "ceramic", "please", "call", "urgent", "mln", "k", "m",
+]
+# Похожие на кириллицу латинские буквы и наоборот: маркеры не должны совпадать
+HOMOGLYPHS = ["cрочно", "срoчно", "5м", "5m", "500к", "500k", "1 млн", "1 mln", "1 МЛН", "2 нeдели", "1 мeсяц"]
+UNICODE_DIGITS = ["٣٠٠٠٠٠٠", "５００", "۱۰-۵۰", "10²", "½ млн", "१००"]
+INVISIBLE = ["\u00a0", "\u200b", "\ufeff", "\t", "\n", "\r\n", "\u2009"]
+
+
+def _mixed_text(rng: random.Random, words: int) -> str:
+    vocabulary = CYRILLIC_WORDS + LATIN_WORDS + HOMOGLYPHS
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(vocabulary))
+        parts.append(rng.choice(INVISIBLE) if rng.random() < 0.1 else " ")
+    return "".join(parts)
+
+
+def _digit_flood(rng: random.Random) -> str:
+    digits = rng.randint(300, 3000)
+    return rng.choice([
+        "9" * digits,
+        "1" + " 000" * (digits // 4),
+        "1," * digits,
+        "1-" * digits,
+        "1." * digits,
+        "0" * digits + "5m",
+        "5" + "0" * digits + " млн",
+    ])
+
+
+def _adversarial_budget(rng: random.Random) -> str | None:
+    return rng.choice([
+        lambda: _digit_flood(rng),
+        lambda: rng.choice(HOMOGLYPHS + UNICODE_DIGITS),
+        lambda: f"{rng.randint(1, 999)}{rng.choice(INVISIBLE)}{rng.choice(['000', 'k', 'к', 'm', 'м', 'млн'])}",
+        lambda: f"от {rng.randint(1, 9)},{rng.randint(0, 99)} до {rng.randint(10, 99)}.{rng.randint(0, 9)} млн",
+        lambda: "-" + str(rng.randint(1, 10**9)),
+        lambda: _mixed_text(rng, rng.randint(1, 50)),
+        lambda: None,
+        lambda: "",
+    ])()
+
+
+def _adversarial_company_size(rng: random.Random) -> str | None:
+    return rng.choice([
+        lambda: rng.choice(["0", "-50", "1e6", "10–50", "500 +", "сто", "∞", "10\u200b0"]),
+        lambda: rng.choice(UNICODE_DIGITS),
+        lambda: str(rng.randint(0, 10**30)),
+        lambda: _digit_flood(rng),
+        lambda: _mixed_text(rng, rng.randint(1, 20)),
+        lambda: None,
+    ])()
+
+
+def _adversarial_deadline(rng: random.Random) -> str | None:
+    return rng.choice([
+        lambda: "2 недели или 3 месяца",
+        lambda: f"{rng.randint(0, 10**12)} {rng.choice(['лет', 'дней', 'weeks', 'мес'])}",
+        lambda: "week" * rng.randint(1, 2000),
+        lambda: rng.choice(["NaN дней", "через год-два", "ASAP!!!", "asap " * 500, "вчера"]),
+        lambda: rng.choice(HOMOGLYPHS),
+        lambda: _mixed_text(rng, rng.randint(1, 100)),
+        lambda: None,
+    ])()
+
+
+def _adversarial_comment(rng: random.Random) -> str | None:
+    return rng.choice([
+        # Длинный комментарий: маркер срочности в конце или только похожий на него
+        lambda: _mixed_text(rng, rng.randint(200, 3000)),
+        lambda: "a" * rng.randint(1000, 50_000) + rng.choice(["срочно", "cрочно", ""]),
+        lambda: rng.choice(HOMOGLYPHS),
+        lambda: None,
+    ])()
+
+
+def adversarial_item(rng: random.Random) -> SimpleNamespace:
+    return SimpleNamespace(
+        budget=_adversarial_budget(rng),
+        company_size=_adversarial_company_size(rng),
+        deadline=_adversarial_deadline(rng),
+        comments=_adversarial_comment(rng),
+    )
+
+
+def form_item(rng: random.Random) -> SimpleNamespace:
+    return SimpleNamespace(
+        budget=rng.choice(BUDGETS),
+        company_size=rng.choice(COMPANY_SIZES),
+        deadline=rng.choice(DEADLINES),
+        comments=rng.choice(COMMENTS),
+    )
+
+
+def generate_corpus(rows: int, seed: int = 0, profile: str = "mixed") -> list[SimpleNamespace]:
+    """Список объектов с полями budget, company_size, deadline, comments"""
+    rng = random.Random(seed)
+    if profile == "form":
+        return [form_item(rng) for _ in range(rows)]
+    if profile == "parity":
+        return generate_parity_corpus(rows, seed)
+    if profile == "adversarial":
+        return [adversarial_item(rng) for _ in range(rows)]
+    if profile == "mixed":
+        corpus = generate_parity_corpus(rows, seed)
+        for index in range(len(corpus)):
+            if rng.random() < 0.1:
+                corpus[index] = adversarial_item(rng)
+        return corpus
+    raise ValueError(f"unknown corpus profile: {profile}")
@@ -0,0 +1,175 @@
+"""
+Property-based проверка скореров core.priority против эталона calculate_priority_score.
+
+Генерирует заявки (значения формы, враждебные строки scripts/priority_corpus.py
+и случайные склейки значимых фрагментов: цифры, разделители, сокращения,
+единицы срока, похожие буквы) и проверяет свойства:
+- normalized - score_normalized(normalize_application(...)) равен эталону;
+- batch      - calculate_priority_scores и normalize_applications поэлементно
+               совпадают со скалярными функциями;
+- candidate  - --candidate module:function (оптимизированный скорер,
+               принимающий объект с полями budget, company_size, deadline,
+               comments) равен эталону;
+- инварианты - score в 0..100, budget_min <= budget_max, корзина размера из
+               CompanySize, срок не отрицательный, рост бюджета не снижает score.
+
+Нарушение уменьшается (shrinking) до минимального примера: поля заменяются на
+None и "", из строк удаляются куски, пока свойство продолжает нарушаться.
+
+Запуск из корня репозитория:
+    PYTHONPATH=backend python scripts/priority_equivalence.py --examples 20000
+    PYTHONPATH=backend:. python scripts/priority_equivalence.py --candidate my_scorer:score
+
+Завершается с кодом 1 при первом нарушении.
+"""
+import argparse
+import importlib
+import random
+import sys
+from types import SimpleNamespace
+
+from core.priority import (
+    BUDGET_MAX_VALUE,
+    CompanySize,
+    calculate_priority_score,
+    calculate_priority_scores,
+    normalize_application,
+    normalize_applications,
+    score_normalized,
+)
+from priority_corpus import HOMOGLYPHS, INVISIBLE, UNICODE_DIGITS, adversarial_item, form_item
+
+FIELDS = ("budget", "company_size", "deadline", "comments")
+TOKENS = [
+    "0", "1", "5", "9", "10", "50", "100", "500", "000", "1000000", "5000000", "99999999999999999999",
+    " ", "-", "–", "+", ",", ".", "/", "₽", "$", "руб",
+    "k", "K", "к", "m", "M", "м", "млн", "mln", "тыс", "мест", "mk",
+    "дн", "день", "day", "недел", "неделя", "week", "месяц", "month", "год", "лет", "year",
+    "срочно", "Срочно", "СРОЧНО", "asap", "ASAP",
+] + HOMOGLYPHS + UNICODE_DIGITS + INVISIBLE
+
+
+def _token_soup(rng: random.Random) -> str | None:
+    if rng.random() < 0.05:
+        return None
+    return "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 8)))
+
+
+def generate_example(rng: random.Random) -> SimpleNamespace:
+    kind = rng.random()
+    if kind < 0.3:
+        return form_item(rng)
+    if kind < 0.4:
+        return adversarial_item(rng)
+    return SimpleNamespace(**{field: _token_soup(rng) for field in FIELDS})
+
+
+def _fields(item) -> tuple:
+    return tuple(getattr(item, field) for field in FIELDS)
+
+
+def check_example(item, candidate=None) -> str | None:
+    """Описание нарушенного свойства или None"""
+    try:
+        return _check_properties(item, candidate)
+    except Exception as e:
+        return f"raises {type(e).__name__}: {e}"
+
+
+def _check_properties(item, candidate) -> str | None:
+    reference = calculate_priority_score(item)
+    if not 0 <= reference <= 100:
+        return f"score {reference} out of range"
+
+    typed = normalize_application(*_fields(item))
+    if typed["budget_min"] is not None and typed["budget_min"] > typed["budget_max"]:
+        return f"budget_min {typed['budget_min']} > budget_max {typed['budget_max']}"
+    if typed["company_size_bucket"] not in set(CompanySize):
+        return f"unknown company_size_bucket {typed['company_size_bucket']}"
+    if typed["deadline_days"] is not None and typed["deadline_days"] < 0:
+        return f"negative deadline_days {typed['deadline_days']}"
+
+    args = (typed["company_size_bucket"], typed["deadline_days"], typed["urgent_comment"])
+    normalized = score_normalized(typed["budget_max"], *args)
+    if normalized != reference:
+        return f"score_normalized {normalized} != reference {reference}"
+    if score_normalized(BUDGET_MAX_VALUE, *args) < normalized:
+        return "a larger budget lowers the score"
+
+    batch_row = normalize_applications(*([value] for value in _fields(item)))[0]
+    if batch_row.pop("priority_score") != reference or batch_row != typed:
+        return f"normalize_applications {batch_row} != normalize_application {typed}"
+
+    if candidate is not None:
+        got = candidate(item)
+        if got != reference:
+            return f"candidate {got} != reference {reference}"
+    return None
+
+
+def shrink(item, fails) -> SimpleNamespace:
+    """Жадно упрощает поля, пока fails(пример) остается истинным"""
+    current = dict(vars(item))
+    progress = True
+    while progress:
+        progress = False
+        for field in FIELDS:
+            value = current[field]
+            candidates = [None, ""] if value else []
+            if value:
+                # Удаление кусков от половины строки до одного символа
+                size = len(value) // 2
+                while size >= 1:
+                    candidates.extend(value[:start] + value[start + size:] for start in range(0, len(value), size))
+                    size //= 2
+            for simpler in candidates:
+                attempt = SimpleNamespace(**{**current, field: simpler})
+                if simpler != value and fails(attempt):
+                    current[field] = simpler
+                    progress = True
+                    break
+    return SimpleNamespace(**current)
+
+
+def _load_candidate(spec: str):
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=1000, help="размер пачки для calculate_priority_scores")
+    parser.add_argument("--candidate", help="module:function оптимизированного скорера")
+    args = parser.parse_args()
+
+    candidate = _load_candidate(args.candidate) if args.candidate else None
+    rng = random.Random(args.seed)
+    checked = 0
+    while checked < args.examples:
+        batch = [generate_example(rng) for _ in range(min(args.batch, args.examples - checked))]
+        # Пачка целиком: кэши пакетного скорера работают на повторяющихся значениях.
+        # Исключение пачки найдет поэлементная проверка (normalize_applications на одной строке)
+        try:
+            batch_scores = calculate_priority_scores(*([getattr(item, field) for item in batch] for field in FIELDS))
+        except Exception:
+            batch_scores = [None] * len(batch)
+        for item, batch_score in zip(batch, batch_scores):
+            problem = check_example(item, candidate)
+            if problem is None and batch_score is not None and batch_score != calculate_priority_score(item):
+                problem = f"calculate_priority_scores {batch_score} != reference {calculate_priority_score(item)}"
+            if problem is not None:
+                minimal = shrink(item, lambda example: check_example(example, candidate) is not None)
+                print(f"FAILED after {checked} examples: {problem}")
+                print(f"minimal example: {vars(minimal)!r}")
+                print(f"  -> {check_example(minimal, candidate)}")
+                return 1
+            checked += 1
+
+    print(f"OK: {checked} examples, all properties hold (seed {args.seed})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Сверка пакетного скорера (calculate_priority_scores) со скалярным
+(calculate_priority_score) на сгенерированном корпусе заявок.
+
+Запуск из корня репозитория:
+    PYTHONPATH=backend python scripts/priority_parity.py --rows 1000000
+
+Завершается с кодом 1 при первом расхождении.
+"""
+import argparse
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from core.priority import calculate_priority_score, calculate_priority_scores
+
+# Типичные значения полей формы
+BUDGETS = [
+    "5000000-10000000", "1000000-5000000", "500000-1000000", "50000-100000",
+    "10000-50000", "500k", "5m", "10M", "1m", "до 1 000 000 ₽", "от 500000", "",
+]
+COMPANY_SIZES = ["500+", "100-500", "50-100", "10-50", "1-10", "1", "1500", "150", ""]
+DEADLINES = [
+    "1 неделя", "2 недели", "1 месяц", "2 месяца", "3 месяца", "6 месяцев",
+    "1 week", "1 month", "asap", "",
+]
+COMMENTS = [
+    "Очень срочно! Нужно запустить проект", "СРОЧНО", "Просто узнать цену",
+    "Planning ahead, no rush", "",
+]
+
+# Фрагменты для случайных строк: граничные случаи разбора бюджета и подстрок
+FRAGMENTS = list("0123456789- +kmKMмлн.,₽$_") + [
+    "500", "100", "50", "5m", "1m", "10m", "500k", "500+", "5000000", "1000000",
+    "недел", "Неделя", "week", "месяц", "month", "срочно", "Срочно", "²", "٣",
+]
+
+
+def _random_text(rng: random.Random, fragments):
+    if rng.random() < 0.05:
+        return None
+    return "".join(rng.choice(fragments) for _ in range(rng.randint(0, 6)))
+
+
+def generate_corpus(rows: int, seed: int = 0, fragments=FRAGMENTS) -> list[SimpleNamespace]:
+    """Смесь типичных значений формы (80%) и случайных строк из fragments (20%)"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(rows):
+        if rng.random() < 0.8:
+            item = SimpleNamespace(
+                budget=rng.choice(BUDGETS),
+                company_size=rng.choice(COMPANY_SIZES),
+                deadline=rng.choice(DEADLINES),
+                comments=rng.choice(COMMENTS),
+            )
+        else:
+            item = SimpleNamespace(
+                budget=_random_text(rng, fragments),
+                company_size=_random_text(rng, fragments),
+                deadline=_random_text(rng, fragments),
+                comments=_random_text(rng, fragments),
+            )
+        corpus.append(item)
+    return corpus
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.rows, args.seed)
+    columns = (
+        [item.budget for item in corpus],
+        [item.company_size for item in corpus],
+        [item.deadline for item in corpus],
+        [item.comments for item in corpus],
+    )
+
+    started = time.perf_counter()
+    expected = [calculate_priority_score(item) for item in corpus]
+    scalar_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = calculate_priority_scores(*columns)
+    batch_time = time.perf_counter() - started
+
+    for item, want, got in zip(corpus, expected, actual):
+        if want != got:
+            print(f"MISMATCH: {vars(item)} scalar={want} batch={got}")
+            return 1
+
+    print(f"OK: {args.rows} rows match")
+    print(f"scalar: {scalar_time:.2f}s, batch: {batch_time:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+-- СГЕНЕРИРОВАНО из backend/core/priority.py (core/priority_sql.py), не редактировать вручную.
+-- Версия алгоритма приоритизации: 2
+
+-- Версия 1 разбирала текстовые поля в SQL
+DROP FUNCTION IF EXISTS priority_score(text, text, text, text);
+
+CREATE OR REPLACE FUNCTION priority_score(
+    budget_max bigint, company_size_bucket smallint, deadline_days integer, urgent_comment boolean
+)
+RETURNS integer
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $fn$
+SELECT (
+        CASE
+            WHEN budget_max >= 5000000 THEN 40
+            WHEN budget_max >= 1000000 THEN 30
+            WHEN budget_max >= 500000 THEN 20
+            ELSE 10
+        END
+        +
+        CASE company_size_bucket
+            WHEN 5 THEN 30  -- ENTERPRISE
+            WHEN 4 THEN 20  -- LARGE
+            WHEN 3 THEN 15  -- MEDIUM
+            ELSE 5
+        END
+        +
+        CASE
+            WHEN urgent_comment OR deadline_days <= 21 THEN 30
+            WHEN deadline_days <= 365 THEN 15
+            ELSE 5
+        END
+)::integer
+$fn$;
+
+CREATE OR REPLACE FUNCTION priority_score_version()
+RETURNS integer
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $fn$ SELECT 2 $fn$;
+
+-- Правка типизированных колонок пересчитывает score в БД; правка текстовых
+-- полей помечает строку устаревшей - разбор текста выполняет backend
+CREATE OR REPLACE FUNCTION applications_priority_score_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $fn$
+BEGIN
+    IF (NEW.budget, NEW.company_size, NEW.deadline, NEW.comments)
+        IS DISTINCT FROM (OLD.budget, OLD.company_size, OLD.deadline, OLD.comments) THEN
+        NEW.priority_version := 0;
+        RETURN NEW;
+    END IF;
+    NEW.priority_score := priority_score(
+        NEW.budget_max, NEW.company_size_bucket, NEW.deadline_days, NEW.urgent_comment
+    );
+    NEW.priority_version := priority_score_version();
+    RETURN NEW;
+END
+$fn$;
+
+CREATE OR REPLACE TRIGGER applications_priority_score
+    BEFORE UPDATE OF budget, company_size, deadline, comments,
+        budget_max, company_size_bucket, deadline_days, urgent_comment ON applications
+    FOR EACH ROW EXECUTE FUNCTION applications_priority_score_trigger();
+
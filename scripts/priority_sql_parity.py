@@ -0,0 +1,70 @@
+"""
+Сверка SQL-функции priority_score() с Python-функцией score_normalized
+на сгенерированном корпусе заявок.
+
+Текстовые поля корпуса разбираются в Python (normalize_applications), затем
+одни и те же типизированные значения считаются обеими реализациями.
+
+Нужна запущенная PostgreSQL (переменные POSTGRES_* как у backend). Функция
+устанавливается заново из core/priority.py перед сверкой.
+
+Запуск из корня репозитория:
+    PYTHONPATH=backend python scripts/priority_sql_parity.py --rows 100000
+
+Завершается с кодом 1 при первом расхождении.
+"""
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from core.database import engine
+from core.priority import normalize_applications, score_normalized
+from core.priority_sql import install_priority_function
+from priority_parity import generate_corpus
+
+_SCORE_SQL = text("""
+    SELECT priority_score(b, c, d, u)
+    FROM unnest(
+        CAST(:budget_max AS bigint[]), CAST(:company_size_bucket AS smallint[]),
+        CAST(:deadline_days AS integer[]), CAST(:urgent_comment AS boolean[])
+    ) WITH ORDINALITY AS t(b, c, d, u, n)
+    ORDER BY n
+""")
+_COLUMNS = ("budget_max", "company_size_bucket", "deadline_days", "urgent_comment")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    args = parser.parse_args()
+
+    install_priority_function(engine)
+    corpus = generate_corpus(args.rows, args.seed)
+    normalized = normalize_applications(
+        [item.budget for item in corpus],
+        [item.company_size for item in corpus],
+        [item.deadline for item in corpus],
+        [item.comments for item in corpus],
+    )
+
+    with engine.connect() as conn:
+        for start in range(0, len(normalized), args.chunk):
+            chunk = normalized[start:start + args.chunk]
+            sql_scores = conn.execute(
+                _SCORE_SQL, {column: [fields[column] for fields in chunk] for column in _COLUMNS}
+            ).scalars().all()
+            for fields, sql_score in zip(chunk, sql_scores):
+                python_score = score_normalized(*(fields[column] for column in _COLUMNS))
+                if python_score != sql_score:
+                    print(f"MISMATCH: {fields} python={python_score} sql={sql_score}")
+                    return 1
+
+    print(f"OK: {len(corpus)} rows match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
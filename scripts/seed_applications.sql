@@ -1,5 +1,7 @@
 -- SQL скрипт для создания 10 тестовых заявок с разными уровнями приоритета
 -- 4 срочные (высокий приоритет), 3 средние, 3 низкие
+-- Заявки вставляются с priority_version = 0: score и типизированные поля посчитает
+-- фоновый пересчет backend в течение RESCORE_CHECK_INTERVAL секунд (или: cd backend && python -m core.rescoring)
 
 -- 4 срочные заявки (высокий приоритет)
 INSERT INTO applications (first_name, last_name, middle_name, email, business_info, 
@@ -72,5 +74,5 @@ VALUES
  'email', 'Пока изучаю варианты, не тороплюсь', 
  'Базовое обслуживание', NOW() - INTERVAL '3 days');
 
--- Примечание: priority_score будет вычислен автоматически при первом запросе GET /api/applications
--- или можно обновить вручную через UPDATE запросы, но обычно это делается автоматически в backend
+-- Примечание: заявки вставляются с priority_version = 0, поэтому priority_score посчитает
+-- фоновая задача пересчета (проверка раз в RESCORE_CHECK_INTERVAL секунд) или POST /api/applications/rescore
@@ -1,31 +1,22 @@
 -- Обновление priority_score для существующих заявок
--- Использует алгоритм из core/priority.py
+-- Начиная с версии алгоритма 2 текстовые поля разбирает только backend, поэтому
+-- устаревшие заявки пересчитывает фоновая задача (при старте backend, через
+-- POST /api/applications/rescore или: cd backend && python -m core.rescoring).
+--
+-- Здесь - пересчет score по уже заполненным типизированным полям текущей версии
+-- (например, после ручной правки budget_max/deadline_days) и проверка результата.
+-- SQL-функция priority_score() сгенерирована из core/priority.py
+-- (scripts/priority_score_function.sql; backend устанавливает ее при старте)
 
 UPDATE applications 
-SET priority_score = 
-    -- Бюджет (40%)
-    CASE 
-        WHEN budget::text LIKE '%5000000%' OR budget::text LIKE '%10000000%' OR budget::text LIKE '%5m%' OR budget::text LIKE '%10m%' THEN 40
-        WHEN budget::text LIKE '%1000000%' OR budget::text LIKE '%1m%' THEN 30
-        WHEN budget::text LIKE '%500000%' OR budget::text LIKE '%500k%' THEN 20
-        ELSE 10
-    END +
-    -- Размер компании (30%)
-    CASE 
-        WHEN company_size LIKE '%500+%' OR company_size LIKE '%500%' THEN 30
-        WHEN company_size LIKE '%100-500%' OR company_size LIKE '%100%' THEN 20
-        WHEN company_size LIKE '%50-100%' OR company_size LIKE '%50%' THEN 15
-        ELSE 5
-    END +
-    -- Срочность (30%)
-    CASE 
-        WHEN deadline LIKE '%неделя%' OR deadline LIKE '%week%' OR comments LIKE '%срочно%' OR comments LIKE '%urgent%' THEN 30
-        WHEN deadline LIKE '%месяц%' OR deadline LIKE '%month%' THEN 15
-        ELSE 5
-    END
-WHERE priority_score = 0 OR priority_score IS NULL;
+SET priority_score = priority_score(budget_max, company_size_bucket, deadline_days, urgent_comment)
+WHERE priority_version = priority_score_version()
+  AND priority_score IS DISTINCT FROM priority_score(budget_max, company_size_bucket, deadline_days, urgent_comment);
+
+-- Сколько заявок ждут пересчета в backend
+SELECT count(*) AS stale FROM applications WHERE priority_version IS DISTINCT FROM priority_score_version();
 
 -- Проверка результата
-SELECT id, first_name, budget, company_size, deadline, priority_score 
+SELECT id, first_name, budget, budget_max, company_size, company_size_bucket, deadline, deadline_days, priority_score 
 FROM applications 
 ORDER BY priority_score DESC;